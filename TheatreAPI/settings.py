@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "theatre.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -64,6 +65,13 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# The toolbar middleware is sync only: under ASGI it would push every
+# request, async views included, back onto a worker thread
+DEBUG_TOOLBAR = os.environ.get("DEBUG_TOOLBAR", "true").lower() == "true"
+if not DEBUG_TOOLBAR:
+    INSTALLED_APPS.remove("debug_toolbar")
+    MIDDLEWARE.remove("debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "TheatreAPI.urls"
 
 TEMPLATES = [
@@ -88,14 +96,53 @@ WSGI_APPLICATION = "TheatreAPI.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
+# SQLITE_DATABASE=<path> swaps PostgreSQL for a local SQLite file, e.g.
+# for benchmarks (full-text search needs PostgreSQL)
+if os.environ.get("SQLITE_DATABASE"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ["SQLITE_DATABASE"],
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ["POSTGRES_DB"],
+            "USER": os.environ["POSTGRES_USER"],
+            "PASSWORD": os.environ["POSTGRES_PASSWORD"],
+            "HOST": os.environ["POSTGRES_HOST"],
+            "PORT": os.environ["POSTGRES_PORT"],
+        }
+    }
+    # Optional read replica for reporting exports; tests read the primary
+    if os.environ.get("POSTGRES_REPLICA_HOST"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+            "PORT": os.environ.get(
+                "POSTGRES_REPLICA_PORT", os.environ["POSTGRES_PORT"]
+            ),
+            "TEST": {"MIRROR": "default"},
+        }
+
+# Database the ticket exports stream from
+REPORTING_DATABASE_ALIAS = "replica" if "replica" in DATABASES else "default"
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory is per process: with several workers, point CACHE_BACKEND at
+# a shared backend (e.g. django.core.cache.backends.redis.RedisCache) so
+# invalidations made by one worker reach all of them.
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": os.environ["POSTGRES_DB"],
-        "USER": os.environ["POSTGRES_USER"],
-        "PASSWORD": os.environ["POSTGRES_PASSWORD"],
-        "HOST": os.environ["POSTGRES_HOST"],
-        "PORT": os.environ["POSTGRES_PORT"],
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
     }
 }
 
@@ -151,16 +198,77 @@ REST_FRAMEWORK = {
         "theatre.permissions.IsAdminOrIfAuthenticatedReadOnly",
 ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        # orjson-backed when installed, same output as JSONRenderer
+        "theatre.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_THROTTLE_CLASSES": [
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "10/minute", "user": "30/minute"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "10/minute",
+        "user": "30/minute",
+        # Waiting room polls, kept apart from the user rate
+        "admission_queue": "120/minute",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     )
 }
 
+# Cache alias and lifetime (seconds) of cached catalogue responses; model
+# signals invalidate them as soon as the underlying data changes
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a performance seat map may stay cached; writes invalidate it
+SEAT_MAP_CACHE_TIMEOUT = 60 * 60
+
+# Seat holds live in this cache and expire on their own after their TTL
+SEAT_HOLD_CACHE_ALIAS = "default"
+SEAT_HOLD_DEFAULT_MINUTES = 10
+SEAT_HOLD_MAX_MINUTES = 15
+
+# Waiting room of performances with an admission_rate. The in-process
+# theatre.admission.InMemoryAdmissionStore only suits a single process.
+ADMISSION_STORE = "theatre.admission.CacheAdmissionStore"
+ADMISSION_CACHE_ALIAS = "default"
+# Minutes an admitted client has to reserve before queueing again
+ADMISSION_WINDOW_MINUTES = 10
+
+# Server-sent seat events: heartbeat/resync interval and stream lifetime
+# in seconds, the reconnect delay suggested to clients, and the events
+# buffered per slow client before it is sent a fresh snapshot instead
+SEAT_EVENTS_HEARTBEAT_SECONDS = 15
+SEAT_EVENTS_MAX_STREAM_SECONDS = 5 * 60
+SEAT_EVENTS_RETRY_MS = 3000
+SEAT_EVENTS_BUFFER_SIZE = 100
+# Serve the streams over ASGI (see the theatre-asgi docker-compose profile).
+# Under WSGI every open stream holds a worker thread for its lifetime, so
+# each process only opens this many and answers others with 503 and
+# Retry-After; 0 refuses streams under WSGI altogether
+SEAT_EVENTS_WSGI_MAX_STREAMS = int(
+    os.environ.get("SEAT_EVENTS_WSGI_MAX_STREAMS", 4)
+)
+
+# Responses replayed for repeated Idempotency-Key headers; a key whose
+# request never finishes is released after the pending timeout
+IDEMPOTENCY_CACHE_ALIAS = "default"
+IDEMPOTENCY_KEY_TIMEOUT = 24 * 60 * 60
+IDEMPOTENCY_PENDING_TIMEOUT = 60
+
+# Per-view query count, DB/render time and latency histograms, exported
+# at /api/theatre/metrics/; requests repeating one SQL statement at least
+# METRICS_N_PLUS_ONE_THRESHOLD times are logged as likely N+1 queries
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+METRICS_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+METRICS_N_PLUS_ONE_THRESHOLD = 5
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=300),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
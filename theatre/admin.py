@@ -16,4 +16,12 @@ admin.site.register(Actor)
 admin.site.register(Play)
 admin.site.register(Performance)
 admin.site.register(Reservation)
-admin.site.register(Ticket)
+
+
+class TicketAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        # The form has already run full_clean on the ticket
+        obj.save(validate=False)
+
+
+admin.site.register(Ticket, TicketAdmin)
@@ -0,0 +1,252 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import PermissionDenied, Throttled
+from rest_framework.throttling import UserRateThrottle
+
+
+QUEUE_TOKEN_HEADER = "X-Queue-Token"
+QUEUE_TOKEN_SALT = "theatre.admission"
+
+NEXT_SLOT_KEY = "theatre:admission:{performance_id}:next"
+USER_SLOT_KEY = "theatre:admission:{performance_id}:user:{user_id}"
+LOCK_KEY = "theatre:admission:{performance_id}:lock"
+
+
+def _now() -> float:
+    return time.time()
+
+
+class AdmissionStore(ABC):
+    """Hands out the admission slots of performance queues.
+
+    Slots follow a virtual schedule: each one is ``interval`` seconds after
+    the previous, and never earlier than the moment it is taken, so a quiet
+    queue admits the next client at once while a burst is spread evenly in
+    arrival order. A user keeps their slot when joining again.
+    Subclasses only provide storage and a per-performance lock.
+    """
+
+    def reserve(self, performance_id: int, user_id: int,
+                interval: float) -> float:
+        """Return the timestamp at which the user is admitted"""
+        now = _now()
+        user_key = USER_SLOT_KEY.format(
+            performance_id=performance_id, user_id=user_id
+        )
+        next_key = NEXT_SLOT_KEY.format(performance_id=performance_id)
+        timeout = self.timeout
+
+        with self.lock(performance_id):
+            admit_at = self.get(user_key)
+            if admit_at is not None and now <= admit_at + timeout:
+                return admit_at
+
+            admit_at = max(now, self.get(next_key) or now)
+            self.set(next_key, admit_at + interval, admit_at - now + timeout)
+            self.set(user_key, admit_at, admit_at - now + timeout)
+        return admit_at
+
+    @property
+    def timeout(self) -> float:
+        """Seconds an admission stays usable after its slot comes up"""
+        return settings.ADMISSION_WINDOW_MINUTES * 60
+
+    @abstractmethod
+    def get(self, key: str):
+        """The stored value, None when missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: float, timeout: float) -> None:
+        """Store a value for ``timeout`` seconds"""
+
+    @abstractmethod
+    def lock(self, performance_id: int):
+        """Context manager serializing reservations of one performance"""
+
+
+class InMemoryAdmissionStore(AdmissionStore):
+    """Process-local queue state, for tests and single-process servers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get(self, key):
+        value, expires_at = self._values.get(key, (None, math.inf))
+        return value if _now() < expires_at else None
+
+    def set(self, key, value, timeout):
+        self._values[key] = (value, _now() + timeout)
+
+    @contextmanager
+    def lock(self, performance_id):
+        with self._lock:
+            yield
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class CacheAdmissionStore(AdmissionStore):
+    """Queue state in ADMISSION_CACHE_ALIAS, shared by every worker using it.
+
+    Slots are handed out under a short lock taken with an atomic ``add``;
+    the lock expires on its own if its holder dies.
+    """
+    lock_timeout = 5
+    lock_wait = 0.005
+
+    def __init__(self):
+        self.cache = caches[settings.ADMISSION_CACHE_ALIAS]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, math.ceil(timeout))
+
+    @contextmanager
+    def lock(self, performance_id):
+        key = LOCK_KEY.format(performance_id=performance_id)
+        deadline = time.monotonic() + self.lock_timeout
+        while not self.cache.add(key, True, self.lock_timeout):
+            if time.monotonic() > deadline:
+                raise Throttled(detail="The admission queue is busy.")
+            time.sleep(self.lock_wait)
+        try:
+            yield
+        finally:
+            self.cache.delete(key)
+
+
+_stores = {}
+
+
+class AdmissionQueueThrottle(UserRateThrottle):
+    """Rate of queue joins and polls, kept apart from the user rate"""
+
+    scope = "admission_queue"
+
+
+def get_admission_store() -> AdmissionStore:
+    """The configured ADMISSION_STORE, one instance per process"""
+    path = settings.ADMISSION_STORE
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+
+def join_queue(performance, user) -> dict:
+    """Take a slot in the performance queue and describe it"""
+    interval = 60 / performance.admission_rate
+    admit_at = get_admission_store().reserve(
+        performance.id, user.id, interval
+    )
+    token = signing.dumps(
+        {
+            "performance": performance.id,
+            "user": user.id,
+            "admit_at": admit_at,
+            "interval": interval,
+        },
+        salt=QUEUE_TOKEN_SALT,
+    )
+    return queue_status(token, performance.id, user)
+
+
+def read_token(token: str, performance_id: int, user) -> dict:
+    """Return the payload of a valid queue token of this user"""
+    try:
+        payload = signing.loads(token, salt=QUEUE_TOKEN_SALT)
+    except signing.BadSignature:
+        raise PermissionDenied("Invalid queue token.")
+
+    if (
+        payload.get("performance") != performance_id
+        or payload.get("user") != user.id
+    ):
+        raise PermissionDenied(
+            "This queue token belongs to another performance or user."
+        )
+    return payload
+
+
+def queue_status(token: str, performance_id: int, user) -> dict:
+    """Position of a token, computed from the token alone"""
+    payload = read_token(token, performance_id, user)
+    now = _now()
+    wait = max(0.0, payload["admit_at"] - now)
+    return {
+        "token": token,
+        "performance": performance_id,
+        "admitted": wait == 0,
+        "position": math.ceil(wait / payload["interval"]),
+        "wait_seconds": math.ceil(wait),
+        "expires_in_seconds": max(
+            0,
+            math.ceil(
+                payload["admit_at"]
+                + settings.ADMISSION_WINDOW_MINUTES * 60
+                - now
+            ),
+        ),
+    }
+
+
+def check_admission(request, tickets) -> None:
+    """Reject tickets for queued performances unless the queue admitted us.
+
+    Every performance with an ``admission_rate`` needs its own token in the
+    comma separated X-Queue-Token header. Clients still waiting get a 429
+    whose Retry-After is the time left to their slot.
+    """
+    performances = {
+        ticket["performance"].id: ticket["performance"] for ticket in tickets
+    }
+    queued = [
+        performance
+        for performance in performances.values()
+        if performance.admission_rate
+    ]
+    if not queued:
+        return
+
+    header = request.headers.get(QUEUE_TOKEN_HEADER, "")
+    tokens = [token.strip() for token in header.split(",") if token.strip()]
+    for performance in queued:
+        admit_at = None
+        for token in tokens:
+            try:
+                admit_at = read_token(
+                    token, performance.id, request.user
+                )["admit_at"]
+            except PermissionDenied:
+                continue
+            break
+
+        if admit_at is None:
+            raise PermissionDenied(
+                f"Performance {performance.id} admits reservations through "
+                f"its queue: join it and send the token in "
+                f"{QUEUE_TOKEN_HEADER}."
+            )
+
+        now = _now()
+        if now < admit_at:
+            raise Throttled(
+                wait=math.ceil(admit_at - now),
+                detail="You are still waiting in the queue.",
+            )
+        if now > admit_at + settings.ADMISSION_WINDOW_MINUTES * 60:
+            raise PermissionDenied(
+                "Your queue admission has expired; join the queue again."
+            )
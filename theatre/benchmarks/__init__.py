@@ -0,0 +1,167 @@
+"""Benchmarks run with ``python manage.py benchmark <name>``.
+
+Each module registers its benchmarks with ``register``; a benchmark is a
+callable taking the command's options and returning a list of result
+dicts as produced by ``measure``. Results can be saved as a baseline and
+later runs compared against it (see ``compare_to_baseline``).
+"""
+import json
+import statistics
+import time
+from contextlib import ExitStack, contextmanager
+from importlib import import_module
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+BENCHMARK_MODULES = (
+    "theatre.benchmarks.play_filters",
+    "theatre.benchmarks.asgi_vs_wsgi",
+    "theatre.benchmarks.serialization",
+    "theatre.benchmarks.api_load",
+)
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# Latency changes below this are noise whatever the tolerance
+LATENCY_NOISE_MS = 1.0
+
+BENCHMARKS = {}
+
+
+def register(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def load_benchmarks() -> dict:
+    for module in BENCHMARK_MODULES:
+        import_module(module)
+    return BENCHMARKS
+
+
+def percentile(samples, fraction) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(label, timings, **extra) -> dict:
+    """Result dict of a benchmark scenario from its timings in seconds"""
+    return {
+        "label": label,
+        "runs": len(timings),
+        "p50_ms": percentile(timings, 0.5) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        **extra,
+    }
+
+
+def measure(label, func, repeat=50, warmup=3) -> dict:
+    """Time ``func`` and count the queries of its last run"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    with CaptureQueriesContext(connection) as queries:
+        func()
+
+    return summarize(label, timings, queries=len(queries))
+
+
+@contextmanager
+def deployment_settings(*viewsets):
+    """Measure the deployment setup rather than the development one.
+
+    No query log and no sync-only toolbar middleware, which would add a
+    thread hop to every ASGI request, and no user rate throttle on
+    ``viewsets``, which would turn most of the load into 429s.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(
+            override_settings(
+                DEBUG=False,
+                MIDDLEWARE=[
+                    middleware
+                    for middleware in settings.MIDDLEWARE
+                    if not middleware.startswith("debug_toolbar.")
+                ],
+            )
+        )
+        for viewset in viewsets:
+            stack.enter_context(
+                mock.patch.object(viewset, "throttle_classes", ())
+            )
+        yield
+
+
+def baseline_path(name) -> Path:
+    return BASELINE_DIR / f"{name}.json"
+
+
+def save_baseline(path, name, results) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps({"benchmark": name, "results": results}, indent=2) + "\n"
+    )
+
+
+def load_baseline(path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def compare_to_baseline(results, baseline, tolerance) -> list:
+    """Regressions of ``results`` against a saved run, as messages.
+
+    More queries than the baseline always count; p50/p99 latency and
+    throughput only when they are off by more than ``tolerance`` (a
+    fraction) and latency by more than LATENCY_NOISE_MS. Scenarios missing
+    from either run are skipped.
+    """
+    saved = {result["label"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        label = result["label"]
+        before = saved.get(label)
+        if before is None:
+            continue
+
+        queries = result.get("queries")
+        queries_before = before.get("queries")
+        if None not in (queries, queries_before) and queries > queries_before:
+            regressions.append(
+                f"{label}: {queries} queries, baseline {queries_before}"
+            )
+
+        for key in ("p50_ms", "p99_ms"):
+            allowed = max(before[key] * tolerance, LATENCY_NOISE_MS)
+            if result[key] - before[key] > allowed:
+                regressions.append(
+                    f"{label}: {key} {result[key]:.2f}, "
+                    f"baseline {before[key]:.2f}"
+                )
+
+        rps = result.get("throughput_rps")
+        rps_before = before.get("throughput_rps")
+        if None in (rps, rps_before):
+            continue
+        if rps < rps_before * (1 - tolerance):
+            regressions.append(
+                f"{label}: {rps:.1f} req/s, baseline {rps_before:.1f}"
+            )
+    return regressions
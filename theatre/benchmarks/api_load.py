@@ -0,0 +1,249 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.benchmarks import deployment_settings, register, summarize
+from theatre.benchmarks.load_data import LOAD_USER_DOMAIN
+from theatre.cache import expire_responses
+from theatre.models import Performance, Play, Reservation
+from theatre.seat_map import SeatMap
+from theatre.views import (
+    PerformanceViewSet,
+    PlayViewSet,
+    ReservationViewSet,
+    ScheduleViewSet,
+)
+
+
+READ_VIEWS = (PlayViewSet, PerformanceViewSet, ScheduleViewSet)
+
+
+def load_users(count):
+    users = list(
+        get_user_model()
+        .objects.filter(email__endswith=f"@{LOAD_USER_DOMAIN}")
+        .order_by("pk")[:count]
+    )
+    if not users:
+        raise CommandError(
+            "No load data found: run manage.py seed_load_data first"
+        )
+    return users
+
+
+def auth_headers(user) -> dict:
+    return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+
+def target_performance():
+    """The upcoming performance with the most free seats"""
+    performance = (
+        Performance.objects.select_related("theatre_hall")
+        .filter(show_time__gte=timezone.now() + timedelta(days=1))
+        .alias(
+            free_seats=F("theatre_hall__row") * F("theatre_hall__seats_in_row")
+            - F("tickets_sold")
+        )
+        .order_by("-free_seats", "show_time")
+        .first()
+    )
+    if performance is None:
+        raise CommandError("No upcoming performance in the load data")
+    return performance
+
+
+def read_scenarios(performance):
+    play = Play.objects.filter(pk=performance.play_id).first()
+    genre_ids = ",".join(
+        str(pk) for pk in play.genres.values_list("pk", flat=True)
+    )
+    day = timezone.localdate(performance.show_time).isoformat()
+    title_word = play.title.split()[0].lower()
+    plays_url = reverse("theatre:play-list")
+    performances_url = reverse("theatre:performance-list")
+    return [
+        ("plays", plays_url, {}),
+        ("plays by title", plays_url, {"title": title_word}),
+        ("plays by genres", plays_url, {"genres": genre_ids}),
+        ("play detail", reverse("theatre:play-detail", args=[play.pk]), {}),
+        ("performances", performances_url, {}),
+        ("performances by date", performances_url, {"date": day}),
+        (
+            "performance detail",
+            reverse("theatre:performance-detail", args=[performance.pk]),
+            {},
+        ),
+        ("schedule", reverse("theatre:schedule-list"), {"date": day}),
+        ("reservations", reverse("theatre:reservation-list"), {}),
+    ]
+
+
+def run_sequential(label, request, repeat, expire_cache=True):
+    """Time ``request`` and count the queries of one more run.
+
+    The cached responses of the read views expire before every run, so
+    reads measure the views rather than cache hits.
+    """
+    timings = []
+    for _ in range(repeat):
+        if expire_cache:
+            expire_responses(*READ_VIEWS)
+        start = time.perf_counter()
+        request()
+        timings.append(time.perf_counter() - start)
+
+    if expire_cache:
+        expire_responses(*READ_VIEWS)
+    with CaptureQueriesContext(connection) as queries:
+        request()
+
+    return summarize(
+        label,
+        timings,
+        queries=len(queries),
+        throughput_rps=len(timings) / sum(timings),
+    )
+
+
+def free_seats(performance):
+    seat_map = SeatMap.for_performance(performance)
+    return [
+        (row, seat)
+        for row in range(1, seat_map.rows + 1)
+        for seat in range(1, seat_map.seats_in_row + 1)
+        if not seat_map.is_taken(row, seat)
+    ]
+
+
+def booking_payload(performance, seats) -> dict:
+    return {
+        "tickets": [
+            {"row": row, "seat": seat, "performance": performance.pk}
+            for row, seat in seats
+        ]
+    }
+
+
+def run_contention(performance, pool, users, repeat, seed):
+    """Every client books two random seats of the same small pool"""
+    url = reverse("theatre:reservation-list")
+
+    def client_run(index):
+        rng = random.Random(seed + index)
+        client = Client()
+        headers = auth_headers(users[index])
+        outcomes = []
+        for _ in range(repeat):
+            payload = booking_payload(performance, rng.sample(pool, 2))
+            start = time.perf_counter()
+            response = client.post(
+                url, payload, content_type="application/json", headers=headers
+            )
+            outcomes.append(
+                (time.perf_counter() - start, response.status_code)
+            )
+        return outcomes
+
+    # Rejected bookings are the point here, not worth a warning each
+    request_logger = logging.getLogger("django.request")
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(users)) as executor:
+            outcomes = [
+                outcome
+                for client_outcomes in executor.map(
+                    client_run, range(len(users))
+                )
+                for outcome in client_outcomes
+            ]
+    finally:
+        request_logger.setLevel(level)
+    elapsed = time.perf_counter() - start
+
+    booked = sum(status_code == 201 for _, status_code in outcomes)
+    return summarize(
+        f"booking contention x{len(users)}",
+        [timing for timing, _ in outcomes],
+        queries=None,
+        throughput_rps=len(outcomes) / elapsed,
+        notes=f"{booked} booked, {len(outcomes) - booked} rejected",
+    )
+
+
+@register("api")
+def api(options):
+    """Plays, performances and reservations endpoints on seeded data"""
+    users = load_users(options["concurrency"])
+    performance = target_performance()
+    client = Client()
+    headers = auth_headers(users[0])
+    started = timezone.now()
+
+    results = []
+    try:
+        with deployment_settings(
+            PlayViewSet, PerformanceViewSet, ReservationViewSet,
+            ScheduleViewSet,
+        ):
+            for label, path, params in read_scenarios(performance):
+                results.append(
+                    run_sequential(
+                        label,
+                        lambda: client.get(path, params, headers=headers),
+                        options["repeat"],
+                    )
+                )
+
+            # Sequential bookings take seats of their own, so none is
+            # rejected; the contended pool is left for the concurrent run
+            seats = free_seats(performance)
+            pool, seats = seats[: 2 * len(users)], seats[2 * len(users):]
+            if len(pool) < 2 or len(seats) <= options["repeat"]:
+                raise CommandError(
+                    f"Performance {performance.pk} has too few free seats, "
+                    "lower --repeat or --concurrency"
+                )
+            seats = iter(seats)
+            results.append(
+                run_sequential(
+                    "book a seat",
+                    lambda: client.post(
+                        reverse("theatre:reservation-list"),
+                        booking_payload(performance, [next(seats)]),
+                        content_type="application/json",
+                        headers=headers,
+                    ),
+                    options["repeat"],
+                    expire_cache=False,
+                )
+            )
+
+            results.append(
+                run_contention(
+                    performance,
+                    pool,
+                    users,
+                    options["repeat"],
+                    options["seed"],
+                )
+            )
+    finally:
+        # The ticket delete signals give the seats and sold counters back
+        Reservation.objects.filter(
+            user__in=users, created_at__gte=started
+        ).delete()
+    return results
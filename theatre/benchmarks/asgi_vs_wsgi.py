@@ -0,0 +1,105 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.benchmarks import deployment_settings, register, summarize
+from theatre.benchmarks.play_filters import seed_catalogue
+from theatre.cache import expire_responses
+from theatre.models import Actor, Genre, Play
+from theatre.views import PlayViewSet
+
+
+def request_paths(plays, concurrency):
+    """One distinct plays query per concurrent request of a batch"""
+    url = reverse("theatre:play-list")
+    return [
+        f"{url}?title={play.title}"
+        for play in plays[:concurrency]
+    ]
+
+
+def run_wsgi(paths, headers, batches):
+    def fetch(path):
+        start = time.perf_counter()
+        Client().get(path, headers=headers)
+        return time.perf_counter() - start
+
+    timings = []
+    elapsed = 0.0
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        for _ in range(batches):
+            expire_responses(PlayViewSet)
+            start = time.perf_counter()
+            timings.extend(executor.map(fetch, paths))
+            elapsed += time.perf_counter() - start
+    return timings, elapsed
+
+
+async def run_asgi(paths, headers, batches):
+    client = AsyncClient()
+
+    async def fetch(path):
+        start = time.perf_counter()
+        await client.get(path, headers=headers)
+        return time.perf_counter() - start
+
+    timings = []
+    elapsed = 0.0
+    for _ in range(batches):
+        expire_responses(PlayViewSet)
+        start = time.perf_counter()
+        timings.extend(await asyncio.gather(*map(fetch, paths)))
+        elapsed += time.perf_counter() - start
+    return timings, elapsed
+
+
+@register("asgi_vs_wsgi")
+def asgi_vs_wsgi(options):
+    """Concurrent plays list requests: WSGI threads against ASGI"""
+    concurrency = options["concurrency"]
+    # Worker threads use their own connections, so the data is committed
+    # and deleted afterwards instead of rolled back
+    genres, actors, plays = seed_catalogue(
+        plays=max(options["plays"], concurrency),
+        genres=20,
+        actors=200,
+        links_per_play=4,
+    )
+    user = get_user_model().objects.create_user(
+        "benchmark@theatre.invalid", None
+    )
+    headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+    paths = request_paths(plays, concurrency)
+
+    results = []
+    try:
+        with deployment_settings(PlayViewSet):
+            for label, run in (
+                ("wsgi", lambda: run_wsgi(paths, headers, options["repeat"])),
+                (
+                    "asgi",
+                    lambda: asyncio.run(
+                        run_asgi(paths, headers, options["repeat"])
+                    ),
+                ),
+            ):
+                timings, elapsed = run()
+                results.append(
+                    summarize(
+                        f"{label}, {concurrency} concurrent",
+                        timings,
+                        queries=None,
+                        throughput_rps=len(timings) / elapsed,
+                    )
+                )
+    finally:
+        user.delete()
+        Play.objects.filter(pk__in=[play.pk for play in plays]).delete()
+        Genre.objects.filter(pk__in=[genre.pk for genre in genres]).delete()
+        Actor.objects.filter(pk__in=[actor.pk for actor in actors]).delete()
+    return results
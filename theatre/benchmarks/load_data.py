@@ -0,0 +1,215 @@
+"""Realistic data volumes for the API load benchmarks.
+
+Rows are written with ``bulk_create``, which skips the model signals, so
+the derived data they maintain (sold counters, the day schedule, play
+search vectors) is filled in directly.
+"""
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from theatre.bulk_import import batches
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+from theatre.schedule import refresh_schedule
+from theatre.search import update_search_vectors
+
+
+LOAD_USER_DOMAIN = "load.theatre.invalid"
+
+GENRES = [
+    "Drama", "Comedy", "Tragedy", "Musical", "Opera", "Ballet", "Farce",
+    "Satire", "Melodrama", "Cabaret", "Mime", "Puppetry", "Improv",
+    "Burlesque", "Pantomime", "Vaudeville", "Monologue", "Documentary",
+    "Absurdist", "Historical",
+]
+FIRST_NAMES = [
+    "Anna", "Boris", "Clara", "Dmytro", "Eva", "Fedir", "Galyna", "Ivan",
+    "Kateryna", "Lev", "Maria", "Nazar", "Olena", "Petro", "Roman",
+    "Sofia", "Taras", "Uliana", "Viktor", "Yaryna",
+]
+LAST_NAMES = [
+    "Bondar", "Hamlet", "Kovalenko", "Lysenko", "Melnyk", "Moroz",
+    "Oliynyk", "Petrenko", "Rudenko", "Savchenko", "Shevchenko", "Tkachenko",
+    "Vovk", "Zhuk",
+]
+# Matinee, afternoon and evening shows around 19:00
+SHOW_HOUR_OFFSETS = (-7, -4, 0)
+TITLE_WORDS = [
+    "Hamlet", "Night", "Garden", "King", "Storm", "Cherry", "Seagull",
+    "Dream", "Winter", "Mirror", "Forest", "Bridge", "Letter", "Queen",
+    "Summer", "Shadow", "Return", "Island", "Song", "Dance",
+]
+
+
+def _sold_per_performance(rng, halls, performances, tickets):
+    """Hall and sold seats of each performance, summing to ~``tickets``"""
+    average = tickets / max(performances, 1)
+    plan = []
+    for _ in range(performances):
+        hall = rng.choice(halls)
+        sold = round(rng.uniform(0, 2 * average))
+        plan.append((hall, min(sold, hall.capacity)))
+    return plan
+
+
+def _tickets(rng, performances, user_ids):
+    """Reservations of 1-4 seats each, with their tickets"""
+    for performance in performances:
+        hall = performance.theatre_hall
+        seats = rng.sample(range(hall.capacity), performance.tickets_sold)
+        while seats:
+            size = min(rng.randint(1, 4), len(seats))
+            group, seats = seats[:size], seats[size:]
+            reservation = Reservation(user_id=rng.choice(user_ids))
+            yield reservation, [
+                Ticket(
+                    performance=performance,
+                    row=index // hall.seats_in_row + 1,
+                    seat=index % hall.seats_in_row + 1,
+                )
+                for index in group
+            ]
+
+
+def seed_load_data(
+    plays,
+    performances,
+    tickets,
+    users,
+    seed=0,
+    batch_size=5000,
+    log=print,
+) -> dict:
+    """Seed the catalogue, performances and bookings in one transaction"""
+    rng = random.Random(seed)
+    counts = {}
+    with transaction.atomic():
+        genre_objects = Genre.objects.bulk_create(
+            Genre(name=name) for name in GENRES
+        )
+        actor_objects = Actor.objects.bulk_create(
+            Actor(first_name=first_name, last_name=last_name)
+            for first_name in FIRST_NAMES
+            for last_name in LAST_NAMES
+        )
+        play_objects = Play.objects.bulk_create(
+            (
+                Play(
+                    title=" ".join(rng.sample(TITLE_WORDS, 2)) + f" {index}",
+                    description="Generated for the load benchmarks",
+                )
+                for index in range(plays)
+            ),
+            batch_size=batch_size,
+        )
+        Play.genres.through.objects.bulk_create(
+            (
+                Play.genres.through(play_id=play.id, genre_id=genre.id)
+                for play in play_objects
+                for genre in rng.sample(genre_objects, rng.randint(1, 3))
+            ),
+            batch_size=batch_size,
+        )
+        Play.actors.through.objects.bulk_create(
+            (
+                Play.actors.through(play_id=play.id, actor_id=actor.id)
+                for play in play_objects
+                for actor in rng.sample(actor_objects, rng.randint(2, 6))
+            ),
+            batch_size=batch_size,
+        )
+        counts["plays"] = len(play_objects)
+        log(f"Seeded {counts['plays']} plays")
+
+        user_model = get_user_model()
+        password = make_password(None)
+        user_ids = [
+            user.id
+            for user in user_model.objects.bulk_create(
+                (
+                    user_model(
+                        email=f"load{index}@{LOAD_USER_DOMAIN}",
+                        password=password,
+                    )
+                    for index in range(users)
+                ),
+                batch_size=batch_size,
+            )
+        ]
+        counts["users"] = len(user_ids)
+
+        halls = TheatreHall.objects.bulk_create(
+            TheatreHall(
+                name=f"Hall {index + 1}",
+                row=rng.randint(10, 30),
+                seats_in_row=rng.randint(15, 40),
+            )
+            for index in range(20)
+        )
+        first_day = timezone.make_aware(
+            datetime.combine(timezone.localdate(), time(19))
+        )
+        performance_objects = Performance.objects.bulk_create(
+            (
+                Performance(
+                    play=rng.choice(play_objects),
+                    theatre_hall=hall,
+                    show_time=first_day
+                    + timedelta(
+                        days=rng.randrange(365),
+                        hours=rng.choice(SHOW_HOUR_OFFSETS),
+                    ),
+                    tickets_sold=sold,
+                )
+                for hall, sold in _sold_per_performance(
+                    rng, halls, performances, tickets
+                )
+            ),
+            batch_size=batch_size,
+        )
+        counts["performances"] = len(performance_objects)
+        log(f"Seeded {counts['performances']} performances")
+
+        counts["reservations"] = counts["tickets"] = 0
+        for batch in batches(
+            _tickets(rng, performance_objects, user_ids), batch_size // 4
+        ):
+            reservations = Reservation.objects.bulk_create(
+                reservation for reservation, _ in batch
+            )
+            ticket_objects = []
+            for reservation, reservation_tickets in zip(
+                reservations, (group for _, group in batch)
+            ):
+                for ticket in reservation_tickets:
+                    ticket.reservation = reservation
+                ticket_objects.extend(reservation_tickets)
+            Ticket.objects.bulk_create(ticket_objects)
+            counts["reservations"] += len(reservations)
+            counts["tickets"] += len(ticket_objects)
+        log(
+            f"Seeded {counts['tickets']} tickets in "
+            f"{counts['reservations']} reservations"
+        )
+
+        for batch in batches(
+            (performance.id for performance in performance_objects),
+            batch_size,
+        ):
+            refresh_schedule(batch)
+        for batch in batches((play.id for play in play_objects), batch_size):
+            update_search_vectors(batch)
+        log("Built the day schedule and search vectors")
+    return counts
@@ -0,0 +1,113 @@
+import random
+
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from theatre.benchmarks import measure, register
+from theatre.models import Actor, Genre, Play
+from theatre.views import PlayViewSet
+
+
+def seed_catalogue(plays, genres, actors, links_per_play):
+    genre_objects = Genre.objects.bulk_create(
+        Genre(name=f"Genre {index}") for index in range(genres)
+    )
+    actor_objects = Actor.objects.bulk_create(
+        Actor(first_name="Actor", last_name=str(index))
+        for index in range(actors)
+    )
+    play_objects = Play.objects.bulk_create(
+        Play(title=f"Play {index:06}", description="Benchmark play")
+        for index in range(plays)
+    )
+
+    rng = random.Random(0)
+    Play.genres.through.objects.bulk_create(
+        Play.genres.through(play_id=play.id, genre_id=genre.id)
+        for play in play_objects
+        for genre in rng.sample(genre_objects, links_per_play)
+    )
+    Play.actors.through.objects.bulk_create(
+        Play.actors.through(play_id=play.id, actor_id=actor.id)
+        for play in play_objects
+        for actor in rng.sample(actor_objects, links_per_play)
+    )
+    return genre_objects, actor_objects, play_objects
+
+
+def join_distinct_queryset(genres_ids, actors_ids):
+    """The filter PlayViewSet used before switching to EXISTS"""
+    return (
+        Play.objects.prefetch_related("genres", "actors")
+        .filter(genres__id__in=genres_ids, actors__id__in=actors_ids)
+        .distinct()
+        .order_by("title", "id")
+    )
+
+
+def viewset_queryset(params):
+    request = Request(APIRequestFactory().get("/", params))
+    # No action: the list action would read values() rows instead of the
+    # model instances the join baseline returns
+    view = PlayViewSet(request=request, action=None, kwargs={})
+    return view.get_queryset().order_by("title", "id")
+
+
+@register("play_filters")
+def play_filters(options):
+    """JOIN + DISTINCT against EXISTS semi-joins for genre/actor filters"""
+    results = []
+    with transaction.atomic():
+        genres, actors, _ = seed_catalogue(
+            plays=options["plays"],
+            genres=20,
+            actors=200,
+            links_per_play=4,
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        # Broad filters: most plays match several of the ids, which is
+        # where the join fans out and DISTINCT has to fold rows back
+        genres_ids = [genre.id for genre in genres[:10]]
+        actors_ids = [actor.id for actor in actors[:100]]
+        params = {
+            "genres": ",".join(map(str, genres_ids)),
+            "actors": ",".join(map(str, actors_ids)),
+        }
+
+        strategies = [
+            (
+                "join + distinct",
+                lambda: join_distinct_queryset(genres_ids, actors_ids),
+            ),
+            ("exists, match=any", lambda: viewset_queryset(params)),
+            (
+                "semi-join, match=all",
+                lambda: viewset_queryset({**params, "match": "all"}),
+            ),
+        ]
+        # The genre/actor prefetches are the same for every strategy, so
+        # only the filtering query itself is timed
+        for label, queryset in strategies:
+            results.append(
+                measure(
+                    f"{label}: page",
+                    lambda: list(
+                        queryset().prefetch_related(None)[
+                            :options["page_size"]
+                        ]
+                    ),
+                    repeat=options["repeat"],
+                )
+            )
+            results.append(
+                measure(
+                    f"{label}: count",
+                    lambda: queryset().count(),
+                    repeat=options["repeat"],
+                )
+            )
+        transaction.set_rollback(True)
+    return results
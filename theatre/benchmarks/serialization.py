@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from theatre.benchmarks import measure, register
+from theatre.benchmarks.play_filters import seed_catalogue
+from theatre.models import Performance, TheatreHall
+from theatre.renderers import FastJSONRenderer
+from theatre.serializers import PerformanceListSerializer, PlayListSerializer
+from theatre.views import PerformanceViewSet, PlayViewSet
+
+
+def seed_performances(plays, count):
+    hall = TheatreHall.objects.create(
+        name="Benchmark", row=20, seats_in_row=30
+    )
+    start = timezone.now()
+    return Performance.objects.bulk_create(
+        Performance(
+            play=plays[index % len(plays)],
+            theatre_hall=hall,
+            show_time=start + timedelta(hours=index),
+        )
+        for index in range(count)
+    )
+
+
+def page_querysets(viewset, page_size):
+    """The list action's values() page and the model page it replaced"""
+    request = Request(APIRequestFactory().get("/"))
+    view = viewset(request=request, action="list", kwargs={})
+    ordering = view.pagination_class.ordering
+    values = view.get_queryset().order_by(*ordering)[:page_size]
+    instances = view.queryset.order_by(*ordering)[:page_size]
+    return instances, values
+
+
+@register("serialization")
+def serialization(options):
+    """List serializers on instances and values() rows; JSON renderers"""
+    page_size = options["page_size"]
+    results = []
+    with transaction.atomic():
+        _, _, plays = seed_catalogue(
+            plays=max(page_size, 100),
+            genres=20,
+            actors=200,
+            links_per_play=4,
+        )
+        seed_performances(plays, page_size)
+
+        for name, serializer_class, viewset in (
+            ("performances", PerformanceListSerializer, PerformanceViewSet),
+            ("plays", PlayListSerializer, PlayViewSet),
+        ):
+            instances, values = page_querysets(viewset, page_size)
+            for label, queryset in (
+                ("instances", instances),
+                ("values", values),
+            ):
+                results.append(
+                    measure(
+                        f"{name}: {label}",
+                        lambda: serializer_class(
+                            queryset.all(), many=True
+                        ).data,
+                        repeat=options["repeat"],
+                    )
+                )
+
+            data = serializer_class(values.all(), many=True).data
+            for label, renderer_class in (
+                ("json", JSONRenderer),
+                ("fast json", FastJSONRenderer),
+            ):
+                results.append(
+                    measure(
+                        f"{name}: {label}",
+                        lambda: renderer_class().render(data),
+                        repeat=options["repeat"],
+                    )
+                )
+        transaction.set_rollback(True)
+    return results
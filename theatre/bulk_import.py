@@ -0,0 +1,398 @@
+"""Streaming import of a season: genres, actors, plays and performances.
+
+Records come one per CSV row or JSONL line and carry a ``type``:
+
+- ``genre``: ``name``
+- ``actor``: ``first_name``, ``last_name``
+- ``play``: ``title``, ``description``, ``genres`` (names) and ``actors``
+  ("First Last" names); CSV cells separate several names with ``|``
+- ``performance``: ``play`` (title), ``theatre_hall`` (name) and
+  ``show_time`` (ISO 8601, in TIME_ZONE when naive)
+
+Genres, actors and plays are matched by their natural keys (name, full
+name, title) and only created when missing, so re-running an import after a
+failure does not duplicate them; performances already scheduled for the
+same play, hall and time are skipped. Existing plays only gain the genres
+and actors of their records. Theatre halls must exist beforehand.
+
+Records are written in chunks, one transaction each, with bulk inserts
+that skip the model signals, so the derived data the signals maintain
+(day schedule, search vectors, response cache versions) is refreshed per
+chunk. A failing record aborts the import, keeping the earlier chunks.
+"""
+import codecs
+import csv
+import json
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from theatre.models import Actor, Genre, Performance, Play, TheatreHall
+from theatre.schedule import refresh_schedule
+from theatre.search import update_search_vectors
+from theatre.signals import refresh_versions
+
+
+FORMATS = ("csv", "jsonl")
+CSV_LIST_SEPARATOR = "|"
+COUNTS = (
+    "records",
+    "genres",
+    "actors",
+    "plays",
+    "performances",
+    "skipped_performances",
+)
+
+
+class CatalogueImportError(Exception):
+    def __init__(self, line: int, message):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+
+def detect_format(filename: str):
+    """csv or jsonl from a file extension, None when it tells neither"""
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return "csv"
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    return None
+
+
+def _split_names(value):
+    if isinstance(value, list):
+        return value
+    return [
+        name.strip()
+        for name in (value or "").split(CSV_LIST_SEPARATOR)
+        if name.strip()
+    ]
+
+
+def _csv_records(lines):
+    """(line number, record) of every row; quoted newlines are kept"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {
+            key: value
+            for key, value in row.items()
+            if key is not None and value not in (None, "")
+        }
+
+
+def _jsonl_records(lines):
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise CatalogueImportError(line_number, f"Invalid JSON: {error}")
+        if not isinstance(record, dict):
+            raise CatalogueImportError(line_number, "Expected an object")
+        yield line_number, record
+
+
+def read_records(lines, file_format: str):
+    """Parse text lines (or a binary upload) lazily into records"""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown import format: {file_format}")
+    lines = iter(lines)
+    first = next(lines, "")
+    if isinstance(first, bytes):
+        lines = codecs.iterdecode(_chain(first, lines), "utf-8-sig")
+    else:
+        lines = _chain(first.removeprefix("\ufeff"), lines)
+    if file_format == "csv":
+        return _csv_records(lines)
+    return _jsonl_records(lines)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def batches(items, size):
+    """Lists of ``size`` consecutive items, the last one possibly shorter"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _actor_key(line: int, name) -> tuple:
+    first_name, _, last_name = str(name).strip().partition(" ")
+    if not last_name.strip():
+        raise CatalogueImportError(
+            line, f'Actor "{name}" needs a first and a last name'
+        )
+    return first_name, last_name.strip()
+
+
+def _validated(line: int, instance, exclude=()):
+    """Field checks only (length, blank, types); no queries"""
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as error:
+        raise CatalogueImportError(line, error.message_dict)
+    return instance
+
+
+class CatalogueImporter:
+    """Imports record batches, remembering the natural keys it has resolved.
+
+    The lookups (genre name, actor full name, play title and hall name to
+    id) live in memory for the whole import, so every genre or actor is
+    queried or created once however many plays it appears in.
+    """
+
+    def __init__(self, chunk_size: int = 1000, log=None):
+        self.chunk_size = chunk_size
+        self.log = log
+        self.genres = {}
+        self.actors = {}
+        self.plays = {}
+        self.halls = {}
+        self.counts = Counter(dict.fromkeys(COUNTS, 0))
+
+    def run(self, records) -> dict:
+        for chunk in batches(records, self.chunk_size):
+            self.import_chunk(chunk)
+            if self.log:
+                self.log(self.progress())
+        return dict(self.counts)
+
+    def progress(self) -> str:
+        return (
+            f"{self.counts['records']} records: "
+            f"{self.counts['genres']} genres, "
+            f"{self.counts['actors']} actors, "
+            f"{self.counts['plays']} plays, "
+            f"{self.counts['performances']} performances created, "
+            f"{self.counts['skipped_performances']} performances skipped"
+        )
+
+    def import_chunk(self, chunk) -> None:
+        genre_names, actor_keys, plays, performances = self._parse(chunk)
+        # Counts of the rolled back chunk must not be reported
+        counts = self.counts.copy()
+        try:
+            with transaction.atomic():
+                self._resolve_genres(genre_names)
+                self._resolve_actors(actor_keys)
+                play_ids = self._import_plays(plays)
+                performance_ids = self._import_performances(performances)
+
+                refresh_schedule(performance_ids)
+                update_search_vectors(play_ids)
+                refresh_versions(Genre, Actor, Play, Performance)
+        except Exception:
+            self.counts = counts
+            raise
+        self.counts["records"] += len(chunk)
+
+    def _parse(self, chunk):
+        genre_names, actor_keys, plays, performances = set(), set(), [], []
+        for line, record in chunk:
+            record_type = str(record.get("type", "")).strip().lower()
+            if record_type == "genre":
+                genre = _validated(line, Genre(name=record.get("name", "")))
+                genre_names.add(genre.name)
+            elif record_type == "actor":
+                actor = _validated(
+                    line,
+                    Actor(
+                        first_name=record.get("first_name", ""),
+                        last_name=record.get("last_name", ""),
+                    ),
+                )
+                actor_keys.add((actor.first_name, actor.last_name))
+            elif record_type == "play":
+                play = _validated(
+                    line,
+                    Play(
+                        title=record.get("title", ""),
+                        description=record.get("description", ""),
+                    ),
+                    exclude={"image"},
+                )
+                names = _split_names(record.get("genres"))
+                keys = [
+                    _actor_key(line, name)
+                    for name in _split_names(record.get("actors"))
+                ]
+                for name in names:
+                    _validated(line, Genre(name=name))
+                genre_names.update(names)
+                actor_keys.update(keys)
+                plays.append((line, play, names, keys))
+            elif record_type == "performance":
+                performances.append(
+                    (
+                        line,
+                        str(record.get("play", "")).strip(),
+                        str(record.get("theatre_hall", "")).strip(),
+                        self._show_time(line, record.get("show_time")),
+                    )
+                )
+            else:
+                raise CatalogueImportError(
+                    line,
+                    "type must be one of: genre, actor, play, performance",
+                )
+        return genre_names, actor_keys, plays, performances
+
+    @staticmethod
+    def _show_time(line: int, value):
+        try:
+            show_time = parse_datetime(str(value or ""))
+        except ValueError:
+            show_time = None
+        if show_time is None:
+            raise CatalogueImportError(
+                line, "show_time must be an ISO 8601 date and time"
+            )
+        if timezone.is_naive(show_time):
+            show_time = timezone.make_aware(show_time)
+        return show_time
+
+    def _resolve_genres(self, names) -> None:
+        missing = names - self.genres.keys()
+        if not missing:
+            return
+        existing = Genre.objects.filter(name__in=missing).order_by("pk")
+        for name, pk in existing.values_list("name", "pk"):
+            self.genres.setdefault(name, pk)
+        created = Genre.objects.bulk_create(
+            Genre(name=name) for name in missing - self.genres.keys()
+        )
+        self.genres.update((genre.name, genre.pk) for genre in created)
+        self.counts["genres"] += len(created)
+
+    def _resolve_actors(self, keys) -> None:
+        missing = keys - self.actors.keys()
+        if not missing:
+            return
+        existing = Actor.objects.filter(
+            first_name__in={first_name for first_name, _ in missing},
+            last_name__in={last_name for _, last_name in missing},
+        ).order_by("pk")
+        for first_name, last_name, pk in existing.values_list(
+            "first_name", "last_name", "pk"
+        ):
+            self.actors.setdefault((first_name, last_name), pk)
+        created = Actor.objects.bulk_create(
+            Actor(first_name=first_name, last_name=last_name)
+            for first_name, last_name in missing - self.actors.keys()
+        )
+        self.actors.update(
+            ((actor.first_name, actor.last_name), actor.pk)
+            for actor in created
+        )
+        self.counts["actors"] += len(created)
+
+    def _resolve_plays(self, titles) -> None:
+        missing = titles - self.plays.keys()
+        if missing:
+            existing = Play.objects.filter(title__in=missing).order_by("pk")
+            for title, pk in existing.values_list("title", "pk"):
+                self.plays.setdefault(title, pk)
+
+    def _import_plays(self, plays) -> set:
+        """Create the missing plays and link all of them; returns their ids"""
+        self._resolve_plays({play.title for _, play, _, _ in plays})
+        new_plays = {}
+        for _, play, _, _ in plays:
+            if play.title not in self.plays:
+                new_plays.setdefault(play.title, play)
+        created = Play.objects.bulk_create(new_plays.values())
+        self.plays.update((play.title, play.pk) for play in created)
+        self.counts["plays"] += len(created)
+
+        Play.genres.through.objects.bulk_create(
+            (
+                Play.genres.through(
+                    play_id=self.plays[play.title],
+                    genre_id=self.genres[name],
+                )
+                for _, play, names, _ in plays
+                for name in names
+            ),
+            ignore_conflicts=True,
+        )
+        Play.actors.through.objects.bulk_create(
+            (
+                Play.actors.through(
+                    play_id=self.plays[play.title],
+                    actor_id=self.actors[key],
+                )
+                for _, play, _, keys in plays
+                for key in keys
+            ),
+            ignore_conflicts=True,
+        )
+        return {self.plays[play.title] for _, play, _, _ in plays}
+
+    def _resolve_halls(self, names) -> None:
+        missing = names - self.halls.keys()
+        if missing:
+            existing = TheatreHall.objects.filter(name__in=missing)
+            for name, pk in existing.order_by("pk").values_list("name", "pk"):
+                self.halls.setdefault(name, pk)
+
+    def _import_performances(self, performances) -> list:
+        """Create the performances not scheduled yet; returns their ids"""
+        if not performances:
+            return []
+        self._resolve_plays({play for _, play, _, _ in performances})
+        self._resolve_halls({hall for _, _, hall, _ in performances})
+
+        new_performances = []
+        for line, play, hall, show_time in performances:
+            if play not in self.plays:
+                raise CatalogueImportError(line, f'Unknown play "{play}"')
+            if hall not in self.halls:
+                raise CatalogueImportError(
+                    line, f'Unknown theatre hall "{hall}"'
+                )
+            new_performances.append(
+                Performance(
+                    play_id=self.plays[play],
+                    theatre_hall_id=self.halls[hall],
+                    show_time=show_time,
+                )
+            )
+
+        scheduled = set(
+            Performance.objects.filter(
+                play_id__in={p.play_id for p in new_performances},
+                show_time__in={p.show_time for p in new_performances},
+            ).values_list("play_id", "theatre_hall_id", "show_time")
+        )
+        unique_performances = []
+        for performance in new_performances:
+            key = (
+                performance.play_id,
+                performance.theatre_hall_id,
+                performance.show_time,
+            )
+            if key not in scheduled:
+                scheduled.add(key)
+                unique_performances.append(performance)
+
+        created = Performance.objects.bulk_create(unique_performances)
+        self.counts["performances"] += len(created)
+        self.counts["skipped_performances"] += (
+            len(performances) - len(created)
+        )
+        return [performance.pk for performance in created]
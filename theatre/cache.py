@@ -0,0 +1,216 @@
+import functools
+import hashlib
+import time
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+VERSION_KEY = "theatre:version:{label}"
+RESPONSE_KEY = "theatre:response:{digest}"
+STATS_KEY = "theatre:response_cache:{stat}"
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def model_label(model) -> str:
+    return model._meta.label_lower
+
+
+def get_versions(models) -> dict:
+    """Return the current version stamp of each model, creating missing ones.
+
+    A fresh stamp is the current time in milliseconds, so a stamp evicted
+    from the cache never comes back with a value used before.
+    """
+    cache = get_cache()
+    keys = {VERSION_KEY.format(label=model_label(model)) for model in models}
+    versions = cache.get_many(keys)
+    for key in keys - versions.keys():
+        cache.add(key, time.time_ns() // 1_000_000, timeout=None)
+        versions[key] = cache.get(key)
+    return versions
+
+
+def bump_versions(*models) -> None:
+    """Invalidate everything cached from the given models"""
+    cache = get_cache()
+    for model in models:
+        key = VERSION_KEY.format(label=model_label(model))
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns() // 1_000_000, timeout=None)
+
+
+def expire_responses(*views) -> None:
+    """Make every cached response of the given views miss.
+
+    Only their models' version stamps move; the rest of the cache, such as
+    seat maps, holds and throttle counters, is left alone.
+    """
+    models = set()
+    for view in views:
+        models.update(getattr(view, "cache_models", ()))
+    bump_versions(*models)
+
+
+def _count(stat: str) -> None:
+    cache = get_cache()
+    key = STATS_KEY.format(stat=stat)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def response_cache_stats() -> dict:
+    cache = get_cache()
+    keys = {stat: STATS_KEY.format(stat=stat) for stat in ("hits", "misses")}
+    values = cache.get_many(keys.values())
+    return {stat: values.get(key, 0) for stat, key in keys.items()}
+
+
+def _request_digest(view, request, kwargs, versions, *extra) -> str:
+    key_parts = [
+        type(view).__name__,
+        view.action,
+        request.scheme,
+        request.get_host(),
+        repr(sorted(kwargs.items())),
+        repr(view.get_cache_params(request)),
+        repr(sorted(versions.items())),
+        *extra,
+    ]
+    return hashlib.sha256("|".join(key_parts).encode()).hexdigest()
+
+
+def _wrap(handler, before, after):
+    """Decorate a sync or async action with cache steps around it.
+
+    ``before(view, request, kwargs)`` returns ``(state, response)`` and
+    short-circuits the action when the response is not None;
+    ``after(state, response)`` finishes the action's response. For async
+    actions both steps, which may hit a network cache, run off the event
+    loop.
+    """
+    if iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(self, request, *args, **kwargs):
+            state, response = await sync_to_async(before)(
+                self, request, kwargs
+            )
+            if response is not None:
+                return response
+            response = await handler(self, request, *args, **kwargs)
+            return await sync_to_async(after)(state, response)
+
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        state, response = before(self, request, kwargs)
+        if response is not None:
+            return response
+        return after(state, handler(self, request, *args, **kwargs))
+
+    return wrapper
+
+
+def _lookup_response(view, request, kwargs):
+    versions = get_versions(view.cache_models)
+    digest = _request_digest(view, request, kwargs, versions)
+    key = RESPONSE_KEY.format(digest=digest)
+
+    data = get_cache().get(key)
+    if data is not None:
+        _count("hits")
+        return key, Response(data, headers={"X-Cache": "HIT"})
+
+    _count("misses")
+    return key, None
+
+
+def _store_response(key, response):
+    if response.status_code == status.HTTP_200_OK:
+        get_cache().set(
+            key, response.data, settings.RESPONSE_CACHE_TIMEOUT
+        )
+    response["X-Cache"] = "MISS"
+    return response
+
+
+def cache_response(handler):
+    """Serve a list/retrieve action from the cache while its data is unchanged.
+
+    The key covers the view, the action, its url kwargs, the normalized
+    query params (see ``get_cache_params``), the host the absolute urls are
+    built for, and the versions of the viewset's ``cache_models``. Saving or
+    deleting any of those models bumps its version, so stale entries are
+    never read again and simply expire. Only ``response.data`` is stored;
+    rendering still runs per request, so every format shares one entry.
+    """
+    return _wrap(handler, _lookup_response, _store_response)
+
+
+def _parse_etags(header: str) -> set:
+    return {
+        etag.strip().removeprefix("W/")
+        for etag in header.split(",")
+        if etag.strip()
+    }
+
+
+def _check_etag(view, request, kwargs):
+    versions = get_versions(view.cache_models)
+    etag = '"{}"'.format(
+        _request_digest(
+            view, request, kwargs, versions, request.accepted_media_type
+        )
+    )
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and etag in _parse_etags(if_none_match):
+        return etag, Response(
+            status=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag},
+        )
+    return etag, None
+
+
+def _set_etag(etag, response):
+    if response.status_code == status.HTTP_200_OK:
+        response["ETag"] = etag
+    return response
+
+
+def conditional_response(handler):
+    """Answer If-None-Match with 304 before any query or serialization runs.
+
+    The ETag is derived from the same key as ``cache_response`` plus the
+    negotiated media type, so it changes exactly when the viewset's
+    ``cache_models`` versions do, and computing it needs no database access.
+    """
+    return _wrap(handler, _check_etag, _set_etag)
+
+
+class CachedResponseMixin:
+    """Declares the models a viewset's responses are built from.
+
+    Their version stamps key ``cache_response`` entries and the ETags of
+    ``conditional_response``.
+    """
+    cache_models = ()
+
+    def get_cache_params(self, request):
+        return sorted(
+            (name, tuple(request.query_params.getlist(name)))
+            for name in request.query_params
+        )
@@ -0,0 +1,83 @@
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+
+HOLD_KEY = "theatre:hold:{token}"
+SEAT_KEY = "theatre:seat_hold:{performance_id}:{row}:{seat}"
+
+
+class SeatsUnavailable(Exception):
+    def __init__(self, seats):
+        super().__init__(seats)
+        self.seats = seats
+
+
+def seat_key(seat: dict) -> str:
+    return SEAT_KEY.format(
+        performance_id=seat["performance"], row=seat["row"], seat=seat["seat"]
+    )
+
+
+class SeatHoldStore:
+    """Short-lived seat holds kept in the cache instead of the tickets table.
+
+    Every held seat is one cache key claimed with an atomic ``add`` and
+    carrying the hold's TTL, so expired holds simply vanish on their own
+    and nothing has to sweep them. Seats are plain dicts with
+    ``performance`` (an id), ``row`` and ``seat``.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.SEAT_HOLD_CACHE_ALIAS]
+
+    def hold(self, user_id: int, seats: list, minutes: int) -> dict:
+        """Claim all seats or none; raises SeatsUnavailable with the losers"""
+        token = secrets.token_urlsafe(16)
+        timeout = minutes * 60
+        claimed, conflicts = [], []
+        for seat in seats:
+            if self.cache.add(seat_key(seat), token, timeout):
+                claimed.append(seat)
+            else:
+                conflicts.append(seat)
+
+        if conflicts:
+            self._release_seats(token, claimed)
+            raise SeatsUnavailable(conflicts)
+
+        hold = {
+            "token": token,
+            "user_id": user_id,
+            "tickets": seats,
+            "expires_at": timezone.now() + timedelta(seconds=timeout),
+        }
+        self.cache.set(HOLD_KEY.format(token=token), hold, timeout)
+        return hold
+
+    def get(self, token: str):
+        return self.cache.get(HOLD_KEY.format(token=token))
+
+    def release(self, hold: dict) -> None:
+        self._release_seats(hold["token"], hold["tickets"])
+        self.cache.delete(HOLD_KEY.format(token=hold["token"]))
+
+    def held_by_others(self, seats: list, token: str = None) -> set:
+        """Indexes of the seats held under a token other than ``token``"""
+        keys = [seat_key(seat) for seat in seats]
+        holders = self.cache.get_many(keys)
+        return {
+            index
+            for index, key in enumerate(keys)
+            if key in holders and holders[key] != token
+        }
+
+    def _release_seats(self, token: str, seats: list) -> None:
+        keys = [seat_key(seat) for seat in seats]
+        holders = self.cache.get_many(keys)
+        self.cache.delete_many(
+            [key for key in keys if holders.get(key) == token]
+        )
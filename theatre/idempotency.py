@@ -0,0 +1,118 @@
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY = "theatre:idempotency:{user_id}:{digest}"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+PENDING = "pending"
+COMPLETED = "completed"
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = (
+        "A request with this Idempotency-Key is still being processed."
+    )
+    default_code = "request_in_progress"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = (
+        "This Idempotency-Key was already used with a different request."
+    )
+    default_code = "idempotency_key_reused"
+
+
+def get_cache():
+    return caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+
+
+def _fingerprint(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{request.method}|{request.path}|{body}".encode()
+    ).hexdigest()
+
+
+def idempotent(handler):
+    """Run a create action at most once per Idempotency-Key header.
+
+    The key is scoped to the user. A cache ``add`` claims it before the
+    handler runs, so a concurrent retry gets a 409 instead of a second
+    transaction. Successful responses are stored for
+    IDEMPOTENCY_KEY_TIMEOUT and replayed as is; failures release the key so
+    the client may retry. Reusing a key for a different payload is a 422.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ValidationError(
+                {
+                    IDEMPOTENCY_HEADER: (
+                        f"Ensure this header has no more than "
+                        f"{IDEMPOTENCY_KEY_MAX_LENGTH} characters."
+                    )
+                }
+            )
+
+        cache = get_cache()
+        cache_key = IDEMPOTENCY_KEY.format(
+            user_id=request.user.pk,
+            digest=hashlib.sha256(key.encode()).hexdigest(),
+        )
+        fingerprint = _fingerprint(request)
+
+        pending = {"state": PENDING, "fingerprint": fingerprint}
+        if not cache.add(
+            cache_key, pending, settings.IDEMPOTENCY_PENDING_TIMEOUT
+        ):
+            entry = cache.get(cache_key)
+            if entry is not None:
+                if entry["fingerprint"] != fingerprint:
+                    raise IdempotencyKeyReused()
+                if entry["state"] == PENDING:
+                    raise RequestInProgress()
+                return Response(
+                    entry["data"],
+                    status=entry["status"],
+                    headers={"Idempotent-Replayed": "true"},
+                )
+            # Expired between add and get: claim it again
+            cache.set(cache_key, pending, settings.IDEMPOTENCY_PENDING_TIMEOUT)
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if status.is_success(response.status_code):
+            cache.set(
+                cache_key,
+                {
+                    "state": COMPLETED,
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                },
+                settings.IDEMPOTENCY_KEY_TIMEOUT,
+            )
+        else:
+            cache.delete(cache_key)
+        return response
+
+    return wrapper
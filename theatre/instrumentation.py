@@ -0,0 +1,327 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+logger = logging.getLogger(__name__)
+
+# name: (help, settings name of the buckets)
+HISTOGRAMS = {
+    "request_duration_seconds": (
+        "Time from the first to the last middleware",
+        "METRICS_LATENCY_BUCKETS",
+    ),
+    "db_duration_seconds": (
+        "Time spent executing SQL",
+        "METRICS_LATENCY_BUCKETS",
+    ),
+    "render_duration_seconds": (
+        "Time spent rendering the response body",
+        "METRICS_LATENCY_BUCKETS",
+    ),
+    "serialize_duration_seconds": (
+        "Time spent in serializers, less their SQL",
+        "METRICS_LATENCY_BUCKETS",
+    ),
+    "db_queries": ("SQL queries executed", "METRICS_QUERY_BUCKETS"),
+}
+
+# The request being handled; sync_to_async copies it into worker threads,
+# so queries of async views are attributed too
+_current = ContextVar("theatre_request_metrics", default=None)
+
+
+class RequestMetrics:
+    """What a single request has spent so far"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.statements = Counter()
+
+    def rendered(self, response):
+        self.render_time = time.perf_counter() - self.render_started
+
+    def repeated_statements(self) -> list:
+        """SQL run at least METRICS_N_PLUS_ONE_THRESHOLD times"""
+        threshold = settings.METRICS_N_PLUS_ONE_THRESHOLD
+        return [
+            (sql, count)
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper charging queries to the current request"""
+    request_metrics = _current.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.db_time += time.perf_counter() - start
+        request_metrics.queries += 1
+        request_metrics.statements[sql] += 1
+
+
+@contextmanager
+def serializing():
+    """Charges the time of the block, less its SQL, to the current request.
+
+    Nested blocks are part of the outermost one and are not counted again.
+    """
+    request_metrics = _current.get()
+    if request_metrics is None or request_metrics.serializing:
+        yield
+        return
+    request_metrics.serializing = True
+    start, db_time = time.perf_counter(), request_metrics.db_time
+    try:
+        yield
+    finally:
+        request_metrics.serializing = False
+        request_metrics.serialize_time += (
+            time.perf_counter() - start - (request_metrics.db_time - db_time)
+        )
+
+
+class SerializerTimingMixin:
+    """Charges the representation of the view's serializers to the request.
+
+    Every serializer from ``get_serializer`` represents its instance inside
+    ``serializing()``, so each action reports its own
+    ``serialize_duration_seconds``.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed_representation(instance):
+            with serializing():
+                return to_representation(instance)
+
+        # Read by ``data`` before the class attribute
+        serializer.to_representation = timed_representation
+        return serializer
+
+
+def install_query_recorder(connection) -> None:
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_representation(self) -> dict:
+        cumulative, buckets = 0, []
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            buckets.append([bound, cumulative])
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class MetricsRegistry:
+    """Histograms of the requests handled by this process, per view action.
+
+    Every worker process keeps its own registry, so the exported series are
+    labelled with the process id.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def _view(self, view) -> dict:
+        if view not in self._views:
+            self._views[view] = {
+                "histograms": {
+                    name: Histogram(getattr(settings, buckets_setting))
+                    for name, (_, buckets_setting) in HISTOGRAMS.items()
+                },
+                "n_plus_one": 0,
+            }
+        return self._views[view]
+
+    def observe(self, view, request_metrics, duration, n_plus_one) -> None:
+        with self._lock:
+            entry = self._view(view)
+            histograms = entry["histograms"]
+            histograms["request_duration_seconds"].observe(duration)
+            histograms["db_duration_seconds"].observe(request_metrics.db_time)
+            histograms["render_duration_seconds"].observe(
+                request_metrics.render_time
+            )
+            histograms["serialize_duration_seconds"].observe(
+                request_metrics.serialize_time
+            )
+            histograms["db_queries"].observe(request_metrics.queries)
+            entry["n_plus_one"] += n_plus_one
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "views": {
+                    view: {
+                        "histograms": {
+                            name: histogram.to_representation()
+                            for name, histogram in entry["histograms"].items()
+                        },
+                        "n_plus_one": entry["n_plus_one"],
+                    }
+                    for view, entry in sorted(self._views.items())
+                },
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+metrics = MetricsRegistry()
+
+
+def view_label(request):
+    """``ViewSet.action`` of the resolved view, None for unresolved paths"""
+    match = request.resolver_match
+    if match is None:
+        return None
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return match.view_name
+    method = request.method.lower()
+    actions = getattr(match.func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(method, method)}"
+
+
+def prometheus_text(snapshot) -> str:
+    """The Prometheus text exposition of a ``MetricsRegistry.snapshot``"""
+    pid = snapshot["pid"]
+    lines = []
+    for name, (help_text, _) in HISTOGRAMS.items():
+        lines.append(f"# HELP theatre_{name} {help_text}")
+        lines.append(f"# TYPE theatre_{name} histogram")
+        for view, entry in snapshot["views"].items():
+            labels = f'view="{view}",pid="{pid}"'
+            histogram = entry["histograms"][name]
+            for bound, count in histogram["buckets"]:
+                lines.append(
+                    f'theatre_{name}_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines.append(f"theatre_{name}_sum{{{labels}}} {histogram['sum']}")
+            lines.append(
+                f"theatre_{name}_count{{{labels}}} {histogram['count']}"
+            )
+
+    lines.append(
+        "# HELP theatre_n_plus_one_total "
+        "Requests repeating an identical SQL statement"
+    )
+    lines.append("# TYPE theatre_n_plus_one_total counter")
+    for view, entry in snapshot["views"].items():
+        lines.append(
+            f'theatre_n_plus_one_total{{view="{view}",pid="{pid}"}} '
+            f"{entry['n_plus_one']}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentationMiddleware:
+    """Records latency, queries, DB, serializer and render time per action.
+
+    Histograms are exported by the metrics endpoint (see MetricsView), and
+    requests running the same SQL METRICS_N_PLUS_ONE_THRESHOLD times or
+    more are logged as likely N+1 queries. Set METRICS_ENABLED to False to
+    take the middleware out of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Under ASGI Django would run a sync hook in a worker thread
+            self.process_template_response = self._aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, request_metrics)
+        return response
+
+    @staticmethod
+    def _start_render(response):
+        request_metrics = _current.get()
+        if request_metrics is not None:
+            request_metrics.render_started = time.perf_counter()
+            response.add_post_render_callback(request_metrics.rendered)
+        return response
+
+    def process_template_response(self, request, response):
+        return self._start_render(response)
+
+    async def _aprocess_template_response(self, request, response):
+        return self._start_render(response)
+
+    @staticmethod
+    def _finish(request, request_metrics) -> None:
+        duration = time.perf_counter() - request_metrics.started
+        view = view_label(request)
+        if view is None:
+            return
+        repeated = request_metrics.repeated_statements()
+        for sql, count in repeated:
+            logger.warning(
+                "Possible N+1 in %s: %d identical queries: %s",
+                view,
+                count,
+                sql,
+            )
+        metrics.observe(view, request_metrics, duration, bool(repeated))
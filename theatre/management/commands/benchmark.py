@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from theatre.benchmarks import (
+    baseline_path,
+    compare_to_baseline,
+    load_baseline,
+    load_benchmarks,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a benchmark from theatre.benchmarks and print p50/p99 latency "
+        "and queries per run. Seeded data is removed afterwards. With "
+        "--baseline, fail when a scenario regressed against a saved run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", nargs="?", help="Benchmark to run")
+        parser.add_argument("--list", action="store_true")
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--plays", type=int, default=5000)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Simultaneous requests of the load benchmarks",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed of the load benchmarks",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            nargs="?",
+            const="",
+            metavar="PATH",
+            help="Save the results, by default to benchmarks/baselines",
+        )
+        parser.add_argument(
+            "--baseline",
+            nargs="?",
+            const="",
+            metavar="PATH",
+            help="Compare the results with a saved baseline",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed latency and throughput change, as a fraction",
+        )
+
+    def handle(self, *args, **options):
+        benchmarks = load_benchmarks()
+        if options["list"] or not options["name"]:
+            for name, func in sorted(benchmarks.items()):
+                self.stdout.write(f"{name}: {func.__doc__}")
+            return
+
+        if options["name"] not in benchmarks:
+            raise CommandError(f"Unknown benchmark {options['name']!r}")
+
+        name = options["name"]
+        baseline = None
+        if options["baseline"] is not None:
+            path = options["baseline"] or baseline_path(name)
+            try:
+                baseline = load_baseline(path)
+            except FileNotFoundError:
+                raise CommandError(f"No baseline at {path}")
+
+        results = benchmarks[name](options)
+        throughput = any("throughput_rps" in result for result in results)
+        self.stdout.write(
+            f"{'scenario':<30}{'p50 ms':>10}{'p99 ms':>10}{'queries':>10}"
+            + (f"{'req/s':>10}" if throughput else "")
+        )
+        for result in results:
+            queries = result["queries"]
+            self.stdout.write(
+                f"{result['label']:<30}"
+                f"{result['p50_ms']:>10.2f}"
+                f"{result['p99_ms']:>10.2f}"
+                f"{'-' if queries is None else queries:>10}"
+                + (
+                    f"{result['throughput_rps']:>10.1f}"
+                    if throughput
+                    else ""
+                )
+            )
+            if "notes" in result:
+                self.stdout.write(f"{'':<30}{result['notes']}")
+
+        if options["save_baseline"] is not None:
+            path = options["save_baseline"] or baseline_path(name)
+            save_baseline(path, name, results)
+            self.stdout.write(f"Saved baseline to {path}")
+
+        if baseline is not None:
+            regressions = compare_to_baseline(
+                results, baseline, options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Regressed against the baseline:\n"
+                    + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions"))
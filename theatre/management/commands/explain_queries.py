@@ -0,0 +1,102 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from theatre.views import (
+    PerformanceViewSet,
+    PlayViewSet,
+    ReservationViewSet,
+)
+
+
+# (label, viewset, action, query params) of the hot read paths
+SCENARIOS = [
+    ("plays", PlayViewSet, "list", {}),
+    ("plays by title", PlayViewSet, "list", {"title": "ham"}),
+    ("plays by genres", PlayViewSet, "list", {"genres": "1,2"}),
+    ("plays by actors", PlayViewSet, "list", {"actors": "1,2"}),
+    ("performances", PerformanceViewSet, "list", {}),
+    (
+        "performances by date",
+        PerformanceViewSet,
+        "list",
+        {"date": "2030-01-01"},
+    ),
+    (
+        "performances in range",
+        PerformanceViewSet,
+        "list",
+        {"from": "2030-01-01", "to": "2030-01-31"},
+    ),
+    ("upcoming performances", PerformanceViewSet, "list", {"upcoming": "1"}),
+    ("performances by play", PerformanceViewSet, "list", {"play": "1"}),
+    ("reservations", ReservationViewSet, "list", {}),
+]
+
+SEQUENTIAL_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (\w+)(?! USING)"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the typical queries of the theatre viewsets and flag "
+        "sequential scans. Run it against a database holding realistic "
+        "volumes: planners prefer sequential scans on small tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fail-on-seq-scan",
+            action="store_true",
+            help="Exit with an error if any scenario uses a sequential scan",
+        )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        user = get_user_model().objects.order_by("pk").first()
+        flagged = []
+
+        for label, viewset_class, action, params in SCENARIOS:
+            if viewset_class is ReservationViewSet and user is None:
+                self.stdout.write(f"Skipping {label}: no users to filter by")
+                continue
+
+            request = Request(factory.get("/", params))
+            request.user = user
+            view = viewset_class(request=request, action=action, kwargs={})
+            queryset = view.get_queryset()
+            if view.paginator is not None:
+                queryset = queryset[:view.paginator.get_page_size(request)]
+
+            plan = queryset.explain()
+            scans = self._sequential_scans(queryset.db, plan)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            for table in scans:
+                self.stdout.write(
+                    self.style.WARNING(f"Sequential scan on {table}")
+                )
+                flagged.append((label, table))
+
+        if flagged and options["fail_on_seq_scan"]:
+            raise CommandError(
+                "Sequential scans found: "
+                + ", ".join(f"{label} ({table})" for label, table in flagged)
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(flagged)} sequential scan(s) found")
+        )
+
+    @staticmethod
+    def _sequential_scans(using, plan):
+        pattern = SEQUENTIAL_SCAN_PATTERNS.get(connections[using].vendor)
+        if pattern is None:
+            return []
+        return pattern.findall(plan)
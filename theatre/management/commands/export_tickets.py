@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from theatre.bulk_export import FORMATS, export_lines, export_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream sold tickets with their reservation, user, performance, "
+        "play and hall as CSV or JSONL to stdout"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=date.fromisoformat,
+            help="Only tickets reserved on or after this day (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=date.fromisoformat,
+            help="Only tickets reserved on or before this day (YYYY-MM-DD)",
+        )
+        parser.add_argument("--performance", type=int)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Rows fetched from the cursor at a time",
+        )
+
+    def handle(self, *args, **options):
+        queryset = export_queryset(
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            performance_id=options["performance"],
+        )
+        for line in export_lines(
+            queryset, options["format"], options["chunk_size"]
+        ):
+            self.stdout.write(line, ending="")
@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from theatre.bulk_import import (
+    FORMATS,
+    CatalogueImporter,
+    CatalogueImportError,
+    detect_format,
+    read_records,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import genres, actors, plays and performances from a CSV or JSONL "
+        "file (see theatre.bulk_import for the record layout)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - for stdin")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Defaults to the file extension",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Records written per transaction",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or detect_format(path)
+        if file_format is None:
+            raise CommandError(
+                "Cannot tell the format from the file name; pass --format"
+            )
+
+        importer = CatalogueImporter(
+            chunk_size=options["chunk_size"], log=self.stdout.write
+        )
+        try:
+            if path == "-":
+                importer.run(read_records(sys.stdin, file_format))
+            else:
+                with open(path, encoding="utf-8", newline="") as lines:
+                    importer.run(read_records(lines, file_format))
+        except OSError as error:
+            raise CommandError(error)
+        except CatalogueImportError as error:
+            raise CommandError(
+                f"{error}. Imported before it: {importer.progress()}"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {importer.progress()}")
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from theatre.cache import bump_versions
+from theatre.models import Performance, ScheduleEntry
+from theatre.schedule import refresh_schedule
+from theatre.views import ScheduleViewSet
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized day schedule from the performances"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Performances refreshed per upsert",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        performance_ids = list(
+            Performance.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        # Entries of performances deleted behind the signals' back
+        removed, _ = ScheduleEntry.objects.exclude(
+            performance__in=Performance.objects.all()
+        ).delete()
+
+        refreshed = 0
+        for start in range(0, len(performance_ids), chunk_size):
+            refreshed += refresh_schedule(
+                performance_ids[start:start + chunk_size]
+            )
+        # Cached and ETag'd schedule responses still hold the old rows
+        bump_versions(*ScheduleViewSet.cache_models)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {refreshed} schedule entries, "
+                f"removed {removed}"
+            )
+        )
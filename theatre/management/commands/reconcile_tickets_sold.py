@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from theatre.models import Performance, Ticket
+from theatre.schedule import refresh_schedule
+from theatre.signals import refresh_versions
+
+
+def sold_tickets_subquery():
+    return Coalesce(
+        Subquery(
+            Ticket.objects.filter(performance=OuterRef("pk"))
+            .order_by()
+            .values("performance")
+            .annotate(sold=Count("id"))
+            .values("sold")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recount Performance.tickets_sold from the tickets table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report performances whose counter has drifted",
+        )
+
+    def handle(self, *args, **options):
+        drifted = (
+            Performance.objects.annotate(actual_sold=sold_tickets_subquery())
+            .exclude(tickets_sold=F("actual_sold"))
+            .values_list("id", "tickets_sold", "actual_sold")
+        )
+
+        fixed = []
+        for performance_id, tickets_sold, actual_sold in drifted:
+            self.stdout.write(
+                f"Performance {performance_id}: "
+                f"tickets_sold={tickets_sold}, actual={actual_sold}"
+            )
+            if not options["dry_run"]:
+                # Recount in the UPDATE itself so concurrent bookings
+                # between the check and the write are not lost
+                Performance.objects.filter(pk=performance_id).update(
+                    tickets_sold=sold_tickets_subquery()
+                )
+            fixed.append(performance_id)
+
+        if fixed and not options["dry_run"]:
+            # The bulk UPDATEs send no signals: bring the day schedule and
+            # the cached performance responses along
+            refresh_schedule(fixed)
+            refresh_versions(Performance, Ticket)
+
+        verb = "Found" if options["dry_run"] else "Reconciled"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {len(fixed)} drifted performance(s)")
+        )
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from theatre.benchmarks.load_data import LOAD_USER_DOMAIN, seed_load_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed plays, performances, users and tickets at production-like "
+        "volumes for the api benchmark. Use a dedicated database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plays", type=int, default=2000)
+        parser.add_argument("--performances", type=int, default=20000)
+        parser.add_argument(
+            "--tickets",
+            type=int,
+            default=1000000,
+            help="Approximate number of sold tickets",
+        )
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk insert",
+        )
+
+    def handle(self, *args, **options):
+        if get_user_model().objects.filter(
+            email__endswith=f"@{LOAD_USER_DOMAIN}"
+        ).exists():
+            raise CommandError("Load data has already been seeded")
+
+        counts = seed_load_data(
+            plays=options["plays"],
+            performances=options["performances"],
+            tickets=options["tickets"],
+            users=options["users"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                ", ".join(f"{count} {name}" for name, count in counts.items())
+            )
+        )
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_sold_tickets(apps, schema_editor):
+    Performance = apps.get_model("theatre", "Performance")
+    Ticket = apps.get_model("theatre", "Ticket")
+    using = schema_editor.connection.alias
+    sold = (
+        Ticket.objects.using(using)
+        .filter(performance=OuterRef("pk"))
+        .order_by()
+        .values("performance")
+        .annotate(sold=Count("id"))
+        .values("sold")
+    )
+    Performance.objects.using(using).update(
+        tickets_sold=Coalesce(Subquery(sold), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theatre", "0004_play_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="tickets_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_sold_tickets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:48
+
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_title_trigram_index(apps, schema_editor):
+    # icontains compiles to UPPER("title"::text) LIKE UPPER(...) on
+    # PostgreSQL, which only a trigram index on that expression can serve
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            # Servers without contrib keep using sequential title scans
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS play_title_trgm_idx "
+        'ON theatre_play USING gin (UPPER("title") gin_trgm_ops)'
+    )
+
+
+def drop_title_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS play_title_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theatre", "0005_performance_tickets_sold"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="performance",
+            index=models.Index(
+                fields=["play", "show_time"], name="performance_play_show_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="performance",
+            index=models.Index(
+                django.db.models.functions.datetime.TruncDate("show_time"),
+                name="performance_show_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["user", "-created_at"], name="reservation_user_created_idx"
+            ),
+        ),
+        migrations.RunPython(
+            create_title_trigram_index, drop_title_trigram_index
+        ),
+    ]
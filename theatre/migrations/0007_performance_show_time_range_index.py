@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theatre", "0006_access_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="performance",
+            name="performance_show_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="performance",
+            index=models.Index(fields=["show_time"], name="performance_show_time_idx"),
+        ),
+    ]
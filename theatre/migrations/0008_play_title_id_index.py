@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theatre", "0007_performance_show_time_range_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="play",
+            index=models.Index(fields=["title", "id"], name="play_title_id_idx"),
+        ),
+    ]
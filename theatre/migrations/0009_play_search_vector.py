@@ -0,0 +1,75 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:54
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import TextField, Value
+
+
+def search_vector(title, description, genre_names, actor_names):
+    # Frozen copy of theatre.search.build_search_vector as of this migration
+    parts = [
+        (title, "A"),
+        (" ".join([*genre_names, *actor_names]), "B"),
+        (description, "C"),
+    ]
+    vector = None
+    for text, weight in parts:
+        part = SearchVector(
+            Value(text, output_field=TextField()),
+            weight=weight,
+            config="english",
+        )
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def index_play_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS play_search_vector_idx "
+        "ON theatre_play USING gin (search_vector)"
+    )
+
+    Play = apps.get_model("theatre", "Play")
+    using = schema_editor.connection.alias
+    plays = Play.objects.using(using).prefetch_related("genres", "actors")
+    for play in plays.iterator(chunk_size=500):
+        Play.objects.using(using).filter(pk=play.pk).update(
+            search_vector=search_vector(
+                play.title,
+                play.description,
+                [genre.name for genre in play.genres.all()],
+                [
+                    f"{actor.first_name} {actor.last_name}"
+                    for actor in play.actors.all()
+                ],
+            )
+        )
+
+
+def drop_play_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS play_search_vector_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theatre", "0008_play_title_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="play",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            index_play_search_vectors, drop_play_search_vector_index
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theatre", "0009_play_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="admission_rate",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
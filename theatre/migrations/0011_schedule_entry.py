@@ -0,0 +1,89 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:23
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+
+
+def schedule_entries(entry_model, performances):
+    for performance in performances:
+        hall = performance.theatre_hall
+        capacity = hall.row * hall.seats_in_row
+        yield entry_model(
+            performance_id=performance.pk,
+            day=timezone.localdate(performance.show_time),
+            show_time=performance.show_time,
+            play_id=performance.play_id,
+            play_title=performance.play.title,
+            theatre_hall_name=hall.name,
+            theatre_hall_capacity=capacity,
+            tickets_available=capacity - performance.tickets_sold,
+        )
+
+
+def build_schedule(apps, schema_editor):
+    Performance = apps.get_model("theatre", "Performance")
+    ScheduleEntry = apps.get_model("theatre", "ScheduleEntry")
+    using = schema_editor.connection.alias
+    performances = (
+        Performance.objects.using(using)
+        .select_related("play", "theatre_hall")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    entries = schedule_entries(ScheduleEntry, performances)
+    # Only one batch of entries is held in memory at a time
+    while batch := list(islice(entries, BATCH_SIZE)):
+        ScheduleEntry.objects.using(using).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theatre", "0010_performance_admission_rate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleEntry",
+            fields=[
+                (
+                    "performance",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="schedule_entry",
+                        serialize=False,
+                        to="theatre.performance",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("show_time", models.DateTimeField()),
+                ("play_title", models.CharField(max_length=255)),
+                ("theatre_hall_name", models.CharField(max_length=255)),
+                ("theatre_hall_capacity", models.PositiveIntegerField()),
+                ("tickets_available", models.IntegerField()),
+                (
+                    "play",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="theatre.play",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "show_time", "performance"],
+                "indexes": [
+                    models.Index(
+                        fields=["day", "show_time"], name="schedule_day_show_time_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_schedule, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,16 @@
 import os
 import uuid
+from typing import NamedTuple
 
 from django.utils.text import slugify
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Concat
 
 
 class Actor(models.Model):
@@ -19,6 +24,13 @@ class Actor(models.Model):
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
+    @staticmethod
+    def full_name_expression(prefix: str = ""):
+        """``full_name`` computed in SQL, of the actor at ``prefix``"""
+        return Concat(
+            f"{prefix}first_name", Value(" "), f"{prefix}last_name"
+        )
+
 
 class Genre(models.Model):
     name = models.CharField(max_length=255)
@@ -38,9 +50,15 @@ class Play(models.Model):
     genres = models.ManyToManyField(Genre)
     actors = models.ManyToManyField(Actor)
     image = models.ImageField(null=True, upload_to=movie_image_path)
+    # Weighted title/genres/actors/description document, kept current by
+    # theatre.signals; only populated on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["title"]
+        indexes = [
+            models.Index(fields=["title", "id"], name="play_title_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -63,6 +81,52 @@ class Performance(models.Model):
     play = models.ForeignKey(Play, on_delete=models.CASCADE, related_name="performances")
     theatre_hall = models.ForeignKey(TheatreHall, on_delete=models.CASCADE, related_name="performances")
     show_time = models.DateTimeField()
+    # Maintained by the tickets_booked/tickets_released signal receivers;
+    # `manage.py reconcile_tickets_sold` repairs any drift
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    # Clients admitted per minute through the waiting room; empty disables it
+    admission_rate = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["play", "show_time"],
+                name="performance_play_show_time_idx",
+            ),
+            models.Index(
+                fields=["show_time"], name="performance_show_time_idx"
+            ),
+        ]
+
+
+class ScheduleEntry(models.Model):
+    """Denormalized row of the day schedule, one per performance.
+
+    Kept current by theatre.signals (see theatre.schedule); rebuild it with
+    `manage.py rebuild_schedule`.
+    """
+    performance = models.OneToOneField(
+        Performance,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="schedule_entry",
+    )
+    # show_time's date in TIME_ZONE
+    day = models.DateField()
+    show_time = models.DateTimeField()
+    play = models.ForeignKey(Play, on_delete=models.CASCADE, related_name="+")
+    play_title = models.CharField(max_length=255)
+    theatre_hall_name = models.CharField(max_length=255)
+    theatre_hall_capacity = models.PositiveIntegerField()
+    tickets_available = models.IntegerField()
+
+    class Meta:
+        ordering = ["day", "show_time", "performance"]
+        indexes = [
+            models.Index(
+                fields=["day", "show_time"], name="schedule_day_show_time_idx"
+            ),
+        ]
 
 
 class Reservation(models.Model):
@@ -74,6 +138,47 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="reservation_user_created_idx",
+            ),
+        ]
+
+
+SEAT_TAKEN_MESSAGE = (
+    "The fields performance, row, seat must make a unique set."
+)
+
+HALL_DIMENSIONS_CACHE_KEY = "theatre:hall_dimensions:{performance_id}"
+
+
+class HallDimensions(NamedTuple):
+    """Row and seat counts of the hall a performance is played in"""
+    row: int
+    seats_in_row: int
+
+    @classmethod
+    def for_performance(cls, performance_id: int) -> "HallDimensions":
+        key = HALL_DIMENSIONS_CACHE_KEY.format(performance_id=performance_id)
+        dimensions = cache.get(key)
+        if dimensions is None:
+            dimensions = tuple(
+                Performance.objects.filter(pk=performance_id)
+                .values_list("theatre_hall__row", "theatre_hall__seats_in_row")
+                .get()
+            )
+            cache.set(key, dimensions, settings.SEAT_MAP_CACHE_TIMEOUT)
+        return cls(*dimensions)
+
+
+def invalidate_hall_dimensions(performance_ids) -> None:
+    cache.delete_many(
+        [
+            HALL_DIMENSIONS_CACHE_KEY.format(performance_id=performance_id)
+            for performance_id in set(performance_ids)
+        ]
+    )
 
 
 class Ticket(models.Model):
@@ -99,11 +204,55 @@ class Ticket(models.Model):
                     }
                 )
 
+    @staticmethod
+    def validate_seats_available(tickets, error_to_raise):
+        """Checks a batch of unsaved tickets for taken seats in one query"""
+        seats_lookup = Q()
+        for ticket in tickets:
+            seats_lookup |= Q(
+                performance_id=ticket.performance_id,
+                row=ticket.row,
+                seat=ticket.seat,
+            )
+        taken_seats = set(
+            Ticket.objects.filter(seats_lookup).order_by().values_list(
+                "performance_id", "row", "seat"
+            )
+        )
+
+        errors = []
+        for ticket in tickets:
+            seat_key = (ticket.performance_id, ticket.row, ticket.seat)
+            if seat_key in taken_seats:
+                errors.append({"non_field_errors": [SEAT_TAKEN_MESSAGE]})
+            else:
+                errors.append({})
+            taken_seats.add(seat_key)
+
+        if any(errors):
+            raise error_to_raise({"tickets": errors})
+
+    def _hall_dimensions(self):
+        """The hall's size, from loaded relations or the cache if possible"""
+        if (
+            Ticket.performance.is_cached(self)
+            and Performance.theatre_hall.is_cached(self.performance)
+        ):
+            return self.performance.theatre_hall
+        try:
+            return HallDimensions.for_performance(self.performance_id)
+        except Performance.DoesNotExist:
+            raise ValidationError(
+                {"performance": "Select a valid performance."}
+            )
+
     def clean(self):
+        if self.performance_id is None:
+            return
         Ticket.validate_ticket(
             self.row,
             self.seat,
-            self.performance.theatre_hall,
+            self._hall_dimensions(),
             ValidationError,
         )
 
@@ -113,10 +262,56 @@ class Ticket(models.Model):
             force_update=False,
             using=None,
             update_fields=None,
+            validate=True,
     ):
-        self.full_clean()
-        return super(Ticket, self).save(
-            force_insert, force_update, using, update_fields
+        """Validate without queries where possible, then save.
+
+        Unlike full_clean this skips the foreign key lookups, which the
+        database enforces anyway, and leaves seat uniqueness to the unique
+        constraint: a violation is reported as the same ValidationError
+        validate_unique would raise. Trusted writers whose data is already
+        validated (forms, imports) pass ``validate=False``; their save runs
+        no lookup and opens no savepoint.
+        """
+        if not validate:
+            return super().save(
+                force_insert, force_update, using, update_fields
+            )
+
+        self.clean_fields(exclude={"performance", "reservation"})
+        self.clean()
+
+        # The savepoint lets a violated seat constraint be reported while
+        # an outer transaction carries on
+        using = using or router.db_for_write(Ticket, instance=self)
+        try:
+            with transaction.atomic(using=using):
+                return super(Ticket, self).save(
+                    force_insert, force_update, using, update_fields
+                )
+        except IntegrityError:
+            if not self._seat_taken(using):
+                raise
+            raise ValidationError(
+                {
+                    NON_FIELD_ERRORS: [
+                        self.unique_error_message(
+                            Ticket, ("performance", "row", "seat")
+                        )
+                    ]
+                }
+            )
+
+    def _seat_taken(self, using) -> bool:
+        return (
+            Ticket.objects.using(using)
+            .filter(
+                performance_id=self.performance_id,
+                row=self.row,
+                seat=self.seat,
+            )
+            .exclude(pk=self.pk)
+            .exists()
         )
 
     def __str__(self):
@@ -0,0 +1,81 @@
+from rest_framework import renderers
+
+from theatre.instrumentation import prometheus_text
+from theatre.seat_events import format_event
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, see FastJSONRenderer
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed.
+
+    The output is JSON equivalent to the compact JSONRenderer's: it
+    decodes to the same values. Values orjson does not encode natively
+    (datetimes, decimals, lazy strings, ...) go through DRF's own encoder,
+    and anything orjson rejects outright, such as oversized integers,
+    falls back to JSONRenderer. The bytes can still differ for floats,
+    which orjson writes in its own shortest form (``1e16``, not
+    ``1e+16``), and for NaN and infinities, which orjson writes as null
+    where JSONRenderer raises. Indented output for the browsable API is
+    always left to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=(
+                    orjson.OPT_PASSTHROUGH_DATETIME
+                    | orjson.OPT_PASSTHROUGH_DATACLASS
+                ),
+            )
+        except TypeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # Same escaping as JSONRenderer, which keeps the output valid JS
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """Negotiates text/event-stream; only errors are rendered through it.
+
+    Streams build their events themselves, so the data reaching this
+    renderer is an error detail, sent as a single ``error`` event.
+    """
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_event("error", data).encode(self.charset)
+
+
+class PrometheusRenderer(renderers.BaseRenderer):
+    """Prometheus text exposition of a MetricsRegistry snapshot"""
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        if response is not None and response.exception:
+            return f"# {data}\n".encode(self.charset)
+        return prometheus_text(data).encode(self.charset)
@@ -0,0 +1,62 @@
+from collections import Counter
+
+from django.db.models import F
+from django.utils import timezone
+
+from theatre.models import Performance, ScheduleEntry
+
+
+SCHEDULE_FIELDS = [
+    "day",
+    "show_time",
+    "play",
+    "play_title",
+    "theatre_hall_name",
+    "theatre_hall_capacity",
+    "tickets_available",
+]
+
+
+def schedule_entry(performance) -> ScheduleEntry:
+    capacity = performance.theatre_hall.capacity
+    return ScheduleEntry(
+        performance_id=performance.pk,
+        day=timezone.localdate(performance.show_time),
+        show_time=performance.show_time,
+        play_id=performance.play_id,
+        play_title=performance.play.title,
+        theatre_hall_name=performance.theatre_hall.name,
+        theatre_hall_capacity=capacity,
+        tickets_available=capacity - performance.tickets_sold,
+    )
+
+
+def refresh_schedule(performance_ids, using: str = "default") -> int:
+    """Recompute the schedule entries of the given performances.
+
+    One read joining play and hall, and one upsert for all of them.
+    """
+    performances = (
+        Performance.objects.using(using)
+        .filter(pk__in=performance_ids)
+        .select_related("play", "theatre_hall")
+    )
+    entries = [schedule_entry(performance) for performance in performances]
+    ScheduleEntry.objects.using(using).bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["performance"],
+        update_fields=SCHEDULE_FIELDS,
+    )
+    return len(entries)
+
+
+def shift_tickets_available(
+    tickets, sign: int, using: str = "default"
+) -> None:
+    """Follow bookings (sign -1) and releases (sign 1) without a rebuild"""
+    changes = Counter(ticket.performance_id for ticket in tickets)
+    for performance_id, count in changes.items():
+        ScheduleEntry.objects.using(using).filter(
+            performance_id=performance_id
+        ).update(tickets_available=F("tickets_available") + sign * count)
@@ -0,0 +1,110 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    TextField,
+    Value,
+    When,
+)
+
+from theatre.models import Actor, Genre, Play
+
+
+SEARCH_CONFIG = "english"
+
+
+def full_text_search_supported(using: str) -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def build_search_vector(title, description, genre_names, actor_names):
+    """Weights title over genres and cast, and those over the description"""
+    parts = [
+        (title, "A"),
+        (" ".join([*genre_names, *actor_names]), "B"),
+        (description, "C"),
+    ]
+    vector = None
+    for text, weight in parts:
+        part = SearchVector(
+            Value(text, output_field=TextField()),
+            weight=weight,
+            config=SEARCH_CONFIG,
+        )
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vectors(play_ids, using: str = "default") -> None:
+    """Recompute the stored search document of the given plays"""
+    if not play_ids or not full_text_search_supported(using):
+        return
+
+    plays = list(
+        Play.objects.using(using)
+        .filter(pk__in=play_ids)
+        .prefetch_related("genres", "actors")
+    )
+    for play in plays:
+        play.search_vector = build_search_vector(
+            play.title,
+            play.description,
+            [genre.name for genre in play.genres.all()],
+            [actor.full_name for actor in play.actors.all()],
+        )
+    # One UPDATE ... CASE for all of them, which bulk imports rely on
+    Play.objects.using(using).bulk_update(plays, ["search_vector"])
+
+
+def search_plays(queryset, term: str):
+    """Filter plays matching ``term`` and order them by relevance.
+
+    PostgreSQL matches the precomputed ``search_vector`` and ranks with
+    ts_rank. Other databases (SQLite in tests) fall back to substring
+    matches ranked title > genre/actor > description.
+    """
+    if full_text_search_supported(queryset.db):
+        query = SearchQuery(
+            term, search_type="websearch", config=SEARCH_CONFIG
+        )
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "title", "id")
+        )
+
+    genre_match = Exists(
+        Genre.objects.filter(play=OuterRef("pk"), name__icontains=term)
+    )
+    actor_match = Exists(
+        Actor.objects.annotate(
+            searched_name=Actor.full_name_expression()
+        ).filter(play=OuterRef("pk"), searched_name__icontains=term)
+    )
+    title_match = Q(title__icontains=term)
+    return (
+        queryset.filter(
+            title_match
+            | Q(genre_match)
+            | Q(actor_match)
+            | Q(description__icontains=term)
+        )
+        .annotate(
+            rank=Case(
+                When(title_match, then=Value(3)),
+                When(Q(genre_match) | Q(actor_match), then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("-rank", "title", "id")
+    )
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from theatre.seat_map import SeatMap
+
+
+SEAT_TAKEN = "seat-taken"
+SEAT_RELEASED = "seat-released"
+RESYNC = "resync"
+
+
+class Subscription:
+    """Events of one performance for one streaming client.
+
+    ``put`` may be called from any thread. Subscriptions made on an event
+    loop are read with ``aget``, the others with ``get``. When a slow
+    client lets the buffer fill up, further events are dropped and a
+    single resync is delivered instead.
+    """
+
+    def __init__(self, performance_id, loop=None):
+        self.performance_id = performance_id
+        self.loop = loop
+        self.overflowed = False
+        maxsize = settings.SEAT_EVENTS_BUFFER_SIZE
+        if loop is None:
+            self.queue = queue.Queue(maxsize)
+        else:
+            self.queue = asyncio.Queue(maxsize)
+
+    def put(self, event: dict) -> None:
+        if self.loop is None:
+            self._put(event)
+        else:
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (queue.Full, asyncio.QueueFull):
+            self.overflowed = True
+
+    def _next(self, event):
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {"type": RESYNC}
+        return event
+
+    def get(self, timeout: float):
+        """The next event, or None after ``timeout`` seconds without one"""
+        try:
+            event = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            event = None
+        return self._next(event)
+
+    async def aget(self, timeout: float):
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            event = None
+        return self._next(event)
+
+
+class SeatEventBroadcaster:
+    """Fans seat changes out to the streaming clients of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, performance_id, loop=None) -> Subscription:
+        subscription = Subscription(performance_id, loop)
+        with self._lock:
+            self._subscriptions[performance_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions[subscription.performance_id]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.performance_id]
+
+    def subscriber_count(self, performance_id) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(performance_id, ()))
+
+    def publish(self, performance_id, event: dict) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(performance_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+broadcaster = SeatEventBroadcaster()
+
+
+class StreamsUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many seat event streams are open, retry later."
+    default_code = "streams_unavailable"
+
+    @property
+    def wait(self) -> int:
+        # Sent as Retry-After by the DRF exception handler
+        return max(1, settings.SEAT_EVENTS_RETRY_MS // 1000)
+
+
+class ThreadStreamLimit:
+    """Caps the streams of this process that each hold a worker thread.
+
+    Under WSGI a stream occupies its thread until it ends, so at most
+    SEAT_EVENTS_WSGI_MAX_STREAMS may be open at once; under ASGI streams
+    wait on the event loop and are not limited.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = 0
+
+    def events(self, stream) -> "ThreadStreamEvents":
+        """Iterate ``stream`` in a slot, raising StreamsUnavailable if full"""
+        with self._lock:
+            if self._open >= settings.SEAT_EVENTS_WSGI_MAX_STREAMS:
+                raise StreamsUnavailable()
+            self._open += 1
+        return ThreadStreamEvents(self, stream)
+
+    def release(self) -> None:
+        with self._lock:
+            self._open -= 1
+
+    @property
+    def open_count(self) -> int:
+        with self._lock:
+            return self._open
+
+
+class ThreadStreamEvents:
+    """Events of a stream holding a ThreadStreamLimit slot until closed.
+
+    The response closes it even when it was never iterated, which a
+    generator's ``finally`` would miss.
+    """
+
+    def __init__(self, limit: ThreadStreamLimit, stream):
+        self._limit = limit
+        self._events = iter(stream)
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._events)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            self._limit.release()
+
+
+thread_streams = ThreadStreamLimit()
+
+
+def format_event(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+class SeatEventStream:
+    """Server-sent events of the seat occupancy of a performance.
+
+    A stream opens with a snapshot of the cached seat map, then forwards
+    the seats booked and released through this process. Between events it
+    compares its copy with the cached seat map every heartbeat, which also
+    picks up writes handled by other worker processes; a heartbeat
+    without changes is a comment line that keeps proxies from closing the
+    connection. Streams end after SEAT_EVENTS_MAX_STREAM_SECONDS and
+    clients reconnect on their own.
+    """
+
+    def __init__(self, performance):
+        self.performance = performance
+        self.seat_map = None
+
+    def _snapshot(self, seat_map) -> str:
+        self.seat_map = seat_map
+        return (
+            f"retry: {settings.SEAT_EVENTS_RETRY_MS}\n"
+            + format_event("snapshot", seat_map.to_representation())
+        )
+
+    def _apply(self, event) -> str:
+        taking = event["type"] == SEAT_TAKEN
+        seats = [
+            (row, seat)
+            for row, seat in event["seats"]
+            if 1 <= row <= self.seat_map.rows
+            and 1 <= seat <= self.seat_map.seats_in_row
+            and self.seat_map.is_taken(row, seat) != taking
+        ]
+        for row, seat in seats:
+            if taking:
+                self.seat_map.take(row, seat)
+            else:
+                self.seat_map.release(row, seat)
+        if not seats:
+            return ""
+        return format_event(event["type"], {"seats": seats})
+
+    def _resync(self, seat_map) -> str:
+        if seat_map.rows != self.seat_map.rows or (
+            seat_map.seats_in_row != self.seat_map.seats_in_row
+        ):
+            return self._snapshot(seat_map)
+        if seat_map.bits == self.seat_map.bits:
+            return ": keep-alive\n\n"
+
+        taken, released = [], []
+        for row in range(1, seat_map.rows + 1):
+            for seat in range(1, seat_map.seats_in_row + 1):
+                now_taken = seat_map.is_taken(row, seat)
+                if now_taken != self.seat_map.is_taken(row, seat):
+                    (taken if now_taken else released).append((row, seat))
+        return self._apply(
+            {"type": SEAT_TAKEN, "seats": taken}
+        ) + self._apply({"type": SEAT_RELEASED, "seats": released})
+
+    def _handle(self, event, load_seat_map):
+        if event is None:
+            return self._resync(load_seat_map())
+        if event["type"] == RESYNC:
+            return self._snapshot(load_seat_map())
+        return self._apply(event)
+
+    @staticmethod
+    def _deadline() -> float:
+        return time.monotonic() + settings.SEAT_EVENTS_MAX_STREAM_SECONDS
+
+    def _seat_map(self):
+        return SeatMap.for_performance(self.performance)
+
+    def __iter__(self):
+        subscription = broadcaster.subscribe(self.performance.id)
+        try:
+            yield self._snapshot(self._seat_map())
+            deadline = self._deadline()
+            while time.monotonic() < deadline:
+                event = subscription.get(
+                    settings.SEAT_EVENTS_HEARTBEAT_SECONDS
+                )
+                message = self._handle(event, self._seat_map)
+                if message:
+                    yield message
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    async def __aiter__(self):
+        subscription = broadcaster.subscribe(
+            self.performance.id, asyncio.get_running_loop()
+        )
+        load_seat_map = sync_to_async(self._seat_map)
+        try:
+            yield self._snapshot(await load_seat_map())
+            deadline = self._deadline()
+            while time.monotonic() < deadline:
+                event = await subscription.aget(
+                    settings.SEAT_EVENTS_HEARTBEAT_SECONDS
+                )
+                if event is None or event["type"] == RESYNC:
+                    seat_map = await load_seat_map()
+                    message = self._handle(event, lambda: seat_map)
+                else:
+                    message = self._apply(event)
+                if message:
+                    yield message
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+
+def publish_seat_changes(event_type: str, tickets) -> None:
+    seats = defaultdict(list)
+    for ticket in tickets:
+        seats[ticket.performance_id].append([ticket.row, ticket.seat])
+    for performance_id, performance_seats in seats.items():
+        broadcaster.publish(
+            performance_id, {"type": event_type, "seats": performance_seats}
+        )
+
+
+def publish_resync(performance_ids) -> None:
+    for performance_id in set(performance_ids):
+        broadcaster.publish(performance_id, {"type": RESYNC})
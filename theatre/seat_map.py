@@ -0,0 +1,159 @@
+import base64
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from theatre.models import Ticket
+
+
+SEAT_MAP_CACHE_KEY = "theatre:seat_map:{performance_id}:{version}"
+SEAT_MAP_VERSION_KEY = "theatre:seat_map_version:{performance_id}"
+
+
+def seat_map_version(performance_id: int) -> int:
+    """Generation of a performance's seat map; see invalidate_seat_maps"""
+    key = SEAT_MAP_VERSION_KEY.format(performance_id=performance_id)
+    version = cache.get(key)
+    if version is None:
+        # Milliseconds, so an evicted generation never comes back
+        cache.add(key, time.time_ns() // 1_000_000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+class SeatMap:
+    """Seat occupancy of a performance packed into one bit per seat.
+
+    Seats are numbered row by row: the bit for (row, seat) has the index
+    (row - 1) * seats_in_row + (seat - 1), and the first seat of a byte is
+    its most significant bit.
+    """
+
+    def __init__(self, rows: int, seats_in_row: int, bits: bytes = None):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        size = (rows * seats_in_row + 7) // 8
+        self.bits = bytearray(bits) if bits is not None else bytearray(size)
+
+    def _position(self, row: int, seat: int) -> tuple[int, int]:
+        if not (1 <= row <= self.rows and 1 <= seat <= self.seats_in_row):
+            raise IndexError(f"No seat {seat} in row {row}")
+        index = (row - 1) * self.seats_in_row + seat - 1
+        return index // 8, 0x80 >> (index % 8)
+
+    def is_taken(self, row: int, seat: int) -> bool:
+        byte, mask = self._position(row, seat)
+        return bool(self.bits[byte] & mask)
+
+    def take(self, row: int, seat: int) -> None:
+        byte, mask = self._position(row, seat)
+        self.bits[byte] |= mask
+
+    def release(self, row: int, seat: int) -> None:
+        byte, mask = self._position(row, seat)
+        self.bits[byte] &= ~mask
+
+    def free_intervals(self, row: int, excluded=()) -> list[tuple[int, int]]:
+        """Runs of adjacent free seats in a row as (first, last) pairs.
+
+        Seats in ``excluded`` ((row, seat) pairs) count as taken.
+        """
+        intervals = []
+        start = None
+        for seat in range(1, self.seats_in_row + 1):
+            if self.is_taken(row, seat) or (row, seat) in excluded:
+                if start is not None:
+                    intervals.append((start, seat - 1))
+                    start = None
+            elif start is None:
+                start = seat
+        if start is not None:
+            intervals.append((start, self.seats_in_row))
+        return intervals
+
+    def best_available(self, count: int, excluded=()):
+        """Pick ``count`` adjacent free seats, or None if no row has them.
+
+        Blocks are centred in their free interval as much as it allows and
+        ranked by how many rows plus seats they are away from the middle of
+        the hall, front rows winning ties.
+        """
+        middle_row = (self.rows + 1) / 2
+        middle_seat = (self.seats_in_row + 1) / 2
+        best = None
+        for row in range(1, self.rows + 1):
+            for first, last in self.free_intervals(row, excluded):
+                if last - first + 1 < count:
+                    continue
+                start = round(middle_seat - (count - 1) / 2)
+                start = min(max(start, first), last - count + 1)
+                score = (
+                    abs(row - middle_row)
+                    + abs(start + (count - 1) / 2 - middle_seat),
+                    row,
+                )
+                if best is None or score < best[0]:
+                    best = (score, row, start)
+        if best is None:
+            return None
+        _, row, start = best
+        return [(row, seat) for seat in range(start, start + count)]
+
+    @property
+    def taken_count(self) -> int:
+        return sum(byte.bit_count() for byte in self.bits)
+
+    def to_representation(self) -> dict:
+        return {
+            "rows": self.rows,
+            "seats_in_row": self.seats_in_row,
+            "taken": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def for_performance(cls, performance) -> "SeatMap":
+        """Return the cached seat map, rebuilding it from tickets on a miss.
+
+        The map is keyed by the performance's seat map generation, read
+        before the tickets are. A rebuild that raced a booking is stored
+        under the generation the booking's commit has since replaced, so it
+        is never served.
+        """
+        hall = performance.theatre_hall
+        key = SEAT_MAP_CACHE_KEY.format(
+            performance_id=performance.id,
+            version=seat_map_version(performance.id),
+        )
+
+        cached = cache.get(key)
+        if cached is not None and cached[:2] == (hall.row, hall.seats_in_row):
+            return cls(*cached)
+
+        seat_map = cls(hall.row, hall.seats_in_row)
+        seats = Ticket.objects.filter(performance=performance).order_by()
+        for row, seat in seats.values_list("row", "seat"):
+            if row <= hall.row and seat <= hall.seats_in_row:
+                seat_map.take(row, seat)
+
+        cache.set(
+            key,
+            (seat_map.rows, seat_map.seats_in_row, bytes(seat_map.bits)),
+            settings.SEAT_MAP_CACHE_TIMEOUT,
+        )
+        return seat_map
+
+
+def invalidate_seat_maps(performance_ids) -> None:
+    """Move the performances to a new seat map generation.
+
+    Call it once the ticket changes are committed: maps cached under older
+    generations, including rebuilds still in flight, are never read again
+    and simply expire.
+    """
+    for performance_id in set(performance_ids):
+        key = SEAT_MAP_VERSION_KEY.format(performance_id=performance_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns() // 1_000_000, timeout=None)
@@ -1,5 +1,13 @@
-from django.db import transaction
+from asgiref.sync import sync_to_async
+from async_property import async_property
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from theatre.models import (
     Genre,
@@ -8,8 +16,146 @@ from theatre.models import (
     TheatreHall,
     Performance,
     Reservation,
-    Ticket
+    Ticket,
+    ScheduleEntry,
+    SEAT_TAKEN_MESSAGE,
 )
+from theatre.bulk_import import (
+    FORMATS,
+    CatalogueImporter,
+    CatalogueImportError,
+    detect_format,
+    read_records,
+)
+from theatre.holds import SeatHoldStore, SeatsUnavailable
+from theatre.seat_map import SeatMap, invalidate_seat_maps
+from theatre.signals import tickets_booked
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Looks up every pk once per serializer tree instead of once per item"""
+
+    def to_internal_value(self, data):
+        related_objects = self.context.setdefault("related_objects", {})
+        key = (self.get_queryset().model, str(data))
+        if key not in related_objects:
+            related_objects[key] = super().to_internal_value(data)
+        return related_objects[key]
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Looks up all pks of a to-many relation with a single query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        relation = self.child_relation
+        queryset = relation.get_queryset()
+        pks = []
+        for item in data:
+            if isinstance(item, bool):
+                relation.fail("incorrect_type", data_type="bool")
+            try:
+                pks.append(queryset.model._meta.pk.to_python(item))
+            except (DjangoValidationError, TypeError):
+                relation.fail(
+                    "incorrect_type", data_type=type(item).__name__
+                )
+
+        related_objects = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in related_objects:
+                relation.fail("does_not_exist", pk_value=pk)
+        return [related_objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field whose ``many=True`` form is a BulkManyRelatedField"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """Serializes the dict rows of a ``values()`` queryset.
+
+    The child names the columns it reads in ``values_fields`` and
+    ``values_expressions`` (see ``values_queryset``) and may fill in the
+    remaining fields of a page in ``complete_rows``. Selected columns still
+    go through the child's field ``to_representation``, so the output is
+    the same as for model instances, without instantiating models or
+    resolving attribute sources. Instances are serialized as usual.
+    """
+    rows_completed = False
+
+    @async_property
+    async def adata(self):
+        """``data`` of a page, completing its rows through the async ORM.
+
+        What is left is plain Python, so it runs on the event loop. Pages
+        of model instances may still query, and are serialized in a thread.
+        """
+        rows = self.instance
+        if not rows or not isinstance(rows[0], dict):
+            return await sync_to_async(lambda: self.data)()
+        await self.child.acomplete_rows(rows)
+        self.rows_completed = True
+        return self.data
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        rows = list(data)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        child = self.child
+        if not self.rows_completed:
+            child.complete_rows(rows)
+        selected = {*child.values_fields, *child.values_expressions}
+        fields = [
+            (field.field_name, field if field.field_name in selected else None)
+            for field in child._readable_fields
+        ]
+        return [
+            {
+                name: (
+                    row[name]
+                    if field is None or row[name] is None
+                    else field.to_representation(row[name])
+                )
+                for name, field in fields
+            }
+            for row in rows
+        ]
+
+
+class ValuesSerializerMixin:
+    """Declares the ``values()`` read path of a ``ValuesListSerializer``"""
+    values_fields = ()
+    values_expressions = {}
+
+    @classmethod
+    def values_queryset(cls, queryset):
+        return queryset.prefetch_related(None).values(
+            *cls.values_fields, **cls.values_expressions
+        )
+
+    @classmethod
+    def complete_rows(cls, rows) -> None:
+        """Adds the fields that are not columns, already represented"""
+
+    @classmethod
+    async def acomplete_rows(cls, rows) -> None:
+        """``complete_rows`` through the async ORM; override them together"""
 
 
 class ActorSerializer(serializers.ModelSerializer):
@@ -25,6 +171,8 @@ class GenreSerializer(serializers.ModelSerializer):
 
 
 class PlaySerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
     class Meta:
         model = Play
         fields = ("id", "title", "description", "actors", "genres")
@@ -36,7 +184,7 @@ class PlayImageSerializer(serializers.ModelSerializer):
         fields = ("id", "image")
 
 
-class PlayListSerializer(PlaySerializer):
+class PlayListSerializer(ValuesSerializerMixin, PlaySerializer):
     genres = serializers.SlugRelatedField(
         many=True, read_only=True, slug_field="name"
     )
@@ -44,6 +192,8 @@ class PlayListSerializer(PlaySerializer):
         many=True, read_only=True, slug_field="full_name"
     )
 
+    values_fields = ("id", "title", "description", "image")
+
     class Meta:
         model = Play
         fields = (
@@ -54,6 +204,49 @@ class PlayListSerializer(PlaySerializer):
             "actors",
             "image",
         )
+        list_serializer_class = ValuesListSerializer
+
+    @staticmethod
+    def _related_names(rows):
+        """Prepares a page's rows; returns the name queries to add to them.
+
+        Each query yields ``(play_id, name)`` pairs for the field it names.
+        """
+        image_field = Play._meta.get_field("image")
+        for row in rows:
+            row["genres"], row["actors"] = [], []
+            if row["image"]:
+                row["image"] = image_field.attr_class(
+                    None, image_field, row["image"]
+                )
+
+        play_ids = [row["id"] for row in rows]
+        genres = (
+            Play.genres.through.objects.filter(play_id__in=play_ids)
+            .order_by("id")
+            .values_list("play_id", "genre__name")
+        )
+        actors = (
+            Play.actors.through.objects.filter(play_id__in=play_ids)
+            .order_by("id")
+            .values_list("play_id", Actor.full_name_expression("actor__"))
+        )
+        return (("genres", genres), ("actors", actors))
+
+    @classmethod
+    def complete_rows(cls, rows):
+        """Genre and actor names of a page, one query per relation"""
+        by_id = {row["id"]: row for row in rows}
+        for field, names in cls._related_names(rows):
+            for play_id, name in names:
+                by_id[play_id][field].append(name)
+
+    @classmethod
+    async def acomplete_rows(cls, rows):
+        by_id = {row["id"]: row for row in rows}
+        for field, names in cls._related_names(rows):
+            async for play_id, name in names:
+                by_id[play_id][field].append(name)
 
 
 class PlayDetailSerializer(PlaySerializer):
@@ -74,10 +267,12 @@ class TheatreHallSerializer(serializers.ModelSerializer):
 class PerformanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Performance
-        fields = ("id", "play", "theatre_hall", "show_time")
+        fields = (
+            "id", "play", "theatre_hall", "show_time", "admission_rate"
+        )
 
 
-class PerformanceListSerializer(PerformanceSerializer):
+class PerformanceListSerializer(ValuesSerializerMixin, PerformanceSerializer):
     play_title = serializers.CharField(source="play.title", read_only=True)
     theatre_hall_name = serializers.CharField(
         source="theatre_hall.name", read_only=True
@@ -87,6 +282,16 @@ class PerformanceListSerializer(PerformanceSerializer):
     )
     tickets_available = serializers.IntegerField()
 
+    # tickets_available is annotated by PerformanceViewSet.queryset
+    values_fields = ("id", "show_time", "tickets_available")
+    values_expressions = {
+        "play_title": F("play__title"),
+        "theatre_hall_name": F("theatre_hall__name"),
+        "theatre_hall_capacity": (
+            F("theatre_hall__row") * F("theatre_hall__seats_in_row")
+        ),
+    }
+
     class Meta:
         model = Performance
         fields = (
@@ -97,6 +302,24 @@ class PerformanceListSerializer(PerformanceSerializer):
             "theatre_hall_capacity",
             "tickets_available",
         )
+        list_serializer_class = ValuesListSerializer
+
+
+class ScheduleEntrySerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="performance_id", read_only=True)
+    play = serializers.IntegerField(source="play_id", read_only=True)
+
+    class Meta:
+        model = ScheduleEntry
+        fields = (
+            "id",
+            "show_time",
+            "play",
+            "play_title",
+            "theatre_hall_name",
+            "theatre_hall_capacity",
+            "tickets_available",
+        )
 
 
 class PerformanceRetrieveSerializer(PerformanceListSerializer):
@@ -117,6 +340,29 @@ class TicketSerializer(serializers.ModelSerializer):
         fields = ("id", "row", "seat", "reservation")
 
 
+class TicketCreateSerializer(TicketSerializer):
+    performance = CachedPrimaryKeyRelatedField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
+
+    class Meta:
+        model = Ticket
+        fields = ("id", "row", "seat", "performance")
+        # Taken seats are checked for the whole batch in
+        # ReservationCreateSerializer.create
+        validators = []
+
+    def validate(self, attrs):
+        data = super(TicketCreateSerializer, self).validate(attrs)
+        Ticket.validate_ticket(
+            attrs["row"],
+            attrs["seat"],
+            attrs["performance"].theatre_hall,
+            serializers.ValidationError,
+        )
+        return data
+
+
 class TicketRetrieveSerializer(TicketSerializer):
     performance = PerformanceRetrieveSerializer(read_only=True)
 
@@ -133,16 +379,250 @@ class ReservationSerializer(serializers.ModelSerializer):
         fields = ("id", "created_at", "tickets")
 
 
+SEAT_HELD_MESSAGE = "This seat is held by another customer."
+
+
+def seats_of(tickets_data):
+    """Plain seat dicts, as kept by SeatHoldStore, of validated tickets"""
+    return [
+        {
+            "performance": ticket["performance"].id,
+            "row": ticket["row"],
+            "seat": ticket["seat"],
+        }
+        for ticket in tickets_data
+    ]
+
+
+def raise_for_seats(count, indexes, message):
+    if indexes:
+        raise serializers.ValidationError(
+            {
+                "tickets": [
+                    {"non_field_errors": [message]} if index in indexes else {}
+                    for index in range(count)
+                ]
+            }
+        )
+
+
 class ReservationCreateSerializer(ReservationSerializer):
-    tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    tickets = TicketCreateSerializer(
+        many=True, read_only=False, allow_empty=False
+    )
+
+    def validate(self, attrs):
+        data = super(ReservationCreateSerializer, self).validate(attrs)
+        held = SeatHoldStore().held_by_others(
+            seats_of(attrs["tickets"]), token=self.context.get("hold_token")
+        )
+        raise_for_seats(len(attrs["tickets"]), held, SEAT_HELD_MESSAGE)
+        return data
+
+    def create(self, validated_data):
+        tickets = [
+            Ticket(**ticket_data)
+            for ticket_data in validated_data.pop("tickets")
+        ]
+        try:
+            with transaction.atomic():
+                reservation = Reservation.objects.create(**validated_data)
+                for ticket in tickets:
+                    ticket.reservation = reservation
+                Ticket.validate_seats_available(
+                    tickets, serializers.ValidationError
+                )
+                Ticket.objects.bulk_create(tickets)
+                tickets_booked.send(sender=Ticket, tickets=tickets)
+        except IntegrityError:
+            # Another reservation took seats after the check; now that it is
+            # committed, the check reports which, in the usual per-ticket form
+            Ticket.validate_seats_available(
+                tickets, serializers.ValidationError
+            )
+            raise
+        return reservation
+
+
+class HeldSeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+    performance = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.Serializer):
+    tickets = TicketCreateSerializer(many=True, allow_empty=False)
+    minutes = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.SEAT_HOLD_MAX_MINUTES,
+        default=settings.SEAT_HOLD_DEFAULT_MINUTES,
+    )
+
+    def validate(self, attrs):
+        """Rejects sold or repeated seats using the cached seat maps only"""
+        data = super(SeatHoldSerializer, self).validate(attrs)
+        seat_maps = {}
+        seen = set()
+        unavailable = set()
+        for index, ticket in enumerate(attrs["tickets"]):
+            performance = ticket["performance"]
+            if performance.id not in seat_maps:
+                seat_maps[performance.id] = SeatMap.for_performance(
+                    performance
+                )
+            seat = (performance.id, ticket["row"], ticket["seat"])
+            if seat in seen or seat_maps[performance.id].is_taken(
+                ticket["row"], ticket["seat"]
+            ):
+                unavailable.add(index)
+            seen.add(seat)
+        raise_for_seats(len(attrs["tickets"]), unavailable, SEAT_TAKEN_MESSAGE)
+        return data
+
+    def create(self, validated_data):
+        seats = seats_of(validated_data["tickets"])
+        try:
+            return SeatHoldStore().hold(
+                validated_data["user"].id, seats, validated_data["minutes"]
+            )
+        except SeatsUnavailable as error:
+            raise_for_seats(
+                len(seats),
+                {seats.index(seat) for seat in error.seats},
+                SEAT_HELD_MESSAGE,
+            )
+
+    def to_representation(self, instance):
+        return SeatHoldDetailSerializer(instance, context=self.context).data
+
+
+class SeatHoldDetailSerializer(serializers.Serializer):
+    token = serializers.CharField()
+    expires_at = serializers.DateTimeField()
+    tickets = HeldSeatSerializer(many=True)
+
+
+NO_ADJACENT_SEATS_MESSAGE = "No row has this many adjacent free seats."
+SEATS_CONTENDED_MESSAGE = (
+    "The best seats keep being taken by others; please try again."
+)
+
+
+class SeatAllocationSerializer(serializers.Serializer):
+    """Reserves the best block of ``count`` adjacent free seats.
+
+    Seats come from the cached seat map, so no ticket rows are read to
+    choose them. Seats held by others are skipped, and a block sold between
+    the choice and the insert makes the allocation pick again, up to
+    ``attempts`` times.
+    """
+    count = serializers.IntegerField(min_value=1)
+    attempts = 3
+
+    def create(self, validated_data):
+        performance = validated_data["performance"]
+        excluded = set()
+        for _ in range(self.attempts):
+            seats = SeatMap.for_performance(performance).best_available(
+                validated_data["count"], excluded
+            )
+            if seats is None:
+                raise serializers.ValidationError(
+                    {"count": [NO_ADJACENT_SEATS_MESSAGE]}
+                )
+
+            tickets = [
+                {"performance": performance, "row": row, "seat": seat}
+                for row, seat in seats
+            ]
+            held = SeatHoldStore().held_by_others(seats_of(tickets))
+            if held:
+                excluded.update(seats[index] for index in held)
+                continue
+
+            reservation_serializer = ReservationCreateSerializer(
+                context=self.context
+            )
+            try:
+                return reservation_serializer.create(
+                    {"user": validated_data["user"], "tickets": tickets}
+                )
+            except serializers.ValidationError:
+                # Sold meanwhile; make sure the next pick sees those tickets
+                invalidate_seat_maps([performance.id])
+
+        raise serializers.ValidationError(
+            {"count": [SEATS_CONTENDED_MESSAGE]}
+        )
+
+    def to_representation(self, instance):
+        return ReservationCreateSerializer(
+            instance, context=self.context
+        ).data
+
+
+class QueueStatusSerializer(serializers.Serializer):
+    token = serializers.CharField()
+    performance = serializers.IntegerField()
+    admitted = serializers.BooleanField()
+    position = serializers.IntegerField(
+        help_text="Clients admitted before this one"
+    )
+    wait_seconds = serializers.IntegerField()
+    expires_in_seconds = serializers.IntegerField(
+        help_text="Seconds left to reserve once admitted"
+    )
+
+
+class CatalogueImportSerializer(serializers.Serializer):
+    """Imports an uploaded CSV or JSONL season file chunk by chunk.
+
+    The upload is read line by line; see theatre.bulk_import for the record
+    layout. A bad record rejects the request, but the chunks before it stay
+    imported and are reported in the error.
+    """
+    file = serializers.FileField(write_only=True)
+    file_format = serializers.ChoiceField(
+        choices=FORMATS,
+        required=False,
+        write_only=True,
+        help_text="Defaults to the file extension",
+    )
+    chunk_size = serializers.IntegerField(
+        min_value=1, max_value=10000, default=1000, write_only=True
+    )
+    imported = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True
+    )
+
+    def validate(self, attrs):
+        file_format = attrs.get("file_format") or detect_format(
+            attrs["file"].name
+        )
+        if file_format is None:
+            raise serializers.ValidationError(
+                {"file_format": "Cannot tell the format from the file name."}
+            )
+        attrs["file_format"] = file_format
+        return attrs
 
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets = validated_data.pop("tickets")
-            reservation = Reservation.objects.create(**validated_data)
-            for ticket in tickets:
-                Ticket.objects.create(reservation=reservation, **ticket)
-            return reservation
+        importer = CatalogueImporter(chunk_size=validated_data["chunk_size"])
+        try:
+            importer.run(
+                read_records(
+                    validated_data["file"], validated_data["file_format"]
+                )
+            )
+        except (CatalogueImportError, UnicodeDecodeError) as error:
+            raise serializers.ValidationError(
+                {
+                    "file": [
+                        f"{error}. Imported before it: {importer.progress()}"
+                    ]
+                }
+            )
+        return {"imported": dict(importer.counts)}
 
 
 class ReservationListSerializer(ReservationSerializer):
@@ -151,6 +631,61 @@ class ReservationListSerializer(ReservationSerializer):
         fields = ["id", "tickets", "created_at"]
 
 
+class TicketSeatSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ticket
+        fields = ("id", "row", "seat")
+
+
+class ReservationFlatPerformanceSerializer(PerformanceRetrieveSerializer):
+    tickets = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Performance
+        fields = (
+            "id",
+            "show_time",
+            "play_title",
+            "theatre_hall_name",
+            "theatre_hall_capacity",
+            "tickets",
+        )
+
+    @extend_schema_field(TicketSeatSerializer(many=True))
+    def get_tickets(self, obj):
+        return TicketSeatSerializer(
+            self.context["reservation_tickets"][obj.id], many=True
+        ).data
+
+
+class ReservationFlatListSerializer(serializers.ModelSerializer):
+    """Lists every performance of a reservation once, with its seats"""
+    performances = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Reservation
+        fields = ("id", "created_at", "performances")
+
+    @extend_schema_field(ReservationFlatPerformanceSerializer(many=True))
+    def get_performances(self, obj):
+        performances = {}
+        tickets_by_performance = {}
+        for ticket in obj.tickets.all():
+            performances.setdefault(ticket.performance_id, ticket.performance)
+            tickets_by_performance.setdefault(
+                ticket.performance_id, []
+            ).append(ticket)
+
+        return ReservationFlatPerformanceSerializer(
+            performances.values(),
+            many=True,
+            context={
+                **self.context,
+                "reservation_tickets": tickets_by_performance,
+            },
+        ).data
+
+
 class PerformanceDetailSerializer(PerformanceSerializer):
     play = PlayListSerializer(many=False, read_only=True)
     theatre_hall = TheatreHallSerializer(many=False, read_only=True)
@@ -162,3 +697,15 @@ class PerformanceDetailSerializer(PerformanceSerializer):
     class Meta:
         model = Performance
         fields = ("id", "show_time", "play", "theatre_hall", "taken_places")
+
+
+class PerformanceSeatMapSerializer(PerformanceDetailSerializer):
+    seat_map = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Performance
+        fields = ("id", "show_time", "play", "theatre_hall", "seat_map")
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_seat_map(self, obj):
+        return SeatMap.for_performance(obj).to_representation()
@@ -0,0 +1,327 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from theatre.cache import bump_versions
+from theatre.instrumentation import install_query_recorder
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    ScheduleEntry,
+    TheatreHall,
+    Ticket,
+    invalidate_hall_dimensions,
+)
+from theatre.schedule import refresh_schedule, shift_tickets_available
+from theatre.search import update_search_vectors
+from theatre.seat_events import (
+    SEAT_RELEASED,
+    SEAT_TAKEN,
+    publish_resync,
+    publish_seat_changes,
+)
+from theatre.seat_map import invalidate_seat_maps
+
+
+# Sent with ``tickets`` (a list of Ticket instances) whenever seats are
+# booked or released, including bulk writes that skip the model signals.
+tickets_booked = Signal()
+tickets_released = Signal()
+
+
+@receiver(pre_save, sender=Ticket)
+def ticket_saving(sender, instance, using, **kwargs):
+    """Remember the stored seat of an updated ticket, see ticket_saved"""
+    instance._stored_seat = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._stored_seat = (
+            Ticket.objects.using(using)
+            .filter(pk=instance.pk)
+            .values_list("performance_id", "row", "seat")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, created, using, **kwargs):
+    stored_seat = getattr(instance, "_stored_seat", None)
+    if created:
+        tickets_booked.send(sender=Ticket, tickets=[instance])
+    elif stored_seat and stored_seat[0] != instance.performance_id:
+        # Moved to another performance: released there, booked here
+        performance_id, row, seat = stored_seat
+        released = Ticket(
+            pk=instance.pk, performance_id=performance_id, row=row, seat=seat
+        )
+        released._state.db = using
+        tickets_released.send(sender=Ticket, tickets=[released])
+        tickets_booked.send(sender=Ticket, tickets=[instance])
+    else:
+        # The seat itself may have been moved, so drop the cached map
+        refresh_seat_maps([instance])
+        refresh_versions(Ticket)
+        performance_ids = [instance.performance_id]
+        transaction.on_commit(lambda: publish_resync(performance_ids))
+
+
+class DeletedTickets:
+    """The tickets a single ``delete()`` removes, released together.
+
+    Django sends pre_delete for every collected object before it deletes
+    any of them, so the tickets and performances one delete takes along
+    are known up front. The state lives on the delete's ``origin``.
+    """
+
+    def __init__(self):
+        self.pending = set()
+        self.tickets = {}
+        self.performance_ids = set()
+
+    @classmethod
+    def of(cls, origin) -> "DeletedTickets":
+        if not hasattr(origin, "_deleted_tickets"):
+            origin._deleted_tickets = cls()
+        return origin._deleted_tickets
+
+
+@receiver(pre_delete, sender=Ticket)
+def ticket_deleting(sender, instance, origin=None, **kwargs):
+    if origin is not None:
+        DeletedTickets.of(origin).pending.add(instance.pk)
+
+
+@receiver(pre_delete, sender=Performance)
+def performance_deleting(sender, instance, origin=None, **kwargs):
+    if origin is not None:
+        DeletedTickets.of(origin).performance_ids.add(instance.pk)
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, origin=None, **kwargs):
+    """Releases the tickets of a delete once the last of them is gone.
+
+    Deleting a play, hall, reservation or user thus costs one sold counter
+    and schedule UPDATE per performance, not per ticket. Tickets of a
+    performance deleted along with them take its counter and schedule
+    entry with them, so only their seat maps are dropped.
+    """
+    if origin is None:
+        tickets_released.send(sender=Ticket, tickets=[instance])
+        return
+
+    deleted = DeletedTickets.of(origin)
+    deleted.tickets[instance.pk] = instance
+    deleted.pending.discard(instance.pk)
+    if deleted.pending:
+        return
+    del origin._deleted_tickets
+
+    released, gone = [], []
+    for ticket in deleted.tickets.values():
+        if ticket.performance_id in deleted.performance_ids:
+            gone.append(ticket)
+        else:
+            released.append(ticket)
+    if released:
+        tickets_released.send(sender=Ticket, tickets=released)
+    if gone:
+        refresh_seat_maps(gone)
+
+
+@receiver(post_delete, sender=Performance)
+def performance_deleted(sender, instance, origin=None, **kwargs):
+    # Its tickets were deleted without tickets_released, see ticket_deleted.
+    # They go first, so a delete that had none leaves its state behind.
+    if hasattr(origin, "_deleted_tickets"):
+        del origin._deleted_tickets
+    performance_ids = [instance.pk]
+    transaction.on_commit(lambda: publish_resync(performance_ids))
+
+
+@receiver(tickets_booked)
+@receiver(tickets_released)
+def seats_changed(sender, tickets, **kwargs):
+    refresh_seat_maps(tickets)
+    refresh_versions(Ticket)
+
+
+def refresh_seat_maps(tickets):
+    performance_ids = {ticket.performance_id for ticket in tickets}
+    transaction.on_commit(lambda: invalidate_seat_maps(performance_ids))
+
+
+@receiver(tickets_booked)
+def stream_booked_seats(sender, tickets, **kwargs):
+    transaction.on_commit(lambda: publish_seat_changes(SEAT_TAKEN, tickets))
+
+
+@receiver(tickets_released)
+def stream_released_seats(sender, tickets, **kwargs):
+    transaction.on_commit(
+        lambda: publish_seat_changes(SEAT_RELEASED, tickets)
+    )
+
+
+@receiver(tickets_booked)
+def count_booked_tickets(sender, tickets, **kwargs):
+    update_tickets_sold(tickets, 1)
+
+
+@receiver(tickets_released)
+def count_released_tickets(sender, tickets, **kwargs):
+    update_tickets_sold(tickets, -1)
+
+
+def update_tickets_sold(tickets, sign):
+    """Shifts the sold counters inside the caller's transaction"""
+    sold = Counter(ticket.performance_id for ticket in tickets)
+    for performance_id, count in sold.items():
+        Performance.objects.using(tickets_db(tickets)).filter(
+            pk=performance_id
+        ).update(tickets_sold=F("tickets_sold") + sign * count)
+
+
+def tickets_db(tickets) -> str:
+    """The database the tickets were written to or deleted from"""
+    if not tickets:
+        return "default"
+    return tickets[0]._state.db or "default"
+
+
+@receiver(tickets_booked)
+def schedule_booked_tickets(sender, tickets, **kwargs):
+    shift_tickets_available(tickets, -1, tickets_db(tickets))
+
+
+@receiver(tickets_released)
+def schedule_released_tickets(sender, tickets, **kwargs):
+    shift_tickets_available(tickets, 1, tickets_db(tickets))
+
+
+@receiver(post_save, sender=Performance)
+def schedule_performance_saved(sender, instance, using, **kwargs):
+    refresh_schedule([instance.pk], using)
+
+
+@receiver(post_save, sender=Play)
+def schedule_play_saved(sender, instance, created, using, **kwargs):
+    if not created:
+        ScheduleEntry.objects.using(using).filter(play=instance).update(
+            play_title=instance.title
+        )
+
+
+@receiver(post_save, sender=TheatreHall)
+def schedule_theatre_hall_saved(sender, instance, created, using, **kwargs):
+    if not created:
+        refresh_schedule(
+            list(instance.performances.values_list("pk", flat=True)), using
+        )
+
+
+@receiver(post_save, sender=Performance)
+@receiver(post_delete, sender=Performance)
+@receiver(post_save, sender=Play)
+@receiver(post_delete, sender=Play)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Actor)
+@receiver(post_delete, sender=Actor)
+@receiver(post_save, sender=TheatreHall)
+@receiver(post_delete, sender=TheatreHall)
+def catalogue_changed(sender, **kwargs):
+    refresh_versions(sender)
+
+
+@receiver(post_save, sender=Performance)
+@receiver(post_delete, sender=Performance)
+def performance_hall_changed(sender, instance, **kwargs):
+    invalidate_hall_dimensions([instance.pk])
+
+
+@receiver(post_save, sender=TheatreHall)
+def theatre_hall_resized(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_hall_dimensions(
+            instance.performances.values_list("pk", flat=True)
+        )
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def play_relations_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        refresh_versions(Play)
+
+
+def refresh_versions(*models):
+    # Bumping again on commit stops a concurrent request from caching the
+    # pre-commit rows under the version bumped inside the transaction
+    bump_versions(*models)
+    transaction.on_commit(lambda: bump_versions(*models))
+
+
+@receiver(post_save, sender=Play)
+def play_saved(sender, instance, using, **kwargs):
+    update_search_vectors([instance.pk], using)
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def play_search_relations_changed(
+    sender, instance, action, reverse, pk_set, using, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            update_search_vectors([instance.pk], using)
+        return
+
+    # The genre/actor side changed, so pk_set holds plays
+    if action == "pre_clear":
+        instance._search_play_ids = list(
+            instance.play_set.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        update_search_vectors(instance._search_play_ids, using)
+    elif action in ("post_add", "post_remove"):
+        update_search_vectors(pk_set, using)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Actor)
+def play_person_or_genre_saved(sender, instance, created, using, **kwargs):
+    if not created:
+        update_search_vectors(
+            list(instance.play_set.values_list("pk", flat=True)), using
+        )
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Actor)
+def play_person_or_genre_deleting(sender, instance, **kwargs):
+    instance._search_play_ids = list(
+        instance.play_set.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Actor)
+def play_person_or_genre_deleted(sender, instance, using, **kwargs):
+    update_search_vectors(instance._search_play_ids, using)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
@@ -0,0 +1,66 @@
+from collections import Counter
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Pins the number of queries of an endpoint at several data sizes.
+
+    ``assertQueryBudget`` calls ``grow(size)`` for each of ``sizes`` in
+    increasing order, so the test can bring its data to that many rows,
+    then runs ``request``, on cold caches unless ``clear_caches`` is False
+    (for state kept in the cache, like seat holds). It fails when a request
+    needs more than ``budget`` queries, and also when the count changes with
+    the size: an endpoint that is O(1) in queries on a handful of rows must
+    stay so on thousands, whatever the budget.
+    """
+    budget_sizes = (1, 5, 20)
+
+    def assertQueryBudget(  # noqa: N802
+        self, budget, request, grow=None, sizes=None, clear_caches=True
+    ):
+        counts = {}
+        largest = None
+        for size in sizes or self.budget_sizes:
+            if grow is not None:
+                grow(size)
+            if clear_caches:
+                # Response and seat map caches would hide queries
+                for cache in caches.all():
+                    cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            self.assertLess(
+                response.status_code,
+                400,
+                f"Request failed at size {size}: {response.status_code}",
+            )
+            counts[size] = len(queries)
+            largest = queries
+
+        if len(set(counts.values())) > 1:
+            repeated = Counter(
+                query["sql"] for query in largest.captured_queries
+            ).most_common(3)
+            self.fail(
+                "Queries grow with the data: "
+                + ", ".join(
+                    f"{count} at size {size}" for size, count in counts.items()
+                )
+                + "\nMost repeated in the largest run:\n"
+                + "\n".join(f"{count}x {sql}" for sql, count in repeated)
+            )
+
+        [count] = set(counts.values())
+        if count > budget:
+            self.fail(
+                f"{count} queries, budget {budget}:\n"
+                + "\n".join(
+                    f"{index}. {query['sql']}"
+                    for index, query in enumerate(
+                        largest.captured_queries, start=1
+                    )
+                )
+            )
@@ -0,0 +1,153 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.admission import AdmissionStore, get_admission_store
+from theatre.models import Reservation
+from theatre.tests.test_reservation_api import (
+    RESERVATION_URL,
+    sample_performance,
+)
+
+
+def queue_url(performance_id):
+    return reverse("theatre:performance-queue", args=[performance_id])
+
+
+@override_settings(
+    ADMISSION_STORE="theatre.admission.InMemoryAdmissionStore",
+    ADMISSION_WINDOW_MINUTES=10,
+)
+class AdmissionQueueApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_admission_store().clear()
+        self.now = 1_000_000.0
+        patcher = mock.patch(
+            "theatre.admission._now", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.performance = sample_performance(admission_rate=2)
+        self.clients = []
+        for index in range(3):
+            client = APIClient()
+            client.force_authenticate(
+                get_user_model().objects.create_user(
+                    f"user{index}@gmail.com", "testpassword123"
+                )
+            )
+            self.clients.append(client)
+
+    def _join(self, client):
+        return client.post(queue_url(self.performance.id))
+
+    def _reserve(self, client, token=None, seat=1):
+        headers = {"X-Queue-Token": token} if token else {}
+        return client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {
+                        "row": 1,
+                        "seat": seat,
+                        "performance": self.performance.id,
+                    }
+                ]
+            },
+            format="json",
+            headers=headers,
+        )
+
+    def test_clients_admitted_in_arrival_order_at_rate(self):
+        statuses = [self._join(client).data for client in self.clients]
+
+        self.assertEqual(
+            [data["position"] for data in statuses], [0, 1, 2]
+        )
+        self.assertTrue(statuses[0]["admitted"])
+        self.assertEqual(statuses[2]["wait_seconds"], 60)
+
+        self.now += 30
+        res = self.clients[1].get(
+            queue_url(self.performance.id),
+            headers={"X-Queue-Token": statuses[1]["token"]},
+        )
+        self.assertTrue(res.data["admitted"])
+
+    def test_rejoining_keeps_slot(self):
+        first = self._join(self.clients[0]).data
+        self._join(self.clients[1])
+
+        again = self._join(self.clients[0]).data
+
+        self.assertEqual(again["position"], first["position"])
+
+    def test_reservation_requires_admission(self):
+        self._join(self.clients[0])
+        token = self._join(self.clients[1]).data["token"]
+
+        res = self._reserve(self.clients[1])
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self._reserve(self.clients[1], token)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "30")
+        self.assertFalse(Reservation.objects.exists())
+
+        self.now += 30
+        res = self._reserve(self.clients[1], token)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_token_of_other_user_rejected(self):
+        token = self._join(self.clients[0]).data["token"]
+
+        res = self._reserve(self.clients[1], token)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_admission_expires(self):
+        token = self._join(self.clients[0]).data["token"]
+
+        self.now += 11 * 60
+        res = self._reserve(self.clients[0], token)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_performance_without_queue(self):
+        performance = sample_performance(
+            play=self.performance.play,
+            theatre_hall=self.performance.theatre_hall,
+        )
+
+        res = self.clients[0].post(queue_url(performance.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_polling_does_not_use_up_user_rate(self):
+        token = self._join(self.clients[0]).data["token"]
+
+        for _ in range(40):
+            res = self.clients[0].get(
+                queue_url(self.performance.id),
+                headers={"X-Queue-Token": token},
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self._reserve(self.clients[0], token)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_non_numeric_performance_id(self):
+        res = self.clients[0].get("/api/theatre/performances/first/queue/")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_store_must_implement_interface(self):
+        with self.assertRaises(TypeError):
+            AdmissionStore()
@@ -0,0 +1,112 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count, F
+from django.test import SimpleTestCase, TestCase
+
+from theatre.benchmarks import compare_to_baseline
+from theatre.benchmarks.load_data import seed_load_data
+from theatre.models import Performance, ScheduleEntry, Ticket
+
+
+def result(label="plays", **values):
+    return {
+        "label": label,
+        "p50_ms": 10.0,
+        "p99_ms": 20.0,
+        "queries": 4,
+        "throughput_rps": 100.0,
+        **values,
+    }
+
+
+class CompareToBaselineTest(SimpleTestCase):
+    def compare(self, current, saved, tolerance=0.2):
+        return compare_to_baseline(current, {"results": saved}, tolerance)
+
+    def test_within_tolerance(self):
+        self.assertEqual(
+            self.compare(
+                [result(p50_ms=11.5, p99_ms=23.0, throughput_rps=85.0)],
+                [result()],
+            ),
+            [],
+        )
+
+    def test_any_extra_query_is_regression(self):
+        [message] = self.compare([result(queries=5)], [result()])
+
+        self.assertIn("5 queries, baseline 4", message)
+
+    def test_slower_and_lower_throughput(self):
+        regressions = self.compare(
+            [result(p99_ms=30.0, throughput_rps=70.0)], [result()]
+        )
+
+        self.assertEqual(len(regressions), 2)
+
+    def test_small_latency_change_is_noise(self):
+        self.assertEqual(
+            self.compare([result(p50_ms=1.5)], [result(p50_ms=0.5)]), []
+        )
+
+    def test_new_scenarios_are_skipped(self):
+        self.assertEqual(
+            self.compare([result("schedule", queries=10)], [result()]), []
+        )
+
+
+class SeedLoadDataTest(TestCase):
+    def test_seeds_consistent_data(self):
+        counts = seed_load_data(
+            plays=5,
+            performances=20,
+            tickets=200,
+            users=3,
+            batch_size=16,
+            log=lambda message: None,
+        )
+
+        self.assertEqual(counts["plays"], 5)
+        self.assertEqual(counts["performances"], 20)
+        self.assertEqual(Ticket.objects.count(), counts["tickets"])
+        self.assertFalse(
+            Performance.objects.annotate(sold=Count("tickets"))
+            .exclude(tickets_sold=F("sold"))
+            .exists()
+        )
+        self.assertEqual(ScheduleEntry.objects.count(), 20)
+
+    def test_api_benchmark_needs_load_data(self):
+        with self.assertRaisesMessage(CommandError, "seed_load_data"):
+            call_command("benchmark", "api", stdout=StringIO())
+
+
+class BaselineCommandTest(TestCase):
+    def run_benchmark(self, *args):
+        out = StringIO()
+        call_command(
+            "benchmark", "play_filters", "--plays", "10", "--repeat", "2",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_compares_with_saved_baseline(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "play_filters.json"
+
+        self.run_benchmark("--save-baseline", str(path))
+        out = self.run_benchmark(
+            "--baseline", str(path), "--tolerance", "1000"
+        )
+
+        self.assertTrue(path.exists())
+        self.assertIn("No regressions", out)
+
+    def test_missing_baseline(self):
+        with self.assertRaisesMessage(CommandError, "No baseline"):
+            self.run_benchmark("--baseline", "/nonexistent/baseline.json")
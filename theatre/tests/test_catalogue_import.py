@@ -0,0 +1,309 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.models import Actor, Genre, Performance, Play, ScheduleEntry
+from theatre.tests.test_reservation_api import sample_theatre_hall
+from theatre.tests.test_theatre_api import PLAY_URL, sample_genre, sample_play
+
+
+IMPORT_URL = reverse("theatre:catalogue-import")
+
+SEASON_CSV = """\
+type,title,description,genres,actors,play,theatre_hall,show_time
+play,Hamlet,Prince of Denmark,Drama|Tragedy,Anna Bondar|Ivan Moroz,,,
+play,The Seagull,A lake,Drama|Comedy,Anna Bondar,,,
+performance,,,,,Hamlet,Main Hall,2030-06-01T19:00:00
+performance,,,,,The Seagull,Main Hall,2030-06-02T19:00:00+00:00
+"""
+
+
+def season_jsonl(*records) -> str:
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+class CatalogueImportCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hall = sample_theatre_hall()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def import_file(self, path, *args):
+        out = StringIO()
+        call_command("import_catalogue", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        sample_genre(name="Drama")
+        path = self.write("season.csv", SEASON_CSV)
+
+        out = self.import_file(path)
+
+        self.assertIn(
+            "4 records: 2 genres, 2 actors, 2 plays, "
+            "2 performances created",
+            out,
+        )
+        self.assertEqual(Genre.objects.filter(name="Drama").count(), 1)
+        hamlet = Play.objects.get(title="Hamlet")
+        self.assertEqual(
+            sorted(hamlet.genres.values_list("name", flat=True)),
+            ["Drama", "Tragedy"],
+        )
+        self.assertEqual(
+            sorted(actor.full_name for actor in hamlet.actors.all()),
+            ["Anna Bondar", "Ivan Moroz"],
+        )
+        self.assertEqual(Actor.objects.count(), 2)
+        performance = Performance.objects.get(play=hamlet)
+        self.assertEqual(
+            performance.show_time,
+            timezone.make_aware(datetime(2030, 6, 1, 19)),
+        )
+        self.assertEqual(performance.theatre_hall, self.hall)
+        # Derived data skipped by bulk inserts is filled in
+        entry = ScheduleEntry.objects.get(performance=performance)
+        self.assertEqual(entry.play_title, "Hamlet")
+        self.assertEqual(entry.tickets_available, self.hall.capacity)
+
+    def test_import_jsonl_in_chunks(self):
+        path = self.write(
+            "season.jsonl",
+            season_jsonl(
+                {"type": "genre", "name": "Opera"},
+                {"type": "actor", "first_name": "Lili", "last_name": "Down"},
+                {
+                    "type": "play",
+                    "title": "Carmen",
+                    "description": "Seville",
+                    "genres": ["Opera"],
+                    "actors": ["Lili Down"],
+                },
+                {
+                    "type": "performance",
+                    "play": "Carmen",
+                    "theatre_hall": "Main Hall",
+                    "show_time": "2030-06-01T19:00:00Z",
+                },
+            ),
+        )
+
+        out = self.import_file(path, "--chunk-size", "2")
+
+        self.assertIn("2 records: 1 genres, 1 actors", out)
+        self.assertIn("4 records: 1 genres, 1 actors, 1 plays", out)
+        carmen = Play.objects.get(title="Carmen")
+        self.assertEqual(carmen.genres.get().name, "Opera")
+        self.assertEqual(carmen.actors.get().full_name, "Lili Down")
+        self.assertEqual(carmen.performances.count(), 1)
+
+    def test_reimport_does_not_duplicate(self):
+        path = self.write("season.csv", SEASON_CSV)
+        self.import_file(path)
+
+        out = self.import_file(path)
+
+        self.assertIn(
+            "0 genres, 0 actors, 0 plays, 0 performances created, "
+            "2 performances skipped",
+            out,
+        )
+        self.assertEqual(Play.objects.count(), 2)
+        self.assertEqual(Performance.objects.count(), 2)
+        self.assertEqual(
+            Play.objects.get(title="Hamlet").genres.count(), 2
+        )
+
+    def test_existing_play_gains_links(self):
+        play = sample_play(title="Hamlet", description="Old description")
+        path = self.write(
+            "season.jsonl",
+            season_jsonl(
+                {
+                    "type": "play",
+                    "title": "Hamlet",
+                    "description": "New description",
+                    "genres": ["Drama"],
+                }
+            ),
+        )
+
+        self.import_file(path)
+
+        play.refresh_from_db()
+        self.assertEqual(play.description, "Old description")
+        self.assertEqual(play.genres.get().name, "Drama")
+        self.assertEqual(Play.objects.count(), 1)
+
+    def test_bad_record_keeps_earlier_chunks(self):
+        path = self.write(
+            "season.jsonl",
+            season_jsonl(
+                {"type": "genre", "name": "Opera"},
+                {"type": "genre", "name": "Ballet"},
+                {"type": "genre", "name": "Mime"},
+                {
+                    "type": "performance",
+                    "play": "Unknown",
+                    "theatre_hall": "Main Hall",
+                    "show_time": "2030-06-01T19:00:00Z",
+                },
+            ),
+        )
+
+        with self.assertRaisesMessage(
+            CommandError,
+            'Line 4: Unknown play "Unknown". Imported before it: '
+            "2 records: 2 genres",
+        ):
+            self.import_file(path, "--chunk-size", "2")
+
+        self.assertEqual(
+            sorted(Genre.objects.values_list("name", flat=True)),
+            ["Ballet", "Opera"],
+        )
+
+    def test_invalid_records(self):
+        for record, message in [
+            ({"type": "hall"}, "Line 1: type must be one of"),
+            ({"type": "play", "title": ""}, "Line 1: {'title'"),
+            (
+                {
+                    "type": "play",
+                    "title": "Solo",
+                    "description": "One actor",
+                    "actors": ["Cher"],
+                },
+                'Line 1: Actor "Cher" needs a first and a last name',
+            ),
+            (
+                {
+                    "type": "performance",
+                    "play": "Hamlet",
+                    "theatre_hall": "Main Hall",
+                    "show_time": "June 1st",
+                },
+                "Line 1: show_time must be an ISO 8601 date and time",
+            ),
+        ]:
+            with self.subTest(record=record):
+                path = self.write("season.jsonl", season_jsonl(record))
+                with self.assertRaisesMessage(CommandError, message):
+                    self.import_file(path)
+
+    def test_unknown_format(self):
+        path = self.write("season.txt", SEASON_CSV)
+
+        with self.assertRaisesMessage(CommandError, "pass --format"):
+            self.import_file(path)
+
+        self.import_file(path, "--format", "csv")
+        self.assertEqual(Play.objects.count(), 2)
+
+
+class CatalogueImportApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        sample_theatre_hall()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            IMPORT_URL,
+            {"file": SimpleUploadedFile(name, content.encode()), **data},
+            format="multipart",
+        )
+
+    def test_admin_required(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "test@gmail.com",
+                "testpassword123"
+            )
+        )
+
+        res = self.upload("season.csv", SEASON_CSV)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Play.objects.exists())
+
+    def test_import(self):
+        self.client.get(PLAY_URL)
+
+        res = self.upload("season.csv", SEASON_CSV)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            res.data["imported"],
+            {
+                "records": 4,
+                "genres": 3,
+                "actors": 2,
+                "plays": 2,
+                "performances": 2,
+                "skipped_performances": 0,
+            },
+        )
+        # The cached play list is not served any more
+        res = self.client.get(PLAY_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_format_from_field(self):
+        res = self.upload(
+            "season",
+            season_jsonl({"type": "genre", "name": "Opera"}),
+            file_format="jsonl",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["imported"]["genres"], 1)
+
+    def test_unknown_format(self):
+        res = self.upload("season", SEASON_CSV)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file_format", res.data)
+
+    def test_bad_record(self):
+        res = self.upload(
+            "season.jsonl",
+            season_jsonl({"type": "genre", "name": "Opera"}, ["Opera"]),
+            chunk_size=1,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["file"],
+            [
+                "Line 2: Expected an object. Imported before it: "
+                "1 records: 1 genres, 0 actors, 0 plays, "
+                "0 performances created, 0 performances skipped"
+            ],
+        )
+        self.assertTrue(Genre.objects.filter(name="Opera").exists())
@@ -0,0 +1,159 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.instrumentation import (
+    RequestMetrics,
+    _current,
+    metrics,
+    serializing,
+)
+from theatre.models import Play
+from theatre.tests.test_reservation_api import (
+    RESERVATION_URL,
+    sample_performance,
+)
+from theatre.tests.test_theatre_api import PLAY_URL, sample_play
+
+
+METRICS_URL = reverse("theatre:metrics")
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        sample_play()
+
+    def _histograms(self, view):
+        return metrics.snapshot()["views"][view]["histograms"]
+
+    def test_records_queries_per_view_action(self):
+        with self.assertNumQueries(3) as queries:
+            self.client.get(PLAY_URL)
+
+        histograms = self._histograms("PlayViewSet.list")
+        self.assertEqual(histograms["db_queries"]["sum"], len(queries))
+        self.assertEqual(histograms["request_duration_seconds"]["count"], 1)
+        self.assertGreater(histograms["db_duration_seconds"]["sum"], 0)
+        self.assertGreater(histograms["render_duration_seconds"]["sum"], 0)
+        self.assertGreater(histograms["serialize_duration_seconds"]["sum"], 0)
+
+    def test_records_serializer_time_of_any_action(self):
+        performance = sample_performance(play=Play.objects.get())
+        self.client.post(
+            RESERVATION_URL,
+            {"tickets": [{"row": 1, "seat": 1, "performance": performance.id}]},
+            format="json",
+        )
+        self.client.get(RESERVATION_URL)
+        self.client.get(
+            reverse("theatre:performance-detail", args=[performance.id])
+        )
+
+        for view in (
+            "ReservationViewSet.create",
+            "ReservationViewSet.list",
+            "PerformanceViewSet.retrieve",
+        ):
+            histograms = self._histograms(view)
+            self.assertGreater(
+                histograms["serialize_duration_seconds"]["sum"], 0, view
+            )
+
+    def test_serializer_time_excludes_queries(self):
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        self.addCleanup(_current.reset, token)
+
+        with mock.patch(
+            "theatre.instrumentation.time.perf_counter", side_effect=[10, 15]
+        ):
+            with serializing():
+                request_metrics.db_time += 3
+                # Nested serializers are part of the outer one
+                with serializing():
+                    pass
+
+        self.assertEqual(request_metrics.serialize_time, 2)
+
+    @override_settings(
+        # Leaves only async capable middleware, as in the ASGI deployment
+        MIDDLEWARE=[
+            middleware
+            for middleware in settings.MIDDLEWARE
+            if not middleware.startswith("debug_toolbar.")
+        ]
+    )
+    async def test_records_async_views(self):
+        token = AccessToken.for_user(self.user)
+        await self.async_client.get(
+            PLAY_URL, headers={"Authorization": f"Bearer {token}"}
+        )
+
+        histograms = self._histograms("PlayViewSet.list")
+        self.assertGreater(histograms["db_queries"]["sum"], 0)
+        self.assertGreater(histograms["render_duration_seconds"]["sum"], 0)
+
+    @override_settings(METRICS_N_PLUS_ONE_THRESHOLD=2)
+    def test_logs_repeated_queries(self):
+        performances = [
+            sample_performance(play=Play.objects.get()) for _ in range(2)
+        ]
+
+        with self.assertLogs("theatre.instrumentation", "WARNING") as logs:
+            # The sold counters are updated one performance at a time
+            self.client.post(
+                RESERVATION_URL,
+                {
+                    "tickets": [
+                        {"row": 1, "seat": 1, "performance": performance.id}
+                        for performance in performances
+                    ]
+                },
+                format="json",
+            )
+
+        self.assertIn(
+            "Possible N+1 in ReservationViewSet.create", logs.output[0]
+        )
+        self.assertEqual(
+            metrics.snapshot()["views"]["ReservationViewSet.create"][
+                "n_plus_one"
+            ],
+            1,
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get(PLAY_URL)
+
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/plain; charset=utf-8")
+        self.assertIn(
+            'theatre_db_queries_bucket{view="PlayViewSet.list",',
+            res.content.decode(),
+        )
+        self.assertIn(
+            "# TYPE theatre_request_duration_seconds histogram",
+            res.content.decode(),
+        )
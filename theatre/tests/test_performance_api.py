@@ -0,0 +1,602 @@
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.holds import SeatHoldStore
+from theatre.models import Performance, Play, ScheduleEntry
+from theatre.seat_map import (
+    SEAT_MAP_CACHE_KEY,
+    SeatMap,
+    seat_map_version,
+)
+from theatre.tests.test_reservation_api import (
+    RESERVATION_URL,
+    sample_performance,
+    sample_reservation,
+    sample_theatre_hall,
+)
+from theatre.tests.test_theatre_api import PLAY_URL, sample_genre, sample_play
+from theatre.views import PerformanceViewSet, PlayViewSet
+
+
+PERFORMANCE_URL = reverse("theatre:performance-list")
+
+
+def detail_url(performance_id):
+    return reverse("theatre:performance-detail", args=[performance_id])
+
+
+def allocate_url(performance_id):
+    return reverse("theatre:performance-allocate", args=[performance_id])
+
+
+class SeatMapTest(TestCase):
+    def test_take_and_release(self):
+        seat_map = SeatMap(rows=3, seats_in_row=5)
+        seat_map.take(1, 1)
+        seat_map.take(3, 5)
+
+        self.assertTrue(seat_map.is_taken(1, 1))
+        self.assertTrue(seat_map.is_taken(3, 5))
+        self.assertFalse(seat_map.is_taken(2, 3))
+        self.assertEqual(seat_map.taken_count, 2)
+
+        seat_map.release(1, 1)
+        self.assertFalse(seat_map.is_taken(1, 1))
+
+    def test_seat_outside_hall(self):
+        seat_map = SeatMap(rows=3, seats_in_row=5)
+        with self.assertRaises(IndexError):
+            seat_map.take(4, 1)
+
+    def test_free_intervals(self):
+        seat_map = SeatMap(rows=1, seats_in_row=8)
+        seat_map.take(1, 3)
+        seat_map.take(1, 4)
+
+        self.assertEqual(seat_map.free_intervals(1), [(1, 2), (5, 8)])
+        self.assertEqual(
+            seat_map.free_intervals(1, excluded={(1, 8)}), [(1, 2), (5, 7)]
+        )
+
+    def test_best_available_prefers_middle(self):
+        seat_map = SeatMap(rows=5, seats_in_row=10)
+
+        self.assertEqual(
+            seat_map.best_available(2), [(3, 5), (3, 6)]
+        )
+
+        for seat in range(4, 8):
+            seat_map.take(3, seat)
+        self.assertEqual(
+            seat_map.best_available(3), [(2, 4), (2, 5), (2, 6)]
+        )
+        self.assertEqual(
+            seat_map.best_available(3, excluded={(2, 1), (3, 1)}),
+            [(2, 4), (2, 5), (2, 6)],
+        )
+        self.assertIsNone(seat_map.best_available(11))
+
+
+class PerformanceSeatMapApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance(
+            theatre_hall=sample_theatre_hall(row=2, seats_in_row=4)
+        )
+
+    def _seat_map(self):
+        res = self.client.get(
+            detail_url(self.performance.id), {"compact": "true"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("taken_places", res.data)
+        seat_map = res.data["seat_map"]
+        return SeatMap(
+            seat_map["rows"],
+            seat_map["seats_in_row"],
+            base64.b64decode(seat_map["taken"]),
+        )
+
+    def test_retrieve_compact_seat_map(self):
+        sample_reservation(self.user, self.performance, [(1, 2), (2, 4)])
+
+        seat_map = self._seat_map()
+
+        self.assertEqual((seat_map.rows, seat_map.seats_in_row), (2, 4))
+        self.assertTrue(seat_map.is_taken(1, 2))
+        self.assertTrue(seat_map.is_taken(2, 4))
+        self.assertEqual(seat_map.taken_count, 2)
+
+    def test_seat_map_served_from_cache(self):
+        self._seat_map()
+
+        with self.assertNumQueries(3):
+            self._seat_map()
+
+    def test_seat_map_follows_bookings_and_releases(self):
+        self.assertEqual(self._seat_map().taken_count, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                RESERVATION_URL,
+                {
+                    "tickets": [
+                        {
+                            "row": 1,
+                            "seat": 1,
+                            "performance": self.performance.id,
+                        }
+                    ]
+                },
+                format="json",
+            )
+        self.assertTrue(self._seat_map().is_taken(1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.performance.tickets.get().delete()
+        self.assertEqual(self._seat_map().taken_count, 0)
+
+    def test_rebuild_racing_a_booking_is_never_served(self):
+        # A reader starts rebuilding the empty map...
+        stale_key = SEAT_MAP_CACHE_KEY.format(
+            performance_id=self.performance.id,
+            version=seat_map_version(self.performance.id),
+        )
+        # ...a booking commits meanwhile...
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_reservation(self.user, self.performance, [(1, 1)])
+        # ...and the reader stores its pre-commit map afterwards
+        cache.set(stale_key, (2, 4, bytes(1)), 60)
+
+        self.assertTrue(self._seat_map().is_taken(1, 1))
+
+
+class PerformanceAllocateApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance(
+            theatre_hall=sample_theatre_hall(row=3, seats_in_row=6)
+        )
+
+    def _allocate(self, count):
+        return self.client.post(
+            allocate_url(self.performance.id), {"count": count}
+        )
+
+    def _seats(self, res):
+        return [
+            (ticket["row"], ticket["seat"]) for ticket in res.data["tickets"]
+        ]
+
+    def test_allocates_adjacent_middle_seats(self):
+        res = self._allocate(2)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._seats(res), [(2, 3), (2, 4)])
+        self.assertEqual(
+            self.performance.tickets.filter(
+                reservation__user=self.user
+            ).count(),
+            2,
+        )
+
+    def test_skips_sold_and_held_seats(self):
+        sample_reservation(self.user, self.performance, [(2, 3)])
+        SeatHoldStore().hold(
+            0, [{"performance": self.performance.id, "row": 1, "seat": 3}], 5
+        )
+
+        res = self._allocate(3)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._seats(res), [(2, 4), (2, 5), (2, 6)])
+
+    def test_retries_when_seat_map_is_stale(self):
+        # Cache the empty map, then sell seats behind its back
+        SeatMap.for_performance(self.performance)
+        sample_reservation(self.user, self.performance, [(2, 3)])
+
+        res = self._allocate(2)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn((2, 3), self._seats(res))
+
+    def test_no_adjacent_seats(self):
+        res = self._allocate(7)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("count", res.data)
+
+
+class PerformanceTicketsSoldTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance(
+            theatre_hall=sample_theatre_hall(row=5, seats_in_row=10)
+        )
+
+    def test_counter_follows_bookings(self):
+        self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {"row": 1, "seat": seat, "performance": self.performance.id}
+                    for seat in (1, 2, 3)
+                ]
+            },
+            format="json",
+        )
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 3)
+
+        self.performance.tickets.first().reservation.delete()
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 0)
+
+    def test_cascaded_delete_releases_tickets_at_once(self):
+        other = sample_performance(theatre_hall=self.performance.theatre_hall)
+        sample_reservation(self.user, self.performance, [(1, 1), (1, 2)])
+        sample_reservation(self.user, other, [(1, 1), (1, 2), (1, 3)])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+
+        # One sold counter and one schedule UPDATE per performance
+        updates = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 4)
+        self.assertEqual(
+            dict(Performance.objects.values_list("pk", "tickets_sold")),
+            {self.performance.id: 0, other.id: 0},
+        )
+        self.assertEqual(
+            set(ScheduleEntry.objects.values_list("tickets_available")),
+            {(50,)},
+        )
+
+    def test_list_tickets_available(self):
+        sample_reservation(self.user, self.performance, [(1, 1), (1, 2)])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(PERFORMANCE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["tickets_available"], 48)
+
+    def test_reconcile_tickets_sold(self):
+        sample_reservation(self.user, self.performance, [(2, 2)])
+        Performance.objects.update(tickets_sold=7)
+
+        out = StringIO()
+        call_command("reconcile_tickets_sold", stdout=out)
+
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 1)
+        self.assertIn("Reconciled 1 drifted performance(s)", out.getvalue())
+
+    def test_reconcile_refreshes_schedule_and_etags(self):
+        cache.clear()
+        sample_reservation(self.user, self.performance, [(2, 2)])
+        Performance.objects.update(tickets_sold=7)
+        ScheduleEntry.objects.update(tickets_available=43)
+        etag = self.client.get(PERFORMANCE_URL)["ETag"]
+
+        call_command("reconcile_tickets_sold", stdout=StringIO())
+
+        self.assertEqual(
+            ScheduleEntry.objects.get().tickets_available, 49
+        )
+        res = self.client.get(
+            PERFORMANCE_URL, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["tickets_available"], 49)
+
+    def test_ticket_moved_to_another_performance(self):
+        other = sample_performance(theatre_hall=self.performance.theatre_hall)
+        reservation = sample_reservation(
+            self.user, self.performance, [(1, 1), (1, 2)]
+        )
+        ticket = reservation.tickets.get(seat=2)
+
+        ticket.performance = other
+        ticket.seat = 5
+        ticket.save()
+
+        self.performance.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.performance.tickets_sold, 1)
+        self.assertEqual(other.tickets_sold, 1)
+        self.assertEqual(
+            dict(
+                ScheduleEntry.objects.values_list(
+                    "performance_id", "tickets_available"
+                )
+            ),
+            {self.performance.id: 49, other.id: 49},
+        )
+        self.assertTrue(SeatMap.for_performance(other).is_taken(1, 5))
+        self.assertFalse(
+            SeatMap.for_performance(self.performance).is_taken(1, 2)
+        )
+
+
+class PerformanceDateFilterTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def _performance_at(self, *args):
+        return sample_performance(
+            show_time=timezone.make_aware(datetime(*args))
+        )
+
+    def _listed_ids(self, params):
+        res = self.client.get(PERFORMANCE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {performance["id"] for performance in res.data["results"]}
+
+    def test_filter_by_date_covers_whole_day(self):
+        morning = self._performance_at(2030, 5, 1, 0, 0)
+        evening = self._performance_at(2030, 5, 1, 23, 59)
+        self._performance_at(2030, 5, 2, 0, 0)
+
+        self.assertEqual(
+            self._listed_ids({"date": "2030-05-01"}),
+            {morning.id, evening.id},
+        )
+
+    @override_settings(TIME_ZONE="Europe/Kyiv")
+    def test_filter_by_date_uses_configured_time_zone(self):
+        # 23:30 UTC on April 30th is already May 1st in Kyiv
+        late_utc = sample_performance(
+            show_time=datetime(2030, 4, 30, 23, 30, tzinfo=dt_timezone.utc)
+        )
+
+        self.assertEqual(
+            self._listed_ids({"date": "2030-05-01"}), {late_utc.id}
+        )
+
+    def test_filter_by_range(self):
+        self._performance_at(2030, 4, 30, 19, 0)
+        first = self._performance_at(2030, 5, 1, 19, 0)
+        last = self._performance_at(2030, 5, 31, 19, 0)
+        self._performance_at(2030, 6, 1, 19, 0)
+
+        self.assertEqual(
+            self._listed_ids({"from": "2030-05-01", "to": "2030-05-31"}),
+            {first.id, last.id},
+        )
+
+    def test_filter_upcoming(self):
+        sample_performance(show_time=timezone.now() - timedelta(hours=1))
+        upcoming = sample_performance(
+            show_time=timezone.now() + timedelta(hours=1)
+        )
+
+        self.assertEqual(
+            self._listed_ids({"upcoming": "true"}), {upcoming.id}
+        )
+
+    def test_invalid_date(self):
+        res = self.client.get(PERFORMANCE_URL, {"date": "01.05.2030"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("date", res.data)
+
+
+class PerformancePaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_walk_pages_by_show_time_and_id(self):
+        show_time = timezone.make_aware(datetime(2030, 5, 1, 19, 0))
+        hall = sample_theatre_hall()
+        performances = [
+            sample_performance(
+                show_time=show_time + timedelta(days=day), theatre_hall=hall
+            )
+            for day in (1, 0, 0, 0, 2)
+        ]
+        expected = [
+            performance.id
+            for performance in sorted(
+                performances, key=lambda item: (item.show_time, item.id)
+            )
+        ]
+
+        listed = []
+        url = PERFORMANCE_URL + "?page_size=2"
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data["results"]), 2)
+            listed.extend(item["id"] for item in res.data["results"])
+            url = res.data["next"]
+
+        self.assertEqual(listed, expected)
+
+    def test_page_size_is_capped(self):
+        res = self.client.get(PERFORMANCE_URL, {"page_size": 10000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["next"])
+
+
+class PerformanceConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def test_not_modified_without_queries(self):
+        etag = self.client.get(PERFORMANCE_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PERFORMANCE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_etag_changes_with_bookings(self):
+        url = detail_url(self.performance.id)
+        etag = self.client.get(url)["ETag"]
+
+        sample_reservation(self.user, self.performance, [(1, 1)])
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(len(res.data["taken_places"]), 1)
+
+    def test_etag_depends_on_query_params(self):
+        etag = self.client.get(PERFORMANCE_URL)["ETag"]
+
+        res = self.client.get(
+            PERFORMANCE_URL, {"upcoming": "true"}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ExplainQueriesCommandTest(TestCase):
+    def test_explains_every_scenario(self):
+        get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        out = StringIO()
+
+        call_command("explain_queries", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("performances by date", output)
+        self.assertIn("reservations", output)
+        self.assertIn("sequential scan(s) found", output)
+
+
+class AsgiReadApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(user)}"
+        }
+        self.performance = sample_performance()
+        sample_reservation(user, self.performance, [(1, 1)])
+
+    def test_read_actions_are_async(self):
+        self.assertTrue(PlayViewSet.view_is_async)
+        self.assertTrue(PerformanceViewSet.view_is_async)
+
+    async def test_list_and_retrieve_over_asgi(self):
+        res = await self.async_client.get(
+            PERFORMANCE_URL, headers=self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["results"][0]["tickets_available"], 119)
+
+        res = await self.async_client.get(
+            detail_url(self.performance.id), headers=self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()["taken_places"]), 1)
+
+        url = reverse("theatre:play-detail", args=[self.performance.play_id])
+        first = await self.async_client.get(url, headers=self.headers)
+        second = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+
+    async def test_pages_over_asgi(self):
+        play = await sync_to_async(sample_play)(title="Second Play")
+        await play.genres.aadd(await sync_to_async(sample_genre)())
+
+        first = await self.async_client.get(
+            PLAY_URL, {"page_size": 1}, headers=self.headers
+        )
+        second = await self.async_client.get(
+            first.json()["next"], headers=self.headers
+        )
+        self.assertEqual(
+            [row["title"] for row in second.json()["results"]],
+            ["Test Play"],
+        )
+        self.assertIsNone(second.json()["next"])
+
+        res = await self.async_client.get(
+            PLAY_URL, {"search": "second"}, headers=self.headers
+        )
+        self.assertEqual(res.json()["count"], 1)
+        self.assertEqual(res.json()["results"][0]["genres"], ["Test Genre"])
+
+    async def test_writes_still_served_over_asgi(self):
+        res = await self.async_client.post(
+            PERFORMANCE_URL, {}, headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BenchmarkCommandTest(TestCase):
+    def test_play_filters_benchmark_rolls_back_seed_data(self):
+        out = StringIO()
+
+        call_command(
+            "benchmark", "play_filters", "--plays", "30", "--repeat", "2",
+            stdout=out,
+        )
+
+        self.assertIn("exists, match=any: count", out.getvalue())
+        self.assertFalse(Play.objects.exists())
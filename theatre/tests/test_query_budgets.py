@@ -0,0 +1,651 @@
+import io
+import json
+import itertools
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.admission import QUEUE_TOKEN_HEADER
+from theatre.models import Performance, Play
+from theatre.search import full_text_search_supported
+from theatre.tests.query_budget import QueryBudgetMixin
+from theatre.tests.test_reservation_api import (
+    RESERVATION_URL,
+    sample_performance,
+    sample_reservation,
+    sample_theatre_hall,
+)
+from theatre.tests.test_seat_hold_api import HOLD_URL, confirm_url, hold_url
+from theatre.tests.test_theatre_api import (
+    PLAY_URL,
+    detail_url,
+    sample_actor,
+    sample_genre,
+    sample_play,
+)
+
+
+GENRE_URL = reverse("theatre:genre-list")
+ACTOR_URL = reverse("theatre:actor-list")
+THEATRE_HALL_URL = reverse("theatre:theatrehall-list")
+PERFORMANCE_URL = reverse("theatre:performance-list")
+SCHEDULE_URL = reverse("theatre:schedule-list")
+
+# Rebuilding the search vector of a saved play, PostgreSQL only
+SEARCH_VECTOR_QUERIES = 4 if full_text_search_supported("default") else 0
+
+
+def performance_url(performance_id, action="detail"):
+    return reverse(f"theatre:performance-{action}", args=[performance_id])
+
+
+def seats(count, seats_in_row=10):
+    """The first ``count`` seats of a hall, row by row"""
+    return [
+        (index // seats_in_row + 1, index % seats_in_row + 1)
+        for index in range(count)
+    ]
+
+
+def tickets_payload(performance, seat_list) -> dict:
+    return {
+        "tickets": [
+            {"row": row, "seat": seat, "performance": performance.id}
+            for row, seat in seat_list
+        ]
+    }
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                "admin@gmail.com",
+                "testpassword123"
+            )
+        )
+        self.names = itertools.count()
+
+    def name(self, prefix) -> str:
+        return f"{prefix} {next(self.names)}"
+
+    def play_with_cast(self, size):
+        play = sample_play(title=self.name("Play"))
+        play.genres.add(
+            *(sample_genre(name=self.name("Genre")) for _ in range(size))
+        )
+        play.actors.add(
+            *(sample_actor(last_name=self.name("Actor")) for _ in range(size))
+        )
+        return play
+
+
+class CatalogueQueryBudgetTest(QueryBudgetTestCase):
+    def grow_catalogue(self, size):
+        for _ in range(size - Performance.objects.count()):
+            sample_performance(play=self.play_with_cast(3))
+
+    def test_genre_list(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(GENRE_URL),
+            lambda size: [
+                sample_genre(name=self.name("Genre")) for _ in range(size)
+            ],
+        )
+
+    def test_genre_create(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.admin_client.post(
+                GENRE_URL, {"name": self.name("Genre")}
+            ),
+            self.grow_catalogue,
+        )
+
+    def test_actor_list(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(ACTOR_URL),
+            lambda size: [
+                sample_actor(last_name=self.name("Actor"))
+                for _ in range(size)
+            ],
+        )
+
+    def test_actor_create(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.admin_client.post(
+                ACTOR_URL, {"first_name": "Lili", "last_name": "Down"}
+            ),
+            self.grow_catalogue,
+        )
+
+    def test_theatre_hall_list(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(THEATRE_HALL_URL),
+            lambda size: [
+                sample_theatre_hall(name=self.name("Hall"))
+                for _ in range(size)
+            ],
+        )
+
+    def test_theatre_hall_create(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.admin_client.post(
+                THEATRE_HALL_URL,
+                {"name": self.name("Hall"), "row": 10, "seats_in_row": 12},
+            ),
+            self.grow_catalogue,
+        )
+
+    def test_play_list(self):
+        self.assertQueryBudget(
+            3, lambda: self.client.get(PLAY_URL), self.grow_catalogue
+        )
+
+    def test_play_list_filtered(self):
+        genre = sample_genre(name="Drama")
+        actor = sample_actor(first_name="Lili", last_name="Down")
+
+        def grow(size):
+            self.grow_catalogue(size)
+            for play in self.play_with_cast(1), self.play_with_cast(1):
+                play.genres.add(genre)
+                play.actors.add(actor)
+
+        self.assertQueryBudget(
+            3,
+            lambda: self.client.get(
+                PLAY_URL,
+                {
+                    "title": "play",
+                    "genres": str(genre.id),
+                    "actors": str(actor.id),
+                    "match": "all",
+                },
+            ),
+            grow,
+        )
+
+    def test_play_detail(self):
+        play = sample_play()
+
+        def grow(size):
+            play.genres.set(
+                [sample_genre(name=self.name("Genre")) for _ in range(size)]
+            )
+            play.actors.set(
+                [
+                    sample_actor(last_name=self.name("Actor"))
+                    for _ in range(size)
+                ]
+            )
+
+        self.assertQueryBudget(
+            3, lambda: self.client.get(detail_url(play.id)), grow
+        )
+
+    def test_play_create(self):
+        cast = {}
+
+        def grow(size):
+            cast["genres"] = [
+                sample_genre(name=self.name("Genre")).id for _ in range(size)
+            ]
+            cast["actors"] = [
+                sample_actor(last_name=self.name("Actor")).id
+                for _ in range(size)
+            ]
+
+        # The search vector follows the save and both m2m updates
+        self.assertQueryBudget(
+            11 + 3 * SEARCH_VECTOR_QUERIES,
+            lambda: self.admin_client.post(
+                PLAY_URL,
+                {
+                    "title": self.name("Play"),
+                    "description": "Test Play Description",
+                    **cast,
+                },
+            ),
+            grow,
+        )
+
+    def test_play_upload_image(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        play = sample_play()
+
+        def upload():
+            image = io.BytesIO()
+            Image.new("RGB", (10, 10)).save(image, "JPEG")
+            image.name = "play.jpg"
+            image.seek(0)
+            return self.admin_client.post(
+                reverse("theatre:play-upload-image", args=[play.id]),
+                {"image": image},
+                format="multipart",
+            )
+
+        with override_settings(MEDIA_ROOT=media_root):
+            self.assertQueryBudget(
+                5 + SEARCH_VECTOR_QUERIES,
+                upload,
+                lambda size: play.actors.set(
+                    [
+                        sample_actor(last_name=self.name("Actor"))
+                        for _ in range(size)
+                    ]
+                ),
+            )
+
+
+class PerformanceQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hall = sample_theatre_hall(row=10, seats_in_row=10)
+        self.performance = sample_performance(theatre_hall=self.hall)
+
+    def grow_tickets(self, size, performance=None):
+        """Sold seats of the performance, two per reservation"""
+        performance = performance or self.performance
+        sold = seats(size)[performance.tickets.count():]
+        for start in range(0, len(sold), 2):
+            sample_reservation(self.user, performance, sold[start:start + 2])
+
+    def grow_performances(self, size):
+        for _ in range(size - Performance.objects.count()):
+            performance = sample_performance(theatre_hall=self.hall)
+            self.grow_tickets(4, performance)
+
+    def test_list(self):
+        self.assertQueryBudget(
+            1, lambda: self.client.get(PERFORMANCE_URL), self.grow_performances
+        )
+
+    def test_list_filtered(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(
+                PERFORMANCE_URL,
+                {
+                    "date": "2030-05-01",
+                    "from": "2030-01-01",
+                    "to": "2030-12-31",
+                    "play": self.performance.play_id,
+                },
+            ),
+            self.grow_performances,
+        )
+
+    def test_detail(self):
+        self.assertQueryBudget(
+            4,
+            lambda: self.client.get(performance_url(self.performance.id)),
+            self.grow_tickets,
+        )
+
+    def test_compact_detail(self):
+        self.assertQueryBudget(
+            4,
+            lambda: self.client.get(
+                performance_url(self.performance.id), {"compact": "true"}
+            ),
+            self.grow_tickets,
+        )
+
+    def test_create(self):
+        play = sample_play()
+        show_times = (
+            timezone.make_aware(datetime(2030, 6, 1, 19)) + timedelta(days=day)
+            for day in itertools.count()
+        )
+
+        self.assertQueryBudget(
+            5,
+            lambda: self.admin_client.post(
+                PERFORMANCE_URL,
+                {
+                    "play": play.id,
+                    "theatre_hall": self.hall.id,
+                    "show_time": next(show_times).isoformat(),
+                },
+            ),
+            self.grow_performances,
+        )
+
+    def test_update(self):
+        show_times = (
+            timezone.make_aware(datetime(2030, 6, 1, 19)) + timedelta(days=day)
+            for day in itertools.count()
+        )
+
+        self.assertQueryBudget(
+            4,
+            lambda: self.admin_client.patch(
+                performance_url(self.performance.id),
+                {"show_time": next(show_times).isoformat()},
+            ),
+            self.grow_tickets,
+        )
+
+    def test_destroy(self):
+        target = {}
+
+        def grow(size):
+            target["performance"] = sample_performance(theatre_hall=self.hall)
+            self.grow_tickets(size, target["performance"])
+
+        self.assertQueryBudget(
+            5,
+            lambda: self.admin_client.delete(
+                performance_url(target["performance"].id)
+            ),
+            grow,
+        )
+
+    def test_allocate(self):
+        self.assertQueryBudget(
+            10,
+            lambda: self.client.post(
+                performance_url(self.performance.id, "allocate"),
+                {"count": 2},
+            ),
+            self.grow_tickets,
+        )
+
+    @override_settings(SEAT_EVENTS_MAX_STREAM_SECONDS=0)
+    def test_seat_events(self):
+        def stream():
+            response = self.client.get(
+                performance_url(self.performance.id, "seat-events"),
+                headers={"Accept": "text/event-stream"},
+            )
+            b"".join(response.streaming_content)
+            response.close()
+            return response
+
+        self.assertQueryBudget(2, stream, self.grow_tickets)
+
+    def test_queue(self):
+        self.performance.admission_rate = 60
+        self.performance.save()
+        queue_url = performance_url(self.performance.id, "queue")
+
+        self.assertQueryBudget(
+            1, lambda: self.client.post(queue_url), self.grow_tickets
+        )
+
+        token = self.client.post(queue_url).data["token"]
+        self.assertQueryBudget(
+            0,
+            lambda: self.client.get(
+                queue_url, headers={QUEUE_TOKEN_HEADER: token}
+            ),
+            self.grow_tickets,
+        )
+
+
+class ScheduleQueryBudgetTest(QueryBudgetTestCase):
+    def test_list(self):
+        hall = sample_theatre_hall()
+
+        def grow(size):
+            for _ in range(size - Performance.objects.count()):
+                sample_performance(theatre_hall=hall)
+
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get(SCHEDULE_URL, {"date": "2030-05-01"}),
+            grow,
+        )
+
+
+class ReservationQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hall = sample_theatre_hall(row=20, seats_in_row=10)
+        self.performances = [
+            sample_performance(theatre_hall=self.hall) for _ in range(3)
+        ]
+
+    def grow_reservations(self, size):
+        """Reservations with tickets for several performances"""
+        for index in range(len(self.user.reservation_set.all()), size):
+            reservation = sample_reservation(
+                self.user, self.performances[0], [(index + 1, 1)]
+            )
+            for performance in self.performances[1:]:
+                sample_reservation(
+                    self.user, performance, [(index + 1, 2)]
+                ).tickets.update(reservation=reservation)
+
+    def test_list(self):
+        self.assertQueryBudget(
+            2, lambda: self.client.get(RESERVATION_URL), self.grow_reservations
+        )
+
+    def test_flat_list(self):
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.get(RESERVATION_URL, {"flat": "true"}),
+            self.grow_reservations,
+        )
+
+    def test_create(self):
+        free_rows = itertools.count(1)
+        payload = {}
+
+        def grow(size):
+            row = next(free_rows)
+            payload.update(
+                tickets_payload(
+                    self.performances[0],
+                    [(row, seat) for seat in range(1, min(size, 10) + 1)],
+                )
+            )
+            payload["tickets"] += tickets_payload(
+                self.performances[1], [(row, 1)]
+            )["tickets"]
+
+        self.assertQueryBudget(
+            12,
+            lambda: self.client.post(RESERVATION_URL, payload, format="json"),
+            grow,
+            sizes=(1, 4, 10),
+        )
+
+
+class SeatHoldQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.performance = sample_performance(
+            theatre_hall=sample_theatre_hall(row=20, seats_in_row=10)
+        )
+        self.rows = itertools.count(1)
+
+    def hold(self, size):
+        row = next(self.rows)
+        return self.client.post(
+            HOLD_URL,
+            tickets_payload(
+                self.performance,
+                [(row, seat) for seat in range(1, size + 1)],
+            ),
+            format="json",
+        ).data["token"]
+
+    def test_create(self):
+        payload = {}
+
+        def grow(size):
+            row = next(self.rows)
+            payload.update(
+                tickets_payload(
+                    self.performance,
+                    [(row, seat) for seat in range(1, size + 1)],
+                )
+            )
+
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.post(HOLD_URL, payload, format="json"),
+            grow,
+            sizes=(1, 4, 10),
+        )
+
+    def test_retrieve_and_release(self):
+        token = {}
+
+        def grow(size):
+            token["value"] = self.hold(size)
+
+        self.assertQueryBudget(
+            0,
+            lambda: self.client.get(hold_url(token["value"])),
+            grow,
+            sizes=(1, 4, 10),
+            clear_caches=False,
+        )
+        self.assertQueryBudget(
+            0,
+            lambda: self.client.delete(hold_url(token["value"])),
+            grow,
+            sizes=(1, 4, 10),
+            clear_caches=False,
+        )
+
+    def test_confirm(self):
+        token = {}
+
+        def grow(size):
+            token["value"] = self.hold(size)
+
+        self.assertQueryBudget(
+            9,
+            lambda: self.client.post(confirm_url(token["value"])),
+            grow,
+            sizes=(1, 4, 10),
+            clear_caches=False,
+        )
+
+
+class AdminQueryBudgetTest(QueryBudgetTestCase):
+    def test_cache_stats_and_metrics(self):
+        for url in reverse("theatre:cache-stats"), reverse("theatre:metrics"):
+            self.assertQueryBudget(
+                0,
+                lambda: self.admin_client.get(url, {"format": "json"}),
+                lambda size: [
+                    self.client.get(PLAY_URL) for _ in range(size)
+                ],
+            )
+
+    def test_catalogue_import(self):
+        sample_theatre_hall(name="Main Hall")
+        season = {}
+
+        def grow(size):
+            # A new season of `size` plays, each with a new genre, actor
+            # and performance
+            prefix = self.name("Season")
+            records = []
+            for index in range(size):
+                title = f"{prefix} play {index}"
+                records += [
+                    {
+                        "type": "play",
+                        "title": title,
+                        "description": "Test Play Description",
+                        "genres": [f"{prefix} genre {index}"],
+                        "actors": [f"{prefix} actor{index}"],
+                    },
+                    {
+                        "type": "performance",
+                        "play": title,
+                        "theatre_hall": "Main Hall",
+                        "show_time": f"2030-06-01T{index % 24:02}:00:00Z",
+                    },
+                ]
+            season["content"] = "".join(
+                json.dumps(record) + "\n" for record in records
+            ).encode()
+
+        # Per chunk: resolve and create genres, actors and plays, link
+        # them, resolve halls, skip scheduled performances, create the
+        # rest and upsert their schedule entries
+        self.assertQueryBudget(
+            15 + SEARCH_VECTOR_QUERIES,
+            lambda: self.admin_client.post(
+                reverse("theatre:catalogue-import"),
+                {
+                    "file": SimpleUploadedFile(
+                        "season.jsonl", season["content"]
+                    )
+                },
+                format="multipart",
+            ),
+            grow,
+        )
+
+    def test_ticket_export(self):
+        performance = sample_performance(
+            theatre_hall=sample_theatre_hall(row=10, seats_in_row=10)
+        )
+
+        def grow(size):
+            sold = seats(size)[performance.tickets.count():]
+            for start in range(0, len(sold), 2):
+                sample_reservation(
+                    self.user, performance, sold[start:start + 2]
+                )
+
+        def export():
+            response = self.admin_client.get(
+                reverse("theatre:ticket-export"), {"file_format": "jsonl"}
+            )
+            b"".join(response.streaming_content)
+            return response
+
+        self.assertQueryBudget(1, export, grow)
+
+
+class QueryBudgetMixinTest(QueryBudgetTestCase):
+    def test_growing_query_count_fails(self):
+        def per_play_request():
+            for play in Play.objects.all():
+                list(play.genres.all())
+            return self.client.get(PLAY_URL)
+
+        with self.assertRaisesMessage(
+            AssertionError, "Queries grow with the data"
+        ):
+            self.assertQueryBudget(
+                100,
+                per_play_request,
+                lambda size: [
+                    self.play_with_cast(1)
+                    for _ in range(size - Play.objects.count())
+                ],
+            )
@@ -0,0 +1,415 @@
+from datetime import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.models import (
+    Performance,
+    Reservation,
+    TheatreHall,
+    Ticket,
+    SEAT_TAKEN_MESSAGE,
+)
+from theatre.serializers import ReservationCreateSerializer
+from theatre.tests.test_theatre_api import sample_play
+from theatre.views import ReservationViewSet
+
+
+RESERVATION_URL = reverse("theatre:reservation-list")
+
+
+def sample_theatre_hall(**params):
+    defaults = {
+        "name": "Main Hall",
+        "row": 10,
+        "seats_in_row": 12,
+    }
+    defaults.update(params)
+    return TheatreHall.objects.create(**defaults)
+
+
+def sample_performance(**params):
+    defaults = {
+        "show_time": timezone.make_aware(datetime(2030, 5, 1, 19, 0)),
+    }
+    defaults.update(params)
+    if "play" not in defaults:
+        defaults["play"] = sample_play()
+    if "theatre_hall" not in defaults:
+        defaults["theatre_hall"] = sample_theatre_hall()
+    return Performance.objects.create(**defaults)
+
+
+def sample_reservation(user, performance, seats):
+    reservation = Reservation.objects.create(user=user)
+    for row, seat in seats:
+        Ticket.objects.create(
+            reservation=reservation,
+            performance=performance,
+            row=row,
+            seat=seat,
+        )
+    return reservation
+
+
+class TicketSaveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.performance = sample_performance()
+        self.reservation = Reservation.objects.create(user=self.user)
+
+    def _ticket(self, row, seat, **params):
+        return Ticket(
+            reservation=self.reservation,
+            performance_id=self.performance.id,
+            row=row,
+            seat=seat,
+            **params,
+        )
+
+    def test_save_reads_hall_dimensions_once(self):
+        self._ticket(1, 1).save()
+
+        # INSERT and the tickets_sold and schedule UPDATEs, in a savepoint
+        with self.assertNumQueries(5):
+            self._ticket(1, 2).save()
+
+    def test_seat_out_of_range(self):
+        with self.assertRaises(ValidationError) as context:
+            self._ticket(11, 1).save()
+
+        self.assertIn("row", context.exception.message_dict)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_taken_seat_raises_validation_error(self):
+        self._ticket(1, 1).save()
+
+        with self.assertRaises(ValidationError) as context:
+            self._ticket(1, 1).save()
+
+        self.assertEqual(
+            context.exception.message_dict[NON_FIELD_ERRORS],
+            ["Ticket with this Performance, Row and Seat already exists."],
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_trusted_save_skips_validation(self):
+        # Cold hall dimensions: the validated save would read them first
+        with self.assertNumQueries(3) as queries:
+            self._ticket(1, 1).save(validate=False)
+
+        # INSERT and the tickets_sold and schedule UPDATEs; no hall or
+        # taken seat lookup and no savepoint
+        self.assertFalse(
+            [
+                query["sql"]
+                for query in queries.captured_queries
+                if query["sql"].startswith(("SELECT", "SAVEPOINT"))
+            ]
+        )
+
+    def test_hall_resize_refreshes_dimensions(self):
+        self._ticket(1, 1).save()
+        hall = self.performance.theatre_hall
+        hall.row = 20
+        hall.save()
+
+        self._ticket(15, 1).save()
+
+        self.assertEqual(Ticket.objects.count(), 2)
+
+
+class ReservationCreateApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def _payload(self, *seats):
+        return {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+
+    def test_create_reservation(self):
+        payload = self._payload((1, 1), (1, 2), (2, 5))
+        res = self.client.post(RESERVATION_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        reservation = Reservation.objects.get(pk=res.data["id"])
+        self.assertEqual(reservation.user, self.user)
+        self.assertEqual(
+            set(reservation.tickets.values_list("row", "seat")),
+            {(1, 1), (1, 2), (2, 5)},
+        )
+
+    def test_create_reservation_query_count_independent_of_seats(self):
+        self.client.post(
+            RESERVATION_URL, self._payload((1, 1)), format="json"
+        )
+        with self.assertNumQueries(9):
+            res = self.client.post(
+                RESERVATION_URL,
+                self._payload(*[(3, seat) for seat in range(1, 11)]),
+                format="json",
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tickets"]), 10)
+
+    def test_create_reservation_seat_out_of_range(self):
+        res = self.client.post(
+            RESERVATION_URL, self._payload((1, 1), (11, 1)), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("row", res.data["tickets"][1])
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_create_reservation_seat_taken(self):
+        sample_reservation(self.user, self.performance, [(1, 2)])
+
+        res = self.client.post(
+            RESERVATION_URL, self._payload((1, 1), (1, 2)), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][0], {})
+        self.assertEqual(
+            res.data["tickets"][1]["non_field_errors"], [SEAT_TAKEN_MESSAGE]
+        )
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_create_reservation_seat_taken_after_check(self):
+        sample_reservation(self.user, self.performance, [(1, 2)])
+        validate_seats_available = Ticket.validate_seats_available
+        checks = []
+
+        def check_racing_other_reservation(tickets, error_to_raise):
+            checks.append(tickets)
+            if len(checks) > 1:
+                validate_seats_available(tickets, error_to_raise)
+
+        with mock.patch.object(
+            Ticket,
+            "validate_seats_available",
+            side_effect=check_racing_other_reservation,
+        ):
+            res = self.client.post(
+                RESERVATION_URL, self._payload((1, 1), (1, 2)), format="json"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"],
+            [{}, {"non_field_errors": [SEAT_TAKEN_MESSAGE]}],
+        )
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_integrity_error_before_tickets_is_raised(self):
+        serializer = ReservationCreateSerializer(data=self._payload((1, 1)))
+        serializer.is_valid(raise_exception=True)
+
+        with mock.patch.object(
+            Reservation.objects, "create", side_effect=IntegrityError
+        ):
+            with self.assertRaises(IntegrityError):
+                serializer.save(user=self.user)
+
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_create_reservation_duplicate_seat_in_request(self):
+        res = self.client.post(
+            RESERVATION_URL, self._payload((4, 4), (4, 4)), format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["tickets"][0], {})
+        self.assertIn("non_field_errors", res.data["tickets"][1])
+        self.assertFalse(Ticket.objects.exists())
+
+
+class ReservationIdempotencyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def _post(self, key, *seats):
+        return self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {
+                        "row": row,
+                        "seat": seat,
+                        "performance": self.performance.id,
+                    }
+                    for row, seat in seats
+                ]
+            },
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_retry_replays_response_without_queries(self):
+        first = self._post("retry-1", (1, 1), (1, 2))
+
+        with self.assertNumQueries(0):
+            retry = self._post("retry-1", (1, 1), (1, 2))
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_key_reused_with_other_payload(self):
+        self._post("retry-1", (1, 1))
+
+        res = self._post("retry-1", (1, 2))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    def test_failed_request_releases_key(self):
+        sample_reservation(self.user, self.performance, [(1, 1)])
+        self.assertEqual(
+            self._post("retry-1", (1, 1)).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        Ticket.objects.all().delete()
+
+        res = self._post("retry-1", (1, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_concurrent_retry_conflicts(self):
+        retries = []
+        perform_create = ReservationViewSet.perform_create
+
+        def retry_while_pending(view, serializer):
+            retries.append(self._post("retry-1", (1, 1)))
+            perform_create(view, serializer)
+
+        with mock.patch.object(
+            ReservationViewSet, "perform_create", retry_while_pending
+        ):
+            first = self._post("retry-1", (1, 1))
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retries[0].status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_keys_are_scoped_to_user(self):
+        self._post("retry-1", (1, 1))
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "other@gmail.com", "testpassword123"
+            )
+        )
+
+        res = self._post("retry-1", (1, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReservationListApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def test_list_only_own_reservations(self):
+        other_user = get_user_model().objects.create_user(
+            "other@gmail.com",
+            "testpassword123"
+        )
+        sample_reservation(other_user, self.performance, [(1, 1)])
+        reservation = sample_reservation(
+            self.user, self.performance, [(1, 2)]
+        )
+
+        res = self.client.get(RESERVATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]], [reservation.id]
+        )
+
+    def test_list_query_count_independent_of_tickets(self):
+        sample_reservation(self.user, self.performance, [(1, 1)])
+        with self.assertNumQueries(2):
+            self.client.get(RESERVATION_URL)
+
+        other_performance = sample_performance()
+        for row in range(2, 8):
+            sample_reservation(
+                self.user,
+                self.performance,
+                [(row, 1), (row, 2)],
+            )
+            sample_reservation(self.user, other_performance, [(row, 3)])
+        with self.assertNumQueries(2):
+            res = self.client.get(RESERVATION_URL)
+        self.assertEqual(len(res.data["results"]), 10)
+
+    def test_flat_list_groups_tickets_by_performance(self):
+        other_performance = sample_performance()
+        reservation = Reservation.objects.create(user=self.user)
+        for performance, row, seat in [
+            (self.performance, 1, 1),
+            (other_performance, 2, 2),
+            (self.performance, 1, 2),
+        ]:
+            Ticket.objects.create(
+                reservation=reservation,
+                performance=performance,
+                row=row,
+                seat=seat,
+            )
+
+        res = self.client.get(RESERVATION_URL, {"flat": "true"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        performances = res.data["results"][0]["performances"]
+        self.assertEqual(
+            [performance["id"] for performance in performances],
+            [self.performance.id, other_performance.id],
+        )
+        self.assertEqual(
+            [(ticket["row"], ticket["seat"])
+             for ticket in performances[0]["tickets"]],
+            [(1, 1), (1, 2)],
+        )
+        self.assertEqual(
+            performances[1]["play_title"], other_performance.play.title
+        )
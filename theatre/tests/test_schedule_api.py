@@ -0,0 +1,136 @@
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.models import ScheduleEntry
+from theatre.tests.test_reservation_api import (
+    RESERVATION_URL,
+    sample_performance,
+    sample_reservation,
+    sample_theatre_hall,
+)
+
+
+SCHEDULE_URL = reverse("theatre:schedule-list")
+
+
+class ScheduleApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.hall = sample_theatre_hall(row=2, seats_in_row=5)
+        self.performance = sample_performance(theatre_hall=self.hall)
+
+    def _schedule(self, **params):
+        return self.client.get(SCHEDULE_URL, {"date": "2030-05-01", **params})
+
+    def test_day_schedule(self):
+        sample_performance(
+            theatre_hall=self.hall,
+            show_time=timezone.make_aware(datetime(2030, 5, 2, 19, 0)),
+        )
+
+        with self.assertNumQueries(1):
+            res = self._schedule()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [
+                {
+                    "id": self.performance.id,
+                    "show_time": "2030-05-01T19:00:00Z",
+                    "play": self.performance.play_id,
+                    "play_title": self.performance.play.title,
+                    "theatre_hall_name": "Main Hall",
+                    "theatre_hall_capacity": 10,
+                    "tickets_available": 10,
+                }
+            ],
+        )
+
+    def test_follows_bookings_and_releases(self):
+        reservation = sample_reservation(
+            self.user, self.performance, [(1, 1), (1, 2)]
+        )
+        res = self.client.post(
+            RESERVATION_URL,
+            {
+                "tickets": [
+                    {"row": 2, "seat": 1, "performance": self.performance.id}
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._schedule().data[0]["tickets_available"], 7)
+
+        reservation.delete()
+
+        self.assertEqual(self._schedule().data[0]["tickets_available"], 9)
+
+    def test_follows_catalogue_changes(self):
+        play = self.performance.play
+        play.title = "Renamed"
+        play.save()
+        self.hall.seats_in_row = 6
+        self.hall.save()
+        self.performance.show_time = timezone.make_aware(
+            datetime(2030, 5, 3, 19, 0)
+        )
+        self.performance.save()
+
+        entry = ScheduleEntry.objects.get()
+        self.assertEqual(entry.play_title, "Renamed")
+        self.assertEqual(entry.theatre_hall_capacity, 12)
+        self.assertEqual(entry.day.isoformat(), "2030-05-03")
+        self.assertEqual(self._schedule().data, [])
+
+        self.performance.delete()
+        self.assertFalse(ScheduleEntry.objects.exists())
+
+    def test_invalid_date(self):
+        res = self._schedule(date="01.05.2030")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command_repairs_drift(self):
+        ScheduleEntry.objects.update(tickets_available=0, play_title="?")
+
+        out = StringIO()
+        call_command("rebuild_schedule", stdout=out)
+
+        entry = ScheduleEntry.objects.get()
+        self.assertEqual(entry.tickets_available, 10)
+        self.assertEqual(entry.play_title, self.performance.play.title)
+        self.assertIn("Refreshed 1 schedule entries", out.getvalue())
+
+    def test_rebuild_command_invalidates_cached_responses(self):
+        etag = self._schedule()["ETag"]
+        ScheduleEntry.objects.update(tickets_available=0)
+        self.assertEqual(self._schedule()["X-Cache"], "HIT")
+
+        call_command("rebuild_schedule", stdout=StringIO())
+
+        res = self._schedule()
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data[0]["tickets_available"], 10)
+        res = self.client.get(
+            SCHEDULE_URL,
+            {"date": "2030-05-01"},
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
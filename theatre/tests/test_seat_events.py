@@ -0,0 +1,207 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.models import Performance
+from theatre.seat_events import (
+    SEAT_TAKEN,
+    SeatEventStream,
+    broadcaster,
+    thread_streams,
+)
+from theatre.seat_map import SeatMap, invalidate_seat_maps
+from theatre.tests.test_reservation_api import (
+    RESERVATION_URL,
+    sample_performance,
+    sample_reservation,
+    sample_theatre_hall,
+)
+
+
+def seat_events_url(performance_id):
+    return reverse("theatre:performance-seat-events", args=[performance_id])
+
+
+def parse_events(chunk):
+    """(event type, data) pairs of a chunk of server-sent events"""
+    events = []
+    for block in chunk.strip().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1)
+            for line in block.splitlines()
+            if not line.startswith(":")
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@override_settings(
+    SEAT_EVENTS_HEARTBEAT_SECONDS=0.05,
+    SEAT_EVENTS_MAX_STREAM_SECONDS=5,
+)
+class SeatEventStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.performance = sample_performance(
+            theatre_hall=sample_theatre_hall(row=2, seats_in_row=4)
+        )
+        sample_reservation(self.user, self.performance, [(1, 1)])
+        self.stream = iter(SeatEventStream(self.performance))
+        self.addCleanup(self.stream.close)
+
+    def _next_events(self):
+        return parse_events(next(self.stream))
+
+    def test_snapshot_then_published_changes(self):
+        [(event, data)] = self._next_events()
+        self.assertEqual(event, "snapshot")
+        self.assertTrue(
+            SeatMap(2, 4, base64.b64decode(data["taken"])).is_taken(1, 1)
+        )
+        self.assertEqual(
+            broadcaster.subscriber_count(self.performance.id), 1
+        )
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(
+                RESERVATION_URL,
+                {
+                    "tickets": [
+                        {
+                            "row": 2,
+                            "seat": 3,
+                            "performance": self.performance.id,
+                        }
+                    ]
+                },
+                format="json",
+            )
+
+        self.assertEqual(
+            self._next_events(), [("seat-taken", {"seats": [[2, 3]]})]
+        )
+
+    def test_changes_from_other_workers_found_on_heartbeat(self):
+        self._next_events()
+
+        # Booked by another process: only the shared seat map knows
+        sample_reservation(self.user, self.performance, [(2, 2)])
+        invalidate_seat_maps([self.performance.id])
+
+        self.assertEqual(
+            self._next_events(), [("seat-taken", {"seats": [[2, 2]]})]
+        )
+
+    @override_settings(SEAT_EVENTS_BUFFER_SIZE=1)
+    def test_slow_client_gets_new_snapshot(self):
+        self._next_events()
+
+        for seat in (2, 3, 4):
+            broadcaster.publish(
+                self.performance.id,
+                {"type": SEAT_TAKEN, "seats": [[1, seat]]},
+            )
+
+        [(event, _)] = self._next_events()
+        self.assertEqual(event, "snapshot")
+
+    def test_deleted_performance_resyncs(self):
+        self._next_events()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Performance.objects.filter(pk=self.performance.id).delete()
+
+        [(event, data)] = self._next_events()
+        self.assertEqual(event, "snapshot")
+        self.assertFalse(
+            SeatMap(2, 4, base64.b64decode(data["taken"])).is_taken(1, 1)
+        )
+
+    def test_unsubscribes_when_closed(self):
+        self._next_events()
+
+        self.stream.close()
+
+        self.assertEqual(
+            broadcaster.subscriber_count(self.performance.id), 0
+        )
+
+
+@override_settings(SEAT_EVENTS_MAX_STREAM_SECONDS=0)
+class SeatEventsApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(user)}",
+            "Accept": "text/event-stream",
+        }
+        self.performance = sample_performance()
+
+    def test_stream_over_wsgi(self):
+        res = self.client.get(
+            seat_events_url(self.performance.id), headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        content = b"".join(res.streaming_content).decode()
+        self.assertEqual(parse_events(content)[0][0], "snapshot")
+        res.close()
+        self.assertEqual(thread_streams.open_count, 0)
+
+    @override_settings(SEAT_EVENTS_WSGI_MAX_STREAMS=1)
+    def test_streams_over_wsgi_are_capped(self):
+        first = self.client.get(
+            seat_events_url(self.performance.id), headers=self.headers
+        )
+        self.addCleanup(first.close)
+
+        res = self.client.get(
+            seat_events_url(self.performance.id), headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "3")
+        self.assertEqual(parse_events(res.content.decode())[0][0], "error")
+
+        first.close()
+        res = self.client.get(
+            seat_events_url(self.performance.id), headers=self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res.close()
+
+    async def test_stream_over_asgi(self):
+        res = await self.async_client.get(
+            seat_events_url(self.performance.id), headers=self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        chunks = [chunk async for chunk in res.streaming_content]
+        self.assertEqual(
+            parse_events(chunks[0].decode())[0][0], "snapshot"
+        )
+
+    def test_unknown_performance_is_error_event(self):
+        res = self.client.get(seat_events_url(0), headers=self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(parse_events(res.content.decode())[0][0], "error")
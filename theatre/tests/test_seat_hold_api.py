@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.holds import SeatHoldStore
+from theatre.models import Reservation, Ticket
+from theatre.serializers import SEAT_HELD_MESSAGE
+from theatre.tests.test_reservation_api import (
+    RESERVATION_URL,
+    sample_performance,
+    sample_reservation,
+)
+
+
+HOLD_URL = reverse("theatre:seat-hold-list")
+
+
+def hold_url(token):
+    return reverse("theatre:seat-hold-detail", args=[token])
+
+
+def confirm_url(token):
+    return reverse("theatre:seat-hold-confirm", args=[token])
+
+
+class SeatHoldApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(
+            get_user_model().objects.create_user(
+                "other@gmail.com",
+                "testpassword123"
+            )
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = sample_performance()
+
+    def _tickets(self, *seats):
+        return [
+            {"row": row, "seat": seat, "performance": self.performance.id}
+            for row, seat in seats
+        ]
+
+    def _hold(self, client, *seats, minutes=5):
+        return client.post(
+            HOLD_URL,
+            {"tickets": self._tickets(*seats), "minutes": minutes},
+            format="json",
+        )
+
+    def test_hold_does_not_touch_tickets(self):
+        res = self._hold(self.client, (1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tickets"]), 2)
+        self.assertFalse(Ticket.objects.exists())
+        self.assertEqual(
+            self.client.get(hold_url(res.data["token"])).data["tickets"],
+            res.data["tickets"],
+        )
+
+    def test_held_seat_unavailable_to_others(self):
+        self._hold(self.client, (1, 2))
+
+        res = self._hold(self.other_client, (1, 1), (1, 2))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"][1]["non_field_errors"], [SEAT_HELD_MESSAGE]
+        )
+
+        res = self.other_client.post(
+            RESERVATION_URL,
+            {"tickets": self._tickets((1, 2))},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_failed_hold_releases_claimed_seats(self):
+        self._hold(self.other_client, (1, 2))
+
+        self._hold(self.client, (1, 1), (1, 2))
+
+        self.assertEqual(
+            self._hold(self.other_client, (1, 1)).status_code,
+            status.HTTP_201_CREATED,
+        )
+
+    def test_sold_seat_cannot_be_held(self):
+        sample_reservation(self.user, self.performance, [(3, 3)])
+
+        res = self._hold(self.client, (3, 3))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_hold(self):
+        token = self._hold(self.client, (2, 1), (2, 2)).data["token"]
+
+        res = self.client.post(confirm_url(token))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        reservation = Reservation.objects.get(pk=res.data["id"])
+        self.assertEqual(reservation.user, self.user)
+        self.assertEqual(reservation.tickets.count(), 2)
+        self.assertIsNone(SeatHoldStore().get(token))
+        self.assertEqual(
+            self.client.post(confirm_url(token)).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_release_hold(self):
+        token = self._hold(self.client, (2, 1)).data["token"]
+
+        res = self.client.delete(hold_url(token))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self._hold(self.other_client, (2, 1)).status_code,
+            status.HTTP_201_CREATED,
+        )
+
+    def test_hold_of_other_user_not_found(self):
+        token = self._hold(self.client, (2, 1)).data["token"]
+
+        self.assertEqual(
+            self.other_client.post(confirm_url(token)).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_hold_minutes_capped(self):
+        res = self._hold(self.client, (2, 1), minutes=24 * 60)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("minutes", res.data)
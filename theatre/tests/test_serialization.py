@@ -0,0 +1,120 @@
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from theatre.models import Play
+from theatre.renderers import FastJSONRenderer, orjson
+from theatre.serializers import PerformanceListSerializer, PlayListSerializer
+from theatre.tests.test_reservation_api import sample_performance
+from theatre.tests.test_theatre_api import (
+    sample_actor,
+    sample_genre,
+    sample_play,
+)
+from theatre.views import PerformanceViewSet
+
+
+class FastJSONRendererTest(TestCase):
+    data = {
+        "title": 'Ça ira \u2028\u2029 "quoted"',
+        "show_time": timezone.make_aware(datetime(2030, 5, 1, 19, 0, 0, 1)),
+        "price": Decimal("12.50"),
+        "token": uuid.UUID(int=1),
+        "detail": gettext_lazy("Not found."),
+        "results": [{"id": 1, "empty": None, "flag": True}],
+    }
+
+    def test_same_output_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+        )
+
+    def test_floats_and_decimals_decode_the_same(self):
+        data = {
+            "ratio": 0.1,
+            "large": 1e16,
+            "small": 1.5e-7,
+            "negative_zero": -0.0,
+            "price": Decimal("1.10"),
+            "rounded": Decimal("1E+2"),
+        }
+
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+    @skipIf(orjson is None, "orjson is not installed")
+    def test_non_finite_floats_are_null(self):
+        data = {"nan": float("nan"), "inf": float("inf")}
+
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            {"nan": None, "inf": None},
+        )
+
+    def test_falls_back_for_values_orjson_rejects(self):
+        data = {"id": 2 ** 70}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_without_orjson(self):
+        with mock.patch("theatre.renderers.orjson", None):
+            self.assertEqual(
+                FastJSONRenderer().render(self.data),
+                JSONRenderer().render(self.data),
+            )
+
+
+class ValuesListSerializerTest(TestCase):
+    def setUp(self):
+        self.context = {"request": Request(APIRequestFactory().get("/"))}
+
+    def test_play_rows_match_instances(self):
+        play = sample_play(image="uploads/images/test-play.jpg")
+        play.genres.add(sample_genre(name="Drama"), sample_genre(name="Noir"))
+        play.actors.add(sample_actor(first_name="Lili", last_name="Down"))
+        sample_play(title="No relations")
+        queryset = Play.objects.prefetch_related("genres", "actors")
+
+        with self.assertNumQueries(3):
+            from_values = PlayListSerializer(
+                PlayListSerializer.values_queryset(queryset),
+                many=True,
+                context=self.context,
+            ).data
+
+        self.assertEqual(
+            from_values,
+            PlayListSerializer(queryset, many=True, context=self.context).data,
+        )
+        self.assertEqual(
+            from_values[1]["image"],
+            "http://testserver/media/uploads/images/test-play.jpg",
+        )
+
+    def test_performance_rows_match_instances(self):
+        sample_performance()
+        queryset = PerformanceViewSet.queryset.all()
+
+        from_values = PerformanceListSerializer(
+            PerformanceListSerializer.values_queryset(queryset), many=True
+        ).data
+
+        self.assertEqual(
+            from_values, PerformanceListSerializer(queryset, many=True).data
+        )
@@ -1,11 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.reverse import reverse
 from django.test import TestCase
 from rest_framework.test import APIClient
 
+from theatre.cache import expire_responses, response_cache_stats
 from theatre.models import Play, Genre, Actor
 from theatre.serializers import PlayListSerializer, PlayDetailSerializer
+from theatre.views import PlayViewSet
 
 
 PLAY_URL = reverse("theatre:play-list")
@@ -69,7 +72,7 @@ class AuthenticatedPlayApiTest(TestCase):
         plays = Play.objects.all()
         serializer = PlayListSerializer(plays, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_filter_play_by_title(self):
         play = sample_play()
@@ -80,8 +83,8 @@ class AuthenticatedPlayApiTest(TestCase):
         response = self.client.get(PLAY_URL, {f"title": play.title})
         serializer_play = PlayListSerializer(play)
         serializer_play1 = PlayListSerializer(play1)
-        self.assertIn(serializer_play.data, response.data)
-        self.assertNotIn(serializer_play1.data, response.data)
+        self.assertIn(serializer_play.data, response.data["results"])
+        self.assertNotIn(serializer_play1.data, response.data["results"])
 
 
     def test_filter_play_by_genre(self):
@@ -97,8 +100,8 @@ class AuthenticatedPlayApiTest(TestCase):
         serializer_without_genre = PlayListSerializer(play1)
         response = self.client.get(PLAY_URL, {f"genres": genre.id})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer_with_genre.data, response.data)
-        self.assertNotIn(serializer_without_genre.data, response.data)
+        self.assertIn(serializer_with_genre.data, response.data["results"])
+        self.assertNotIn(serializer_without_genre.data, response.data["results"])
 
     def test_filter_play_by_actor(self):
         play = sample_play()
@@ -109,8 +112,8 @@ class AuthenticatedPlayApiTest(TestCase):
         serializer_without_actor = PlayListSerializer(play1)
         response = self.client.get(PLAY_URL, {f"actors": actor.id})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer_with_actor.data, response.data)
-        self.assertNotIn(serializer_without_actor.data, response.data)
+        self.assertIn(serializer_with_actor.data, response.data["results"])
+        self.assertNotIn(serializer_without_actor.data, response.data["results"])
 
     def test_retrieve_play_detail(self):
         play = sample_play()
@@ -176,8 +179,182 @@ class AdminPlayTest(TestCase):
         self.assertEqual(genres.count(), 1)
         self.assertIn(self.genre, genres)
 
+    def test_create_play_rejects_unknown_related_pks(self):
+        payload = {
+            "title": "Test Play",
+            "description": "Test Play Description",
+            "actors": [self.actor.id, 0],
+            "genres": ["drama"],
+        }
+
+        res = self.client.post(PLAY_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["actors"], ['Invalid pk "0" - object does not exist.']
+        )
+        self.assertEqual(
+            res.data["genres"],
+            ["Incorrect type. Expected pk value, received str."],
+        )
+        self.assertFalse(Play.objects.exists())
+
     def test_delete_play_not_allowed(self):
         play = sample_play()
         url = detail_url(play.id)
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class PlayResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.play = sample_play()
+        self.genre = sample_genre(name="Drama")
+        self.play.genres.add(self.genre)
+
+    def test_list_served_from_cache(self):
+        response = self.client.get(PLAY_URL)
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(PLAY_URL)
+
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(response_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_equivalent_filters_share_entry(self):
+        other_genre = sample_genre(name="Comedy")
+        genre_ids = [self.genre.id, other_genre.id]
+        self.client.get(
+            PLAY_URL,
+            {"title": "TEST", "genres": f"{genre_ids[0]},{genre_ids[1]}"},
+        )
+
+        response = self.client.get(
+            PLAY_URL,
+            {"title": "test", "genres": f"{genre_ids[1]},{genre_ids[0]}"},
+        )
+
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_invalidated_by_related_changes(self):
+        self.client.get(detail_url(self.play.id))
+        actor = sample_actor(first_name="Lili", last_name="Down")
+
+        self.play.actors.add(actor)
+        response = self.client.get(detail_url(self.play.id))
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["actors"][0]["id"], actor.id)
+
+        self.genre.name = "Tragedy"
+        self.genre.save()
+        response = self.client.get(detail_url(self.play.id))
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["genres"][0]["name"], "Tragedy")
+
+    def test_expire_responses_keeps_other_entries(self):
+        self.client.get(PLAY_URL)
+        cache.set("theatre:unrelated", "kept")
+
+        expire_responses(PlayViewSet)
+
+        self.assertEqual(self.client.get(PLAY_URL)["X-Cache"], "MISS")
+        self.assertEqual(cache.get("theatre:unrelated"), "kept")
+
+    def test_cache_stats_admin_only(self):
+        url = reverse("theatre:cache-stats")
+        self.assertEqual(
+            self.client.get(url).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {"hits", "misses"})
+
+
+class PlaySearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def _search(self, term):
+        response = self.client.get(PLAY_URL, {"search": term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [play["title"] for play in response.data["results"]]
+
+    def test_search_ranks_title_over_cast_over_description(self):
+        sample_play(title="Quiet Night", description="About a storm")
+        by_actor = sample_play(title="Hamlet", description="Danish prince")
+        by_actor.actors.add(sample_actor(first_name="Storm", last_name="Ray"))
+        sample_play(title="The Storm", description="Shipwreck")
+        sample_play(title="Macbeth", description="Scottish play")
+
+        self.assertEqual(
+            self._search("storm"), ["The Storm", "Hamlet", "Quiet Night"]
+        )
+
+    def test_search_by_genre_and_full_name(self):
+        play = sample_play(title="Hamlet")
+        play.genres.add(sample_genre(name="Tragedy"))
+        play.actors.add(sample_actor(first_name="Lili", last_name="Down"))
+        sample_play(title="Comedy of Errors")
+
+        self.assertEqual(self._search("tragedy"), ["Hamlet"])
+        self.assertEqual(self._search("lili down"), ["Hamlet"])
+
+
+class PlayRelatedFilterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client.force_authenticate(self.user)
+        self.drama = sample_genre(name="Drama")
+        self.comedy = sample_genre(name="Comedy")
+        self.both = sample_play(title="Both")
+        self.both.genres.add(self.drama, self.comedy)
+        self.drama_only = sample_play(title="Drama only")
+        self.drama_only.genres.add(self.drama)
+
+    def _filtered_titles(self, params):
+        response = self.client.get(PLAY_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [play["title"] for play in response.data["results"]]
+
+    def test_match_any_returns_each_play_once(self):
+        genres = f"{self.drama.id},{self.comedy.id}"
+
+        self.assertEqual(
+            self._filtered_titles({"genres": genres}), ["Both", "Drama only"]
+        )
+
+    def test_match_all(self):
+        genres = f"{self.drama.id},{self.comedy.id}"
+
+        self.assertEqual(
+            self._filtered_titles({"genres": genres, "match": "all"}),
+            ["Both"],
+        )
+
+    def test_invalid_match_mode(self):
+        response = self.client.get(PLAY_URL, {"match": "most"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
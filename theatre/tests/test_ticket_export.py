@@ -0,0 +1,139 @@
+import csv
+import json
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.bulk_export import EXPORT_COLUMNS
+from theatre.models import Reservation
+from theatre.tests.test_reservation_api import (
+    sample_performance,
+    sample_reservation,
+    sample_theatre_hall,
+)
+
+
+EXPORT_URL = reverse("theatre:ticket-export")
+
+
+def reserved_on(reservation, year, month, day):
+    Reservation.objects.filter(pk=reservation.pk).update(
+        created_at=timezone.make_aware(datetime(year, month, day, 12))
+    )
+
+
+class TicketExportTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                "admin@gmail.com",
+                "testpassword123"
+            )
+        )
+        hall = sample_theatre_hall(name="Main Hall")
+        self.performance = sample_performance(theatre_hall=hall)
+        self.other_performance = sample_performance(theatre_hall=hall)
+        self.may = sample_reservation(
+            self.user, self.performance, [(1, 1), (1, 2)]
+        )
+        reserved_on(self.may, 2030, 5, 31)
+        self.june = sample_reservation(
+            self.user, self.other_performance, [(2, 1)]
+        )
+        reserved_on(self.june, 2030, 6, 1)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, b"".join(res.streaming_content).decode()
+
+    def test_admin_required(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_csv(self):
+        res, content = self.export()
+
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment", res["Content-Disposition"])
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(
+            [(row["row"], row["seat"]) for row in rows],
+            [("1", "1"), ("1", "2"), ("2", "1")],
+        )
+        self.assertEqual(
+            rows[0],
+            {
+                **rows[0],
+                "reservation_id": str(self.may.id),
+                "reserved_at": "2030-05-31T12:00:00+00:00",
+                "user_email": "test@gmail.com",
+                "performance_id": str(self.performance.id),
+                "show_time": "2030-05-01T19:00:00+00:00",
+                "play_title": self.performance.play.title,
+                "theatre_hall_name": "Main Hall",
+            },
+        )
+
+    def test_jsonl(self):
+        res, content = self.export(file_format="jsonl")
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2]["reservation_id"], self.june.id)
+        self.assertEqual(rows[2]["user_id"], self.user.id)
+
+    def test_filters(self):
+        for params, reservation_ids in [
+            ({"from": "2030-06-01"}, [self.june.id]),
+            ({"to": "2030-05-31"}, [self.may.id, self.may.id]),
+            ({"from": "2030-05-31", "to": "2030-05-31"}, [self.may.id] * 2),
+            ({"performance": self.other_performance.id}, [self.june.id]),
+        ]:
+            with self.subTest(params=params):
+                _, content = self.export(file_format="jsonl", **params)
+                self.assertEqual(
+                    [
+                        json.loads(line)["reservation_id"]
+                        for line in content.splitlines()
+                    ],
+                    reservation_ids,
+                )
+
+    def test_invalid_params(self):
+        for params in [
+            {"file_format": "xml"},
+            {"from": "31.05.2030"},
+            {"performance": "first"},
+        ]:
+            with self.subTest(params=params):
+                res = self.client.get(EXPORT_URL, params)
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command(self):
+        out = StringIO()
+
+        call_command(
+            "export_tickets", "--from", "2030-06-01", stdout=out
+        )
+
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["reservation_id"], str(self.june.id))
@@ -2,12 +2,19 @@ from django.urls import path, include
 from rest_framework import routers
 
 from theatre.views import (
+    CatalogueImportView,
     PlayViewSet,
     GenreViewSet,
     ActorViewSet,
     TheatreHallViewSet,
     PerformanceViewSet,
+    PerformanceSeatEventsView,
     ReservationViewSet,
+    MetricsView,
+    ResponseCacheStatsView,
+    ScheduleViewSet,
+    SeatHoldViewSet,
+    TicketExportView,
 )
 
 app_name = "theatre"
@@ -20,8 +27,31 @@ router.register("actors", ActorViewSet)
 router.register("theatre_halls", TheatreHallViewSet)
 router.register("performances", PerformanceViewSet)
 router.register("reservations", ReservationViewSet)
+router.register("schedule", ScheduleViewSet, basename="schedule")
+router.register("holds", SeatHoldViewSet, basename="seat-hold")
 
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "performances/<int:pk>/seat-events/",
+        PerformanceSeatEventsView.as_view(),
+        name="performance-seat-events",
+    ),
+    path(
+        "cache-stats/",
+        ResponseCacheStatsView.as_view(),
+        name="cache-stats",
+    ),
+    path(
+        "import/",
+        CatalogueImportView.as_view(),
+        name="catalogue-import",
+    ),
+    path(
+        "export/tickets/",
+        TicketExportView.as_view(),
+        name="ticket-export",
+    ),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
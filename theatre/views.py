@@ -1,13 +1,39 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
-from django.db.models import F, Count
+from adrf import (
+    mixins as async_mixins,
+    views as async_views,
+    viewsets as async_viewsets,
+)
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import InvalidPage
+from django.http import StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from rest_framework import viewsets, mixins, status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from theatre.cache import (
+    CachedResponseMixin,
+    cache_response,
+    conditional_response,
+    response_cache_stats,
+)
 
 from theatre.models import (
     Genre,
@@ -16,9 +42,33 @@ from theatre.models import (
     TheatreHall,
     Performance,
     Reservation,
+    ScheduleEntry,
     Ticket
 )
+from theatre.admission import (
+    AdmissionQueueThrottle,
+    QUEUE_TOKEN_HEADER,
+    check_admission,
+    join_queue,
+    queue_status,
+)
+from theatre.bulk_export import (
+    CONTENT_TYPES,
+    FORMATS as EXPORT_FORMATS,
+    export_lines,
+    export_queryset,
+)
+from theatre.holds import SeatHoldStore
+from theatre.idempotency import IDEMPOTENCY_HEADER, idempotent
+from theatre.instrumentation import SerializerTimingMixin, metrics
 from theatre.permissions import IsAdminOrIfAuthenticatedReadOnly
+from theatre.renderers import (
+    EventStreamRenderer,
+    FastJSONRenderer,
+    PrometheusRenderer,
+)
+from theatre.search import search_plays
+from theatre.seat_events import SeatEventStream, thread_streams
 from theatre.serializers import (
     GenreSerializer,
     ActorSerializer,
@@ -27,59 +77,323 @@ from theatre.serializers import (
     PerformanceSerializer,
     ReservationSerializer,
     TicketSerializer, PlayListSerializer, PlayDetailSerializer, PerformanceListSerializer, PerformanceDetailSerializer,
-    ReservationListSerializer, ReservationCreateSerializer, PlayImageSerializer
+    ReservationListSerializer, ReservationCreateSerializer,
+    PlayImageSerializer, PerformanceSeatMapSerializer,
+    ReservationFlatListSerializer, SeatHoldSerializer,
+    SeatHoldDetailSerializer, QueueStatusSerializer, SeatAllocationSerializer,
+    ScheduleEntrySerializer, CatalogueImportSerializer,
 )
 
 
-class GenreViewSet(viewsets.GenericViewSet,
+def query_param_enabled(request, name):
+    """Treats ?name=true / ?name=1 as switching an optional mode on"""
+    return request.query_params.get(name, "").lower() in ("1", "true")
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination seeking on an indexed ordering instead of OFFSET.
+
+    The cursor stores the last seen value of the first ordering field; the
+    remaining fields only break ties, so they must make the ordering unique.
+
+    ``paginate_queryset`` is DRF's, split around its one query so that
+    ``apaginate_queryset`` can read the page through the async ORM.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def page_queryset(self, queryset, request, view=None):
+        """The query of the page plus one row, or None without pagination"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+        self._page_start = (offset, reverse, current_position)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith("-")
+            order_attr = order.lstrip("-")
+
+            # Test for: (cursor reversed) XOR (queryset reversed)
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + "__lt": current_position}
+            else:
+                kwargs = {order_attr + "__gt": current_position}
+
+            queryset = queryset.filter(**kwargs)
+
+        # The extra row tells whether a following page exists
+        return queryset[offset:offset + self.page_size + 1]
+
+    def take_page(self, results):
+        """Keeps the page out of the rows of ``page_queryset``"""
+        offset, reverse, current_position = self._page_start
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # The rows were read in reverse order
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = self.page_queryset(queryset, request, view)
+        if rows is None:
+            return None
+        return self.take_page(list(rows))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        rows = self.page_queryset(queryset, request, view)
+        if rows is None:
+            return None
+        return self.take_page([row async for row in rows])
+
+
+class CataloguePagination(KeysetPagination):
+    page_size = 100
+    max_page_size = 500
+    ordering = ("id",)
+
+
+class PlayPagination(KeysetPagination):
+    ordering = ("title", "id")
+
+
+class SearchPagination(PageNumberPagination):
+    """Pages over relevance-ranked results, which have no keyset order"""
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset counting and reading through the async ORM"""
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Counted up front, so the page number checks run no query
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        return list(self.page)
+
+
+class PerformancePagination(KeysetPagination):
+    ordering = ("show_time", "id")
+
+
+class ReservationPagination(KeysetPagination):
+    page_size = 10
+    ordering = ("-created_at", "-id")
+
+
+class AsyncReadMixin:
+    """List and retrieve as coroutines reading through the async ORM.
+
+    Under ASGI they wait for the database on the event loop: the page comes
+    from the paginator's ``apaginate_queryset``, the object from
+    ``aget_object``, and serializers with an ``adata`` read the rest of
+    their rows asynchronously too. Building the paginated response runs no
+    query, so it stays on the loop instead of taking a thread.
+    """
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self
+        )
+
+    async def get_apaginated_response(self, data):
+        return self.get_paginated_response(data)
+
+
+class GenreViewSet(SerializerTimingMixin,
+                   CachedResponseMixin,
+                   viewsets.GenericViewSet,
                    mixins.ListModelMixin,
                    mixins.CreateModelMixin):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    pagination_class = CataloguePagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Genre,)
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 
-class ActorViewSet(viewsets.GenericViewSet,
+class ActorViewSet(SerializerTimingMixin,
+                   CachedResponseMixin,
+                   viewsets.GenericViewSet,
                    mixins.ListModelMixin,
                    mixins.CreateModelMixin):
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
+    pagination_class = CataloguePagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Actor,)
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 
-class PlayViewSet(viewsets.GenericViewSet,
+class PlayViewSet(SerializerTimingMixin,
+                  CachedResponseMixin,
+                  AsyncReadMixin,
+                  async_viewsets.GenericViewSet,
                   mixins.CreateModelMixin,
-                  mixins.ListModelMixin,
-                  mixins.RetrieveModelMixin):
+                  async_mixins.ListModelMixin,
+                  async_mixins.RetrieveModelMixin):
     queryset = Play.objects.prefetch_related("genres", "actors")
     serializer_class = PlaySerializer
+    pagination_class = PlayPagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Play, Genre, Actor)
 
     @staticmethod
     def _params_to_ints(qs):
         """Converts a list of string IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(",")]
 
+    def get_cache_params(self, request):
+        """Maps equivalent filters (title case, id order) to one key"""
+        params = dict(super().get_cache_params(request))
+        title = request.query_params.get("title")
+        if title:
+            params["title"] = title.lower()
+        for name in ("genres", "actors"):
+            ids = request.query_params.get(name)
+            if ids:
+                params[name] = sorted(set(self._params_to_ints(ids)))
+        return sorted(params.items())
+
+    @property
+    def paginator(self):
+        request = getattr(self, "request", None)
+        if request and request.query_params.get("search"):
+            if not hasattr(self, "_paginator"):
+                self._paginator = SearchPagination()
+            return self._paginator
+        return super().paginator
+
+    @staticmethod
+    def _related_condition(through, column, ids, match_all):
+        """Semi-join on an m2m table, so matching plays are never repeated.
+
+        All-mode keeps the plays linked to every id with one grouped
+        subquery instead of an EXISTS per id.
+        """
+        links = through.objects.filter(**{f"{column}__in": ids})
+        if match_all:
+            return Q(
+                pk__in=links.values("play_id")
+                .annotate(matched=Count("pk"))
+                .filter(matched=len(set(ids)))
+                .values("play_id")
+            )
+        return Exists(links.filter(play_id=OuterRef("pk")))
+
+    def _match_all(self):
+        match = self.request.query_params.get("match", "any")
+        if match not in ("any", "all"):
+            raise ValidationError({"match": "Must be one of: any, all"})
+        return match == "all"
+
     def get_queryset(self):
         """Retrieve the movies with filters"""
         title = self.request.query_params.get("title")
+        search = self.request.query_params.get("search")
         genres = self.request.query_params.get("genres")
         actors = self.request.query_params.get("actors")
+        match_all = self._match_all()
 
         queryset = self.queryset
 
         if title:
             queryset = queryset.filter(title__icontains=title)
 
+        if search:
+            queryset = search_plays(queryset, search)
+
         if genres:
             genres_ids = self._params_to_ints(genres)
-            queryset = queryset.filter(genres__id__in=genres_ids)
+            queryset = queryset.filter(
+                self._related_condition(
+                    Play.genres.through, "genre_id", genres_ids, match_all
+                )
+            )
 
         if actors:
             actors_ids = self._params_to_ints(actors)
-            queryset = queryset.filter(actors__id__in=actors_ids)
+            queryset = queryset.filter(
+                self._related_condition(
+                    Play.actors.through, "actor_id", actors_ids, match_all
+                )
+            )
+
+        if self.action == "list":
+            queryset = PlayListSerializer.values_queryset(queryset)
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -121,6 +435,15 @@ class PlayViewSet(viewsets.GenericViewSet,
                     )
                 ],
             ),
+            OpenApiParameter(
+                name="search",
+                description=(
+                    "Full-text search over title, description, genres and "
+                    "actors; results are ordered by relevance"
+                ),
+                required=False,
+                type=str,
+            ),
             OpenApiParameter(
                 name="actors",
                 description="Filter by actors.id",
@@ -144,39 +467,118 @@ class PlayViewSet(viewsets.GenericViewSet,
                     )
                 ],
             ),
+            OpenApiParameter(
+                name="match",
+                type=str,
+                enum=["any", "all"],
+                description=(
+                    "Whether a play needs any (default) or all of the "
+                    "given genres and actors"
+                ),
+            ),
         ]
     )
-    def list(self, request, *args, **kwargs):
+    @conditional_response
+    @cache_response
+    async def list(self, request, *args, **kwargs):
         """Endpoint for listing movies"""
-        return super().list(request, *args, **kwargs)
+        return await self.alist(request, *args, **kwargs)
+
+    @conditional_response
+    @cache_response
+    async def retrieve(self, request, *args, **kwargs):
+        """Endpoint for a single movie with its genres and actors"""
+        return await self.aretrieve(request, *args, **kwargs)
 
 
-class PerformanceViewSet(viewsets.ModelViewSet):
+class PerformanceViewSet(SerializerTimingMixin,
+                         CachedResponseMixin,
+                         AsyncReadMixin,
+                         async_viewsets.GenericViewSet,
+                         mixins.CreateModelMixin,
+                         async_mixins.ListModelMixin,
+                         async_mixins.RetrieveModelMixin,
+                         mixins.UpdateModelMixin,
+                         mixins.DestroyModelMixin):
     queryset = (
         Performance.objects.all()
         .select_related("play", "theatre_hall")
         .annotate(
             tickets_available=F("theatre_hall__row")
             * F("theatre_hall__seats_in_row")
-            - Count("tickets")
+            - F("tickets_sold")
         )
     )
     serializer_class = PerformanceSerializer
+    pagination_class = PerformancePagination
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Performance, Play, Genre, Actor, TheatreHall, Ticket)
+    # Non-numeric ids 404 in routing, before any action parses them
+    lookup_value_regex = r"\d+"
+
+    def _date_param(self, name):
+        """Parses a YYYY-MM-DD param into the midnight it starts at"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            day = datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValidationError({name: "Date must be in YYYY-MM-DD format"})
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def get_cache_params(self, request):
+        params = super().get_cache_params(request)
+        if query_param_enabled(request, "upcoming"):
+            # The result also depends on the clock; expire it every minute
+            params.append(("now", timezone.now().strftime("%Y%m%d%H%M")))
+        return params
 
     def get_queryset(self):
-        date = self.request.query_params.get("date")
+        """Retrieve the performances with filters.
+
+        Days are turned into half-open [start, end) ranges of show_time in
+        the configured time zone, so the show_time indexes stay usable.
+        """
+        day_start = self._date_param("date")
+        from_start = self._date_param("from")
+        to_start = self._date_param("to")
         play_id_str = self.request.query_params.get("play")
 
         queryset = self.queryset
 
-        if date:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(show_time__date=date)
+        if day_start:
+            queryset = queryset.filter(
+                show_time__gte=day_start,
+                show_time__lt=day_start + timedelta(days=1),
+            )
+
+        if from_start:
+            queryset = queryset.filter(show_time__gte=from_start)
+
+        if to_start:
+            queryset = queryset.filter(
+                show_time__lt=to_start + timedelta(days=1)
+            )
+
+        if query_param_enabled(self.request, "upcoming"):
+            queryset = queryset.filter(show_time__gte=timezone.now())
 
         if play_id_str:
             queryset = queryset.filter(play_id=int(play_id_str))
 
+        if self.action == "list":
+            queryset = PerformanceListSerializer.values_queryset(queryset)
+
+        if self.action == "retrieve":
+            # Read along with the performance, so serializing it runs no
+            # query of its own
+            queryset = queryset.prefetch_related(
+                "play__genres", "play__actors"
+            )
+            if not query_param_enabled(self.request, "compact"):
+                queryset = queryset.prefetch_related("tickets")
+
         return queryset
 
     def get_serializer_class(self):
@@ -184,42 +586,485 @@ class PerformanceViewSet(viewsets.ModelViewSet):
             return PerformanceListSerializer
 
         if self.action == "retrieve":
+            if query_param_enabled(self.request, "compact"):
+                return PerformanceSeatMapSerializer
             return PerformanceDetailSerializer
 
+        if self.action == "queue":
+            return QueueStatusSerializer
+
+        if self.action == "allocate":
+            return SeatAllocationSerializer
+
         return PerformanceSerializer
 
+    @extend_schema(responses={201: ReservationCreateSerializer})
+    @action(
+        methods=["POST"],
+        detail=True,
+        permission_classes=[IsAuthenticated],
+    )
+    def allocate(self, request, pk=None):
+        """Reserve the best `count` adjacent free seats of the performance"""
+        performance = get_object_or_404(
+            Performance.objects.select_related("theatre_hall"), pk=pk
+        )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        check_admission(request, [{"performance": performance}])
+        serializer.save(user=request.user, performance=performance)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        methods=["GET"],
+        parameters=[
+            OpenApiParameter(
+                name=QUEUE_TOKEN_HEADER,
+                location=OpenApiParameter.HEADER,
+                description="Token returned when joining the queue",
+                required=True,
+                type=str,
+            ),
+        ],
+    )
+    @extend_schema(methods=["POST"], request=None)
+    @action(
+        methods=["GET", "POST"],
+        detail=True,
+        permission_classes=[IsAuthenticated],
+        throttle_classes=[AdmissionQueueThrottle],
+    )
+    def queue(self, request, pk=None):
+        """Join the waiting room of a performance (POST) or poll it (GET).
+
+        Polling only verifies the signed token, so it touches neither the
+        database nor the queue store. Polls are throttled on their own
+        scope, so they never use up the user rate of the reservation the
+        client is queueing for.
+        """
+        if request.method == "GET":
+            token = request.headers.get(QUEUE_TOKEN_HEADER)
+            if not token:
+                raise ValidationError(
+                    {QUEUE_TOKEN_HEADER: "This header is required."}
+                )
+            status_data = queue_status(token, int(pk), request.user)
+            return Response(self.get_serializer(status_data).data)
 
-class ReservationPagination(PageNumberPagination):
-    page_size = 10
-    max_page_size = 100
+        performance = get_object_or_404(
+            Performance.objects.only("id", "admission_rate"), pk=pk
+        )
+        if not performance.admission_rate:
+            raise ValidationError(
+                "This performance does not queue its reservations."
+            )
+        status_data = join_queue(performance, request.user)
+        return Response(
+            self.get_serializer(status_data).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="date",
+                description="Filter by show day (YYYY-MM-DD)",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="from",
+                description="Only shows on or after this day (YYYY-MM-DD)",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="to",
+                description="Only shows on or before this day (YYYY-MM-DD)",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="upcoming",
+                description="Only shows that have not started yet",
+                required=False,
+                type=bool,
+            ),
+            OpenApiParameter(
+                name="play",
+                description="Filter by play.id",
+                required=False,
+                type=int,
+            ),
+        ]
+    )
+    @conditional_response
+    async def list(self, request, *args, **kwargs):
+        """Endpoint for listing performances"""
+        return await self.alist(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="compact",
+                description=(
+                    "Return the taken seats as a base64 bitmap "
+                    "(one bit per seat, row by row) instead of a ticket list"
+                ),
+                required=False,
+                type=bool,
+            ),
+        ]
+    )
+    @conditional_response
+    async def retrieve(self, request, *args, **kwargs):
+        """Endpoint for a performance with its seat occupancy"""
+        return await self.aretrieve(request, *args, **kwargs)
+
+
+class ScheduleViewSet(SerializerTimingMixin,
+                      CachedResponseMixin,
+                      viewsets.GenericViewSet,
+                      mixins.ListModelMixin):
+    """The performances of one day, read from the materialized schedule"""
+    queryset = ScheduleEntry.objects.all()
+    serializer_class = ScheduleEntrySerializer
+    permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Performance, Play, TheatreHall, Ticket)
 
-class ReservationViewSet(viewsets.GenericViewSet,
+    def get_queryset(self):
+        value = self.request.query_params.get("date")
+        if value:
+            try:
+                day = datetime.strptime(value, "%Y-%m-%d").date()
+            except ValueError:
+                raise ValidationError(
+                    {"date": "Date must be in YYYY-MM-DD format"}
+                )
+        else:
+            day = timezone.localdate()
+        queryset = self.queryset.filter(day=day)
+
+        play_id_str = self.request.query_params.get("play")
+        if play_id_str:
+            queryset = queryset.filter(play_id=int(play_id_str))
+
+        return queryset
+
+    def get_cache_params(self, request):
+        params = super().get_cache_params(request)
+        if not request.query_params.get("date"):
+            # "Today" moves on at midnight
+            params.append(("date", timezone.localdate().isoformat()))
+        return params
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="date",
+                description="Show day (YYYY-MM-DD), today by default",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="play",
+                description="Filter by play.id",
+                required=False,
+                type=int,
+            ),
+        ]
+    )
+    @conditional_response
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        """Endpoint for the day schedule: one query, no joins"""
+        return super().list(request, *args, **kwargs)
+
+
+class PerformanceSeatEventsView(async_views.APIView):
+    """Async, so under ASGI an open stream waits on the loop, not a thread"""
+    permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    renderer_classes = (EventStreamRenderer, JSONRenderer)
+
+    @extend_schema(
+        responses={(200, "text/event-stream"): OpenApiTypes.STR}
+    )
+    async def get(self, request, pk):
+        """Server-sent events of seats taken and released.
+
+        Opens with a `snapshot` event holding the compact seat map, then
+        sends `seat-taken` and `seat-released` events with the changed
+        seats instead of the client polling the whole performance.
+        """
+        performance = await aget_object_or_404(
+            Performance.objects.select_related("theatre_hall"), pk=pk
+        )
+        stream = SeatEventStream(performance)
+        if isinstance(request._request, ASGIRequest):
+            events = stream.__aiter__()
+        else:
+            # WSGI consumes a stream on its thread, held until the stream
+            # ends, so only a few may be open per process
+            events = thread_streams.events(stream)
+
+        response = StreamingHttpResponse(
+            events, content_type=EventStreamRenderer.media_type
+        )
+        response["Cache-Control"] = "no-cache"
+        # Keep nginx from buffering the events
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class ReservationViewSet(SerializerTimingMixin,
+                         viewsets.GenericViewSet,
                          mixins.CreateModelMixin,
                          mixins.ListModelMixin):
     queryset = Reservation.objects.prefetch_related(
-        "tickets__performance__play", "tickets__performance__theatre_hall"
+        Prefetch(
+            "tickets",
+            queryset=Ticket.objects.select_related(
+                "performance__play", "performance__theatre_hall"
+            ),
+        )
     )
     serializer_class = ReservationSerializer
     pagination_class = ReservationPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == "list":
+            if query_param_enabled(self.request, "flat"):
+                return ReservationFlatListSerializer
             return ReservationListSerializer
 
+        if self.action == "create":
+            return ReservationCreateSerializer
+
         return ReservationSerializer
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name=IDEMPOTENCY_HEADER,
+                location=OpenApiParameter.HEADER,
+                description=(
+                    "Unique key of this reservation attempt; retries with "
+                    "the same key replay the first response"
+                ),
+                required=False,
+                type=str,
+            ),
+        ]
+    )
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """Endpoint for reserving tickets"""
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
+        check_admission(
+            self.request, serializer.validated_data["tickets"]
+        )
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="flat",
+                description=(
+                    "Group tickets by performance so every performance "
+                    "is returned once per reservation"
+                ),
+                required=False,
+                type=bool,
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        """Endpoint for listing the user's reservations"""
+        return super().list(request, *args, **kwargs)
+
+
+class SeatHoldViewSet(SerializerTimingMixin,
+                      viewsets.GenericViewSet):
+    """Temporary seat holds that can be confirmed into a reservation"""
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+    lookup_value_regex = r"[-\w]+"
+
+    def get_serializer_class(self):
+        if self.action == "create":
+            return SeatHoldSerializer
+
+        if self.action == "confirm":
+            return ReservationCreateSerializer
+
+        return SeatHoldDetailSerializer
+
+    def get_object(self):
+        hold = SeatHoldStore().get(self.kwargs["pk"])
+        if hold is None or hold["user_id"] != self.request.user.id:
+            raise NotFound("Seat hold not found or expired.")
+        return hold
 
-class TheatreHallViewSet(viewsets.GenericViewSet,
+    def create(self, request):
+        """Hold seats for a few minutes without writing any tickets"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        check_admission(request, serializer.validated_data["tickets"])
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def destroy(self, request, pk=None):
+        SeatHoldStore().release(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=["POST"], detail=True)
+    def confirm(self, request, pk=None):
+        """Turn the hold into a reservation and release it"""
+        hold = self.get_object()
+        serializer = self.get_serializer(
+            data={"tickets": hold["tickets"]},
+            context={
+                **self.get_serializer_context(),
+                "hold_token": hold["token"],
+            },
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        SeatHoldStore().release(hold)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class TheatreHallViewSet(SerializerTimingMixin,
+                         CachedResponseMixin,
+                         viewsets.GenericViewSet,
                          mixins.ListModelMixin,
                          mixins.CreateModelMixin):
     queryset = TheatreHall.objects.all()
     serializer_class = TheatreHallSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (TheatreHall,)
+
+    @conditional_response
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class CatalogueImportView(APIView):
+    permission_classes = (IsAdminUser,)
+    parser_classes = (MultiPartParser, FormParser)
+    serializer_class = CatalogueImportSerializer
+
+    def post(self, request):
+        """Bulk import genres, actors, plays and performances from a file"""
+        serializer = CatalogueImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class TicketExportView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def _date_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValidationError({name: "Date must be in YYYY-MM-DD format"})
+
+    def _performance_param(self):
+        value = self.request.query_params.get("performance")
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({"performance": "Must be a performance id"})
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="file_format",
+                type=str,
+                enum=list(EXPORT_FORMATS),
+                description="csv (default) or jsonl",
+            ),
+            OpenApiParameter(
+                name="from",
+                description="Only tickets reserved on or after this day "
+                            "(YYYY-MM-DD)",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="to",
+                description="Only tickets reserved on or before this day "
+                            "(YYYY-MM-DD)",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="performance",
+                description="Filter by performance.id",
+                required=False,
+                type=int,
+            ),
+        ],
+        responses={
+            (200, "text/csv"): OpenApiTypes.STR,
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+        },
+    )
+    def get(self, request):
+        """Stream every sold ticket with its reservation, user and show"""
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"file_format": "Must be one of: csv, jsonl"}
+            )
+        queryset = export_queryset(
+            date_from=self._date_param("from"),
+            date_to=self._date_param("to"),
+            performance_id=self._performance_param(),
+        )
+
+        response = StreamingHttpResponse(
+            export_lines(queryset, file_format),
+            content_type=CONTENT_TYPES[file_format],
+        )
+        filename = f"tickets-{timezone.localdate():%Y%m%d}.{file_format}"
+        response["Content-Disposition"] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        """Hit and miss counters of the catalogue response cache"""
+        return Response(response_cache_stats())
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusRenderer, FastJSONRenderer)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        """Request histograms of this worker process, per view action"""
+        return Response(metrics.snapshot())
@@ -1,3 +1,84 @@
+import itertools
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from theatre.tests.query_budget import QueryBudgetMixin
+
+
+REGISTER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token_obtain_pair")
+TOKEN_REFRESH_URL = reverse("user:token_refresh")
+TOKEN_VERIFY_URL = reverse("user:token_verify")
+ME_URL = reverse("user:manage")
+
+
+class UserQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@gmail.com",
+            "testpassword123"
+        )
+        self.emails = (f"user{index}@gmail.com" for index in itertools.count())
+
+    def grow_users(self, size):
+        user_model = get_user_model()
+        user_model.objects.bulk_create(
+            user_model(email=next(self.emails), password="!")
+            for _ in range(size - user_model.objects.count())
+        )
+
+    def obtain_tokens(self):
+        return self.client.post(
+            TOKEN_URL,
+            {"email": "test@gmail.com", "password": "testpassword123"},
+        )
+
+    def test_register(self):
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.post(
+                REGISTER_URL,
+                {"email": next(self.emails), "password": "testpassword123"},
+            ),
+            self.grow_users,
+        )
+
+    def test_token(self):
+        self.assertQueryBudget(1, self.obtain_tokens, self.grow_users)
+
+    def test_token_refresh_and_verify(self):
+        tokens = self.obtain_tokens().data
+
+        self.assertQueryBudget(
+            0,
+            lambda: self.client.post(
+                TOKEN_REFRESH_URL, {"refresh": tokens["refresh"]}
+            ),
+            self.grow_users,
+        )
+        self.assertQueryBudget(
+            0,
+            lambda: self.client.post(
+                TOKEN_VERIFY_URL, {"token": tokens["access"]}
+            ),
+            self.grow_users,
+        )
+
+    def test_manage(self):
+        self.client.force_authenticate(self.user)
 
-# Create your tests here.
+        self.assertQueryBudget(
+            0, lambda: self.client.get(ME_URL), self.grow_users
+        )
+        # The unique email check and the UPDATE
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.patch(ME_URL, {"email": "new@gmail.com"}),
+            self.grow_users,
+        )